@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Dados sintéticos e benchmarks do pipeline de movimentações (carga, pareamento, agregados).
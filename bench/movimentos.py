@@ -0,0 +1,211 @@
+# bench/movimentos.py
+# Benchmark do pipeline de movimentações sobre dados sintéticos: transformar (carga, ao
+# lado da carga antiga sem ESQUEMA), pareamento, agregados (OS-Item, rollup, ocupação) e
+# pico de memória.
+#
+#   python -m bench.movimentos                       # 10k,100k,1M; compara com a baseline
+#   python -m bench.movimentos --tamanhos 5M         # 5M pede ~10 GB de RAM (registros em dict)
+#   python -m bench.movimentos --salvar              # grava/atualiza bench/baseline.json
+#   python -m bench.movimentos --verificar           # também confere parear == parear_loop
+#
+# Sai com código 1 se alguma medida passar da baseline em mais que --tolerancia.
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from bench.sintetico import Perfil, gerar_registros
+from core.derivados import tempo_por_os_item
+from core.movimentos import TZ, parear, parear_loop, transformar
+from core.ocupacao import MapaOcupacao
+from core.rollup import RollupDiario
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SUFIXOS  = {"k": 10**3, "M": 10**6}
+FOLGA    = {"_s": 0.05, "_mb": 2.0}   # diferença absoluta mínima para contar como regressão (ruído)
+
+
+def _tamanho(txt: str) -> int:
+    txt = txt.strip()
+    return int(float(txt[:-1]) * SUFIXOS[txt[-1]]) if txt[-1] in SUFIXOS else int(txt)
+
+
+def _rotulo(n: int) -> str:
+    for suf, mult in (("M", 10**6), ("k", 10**3)):
+        if n % mult == 0:
+            return f"{n // mult}{suf}"
+    return str(n)
+
+
+def transformar_antigo(rows: list[dict]) -> pd.DataFrame:
+    """A carga de antes do ESQUEMA (colunas brutas mantidas, object/str, data inferida por
+    linha), só como referência de tempo e memória para `transformar`."""
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    df["OS"]   = pd.to_numeric(df.get("OS"), errors="coerce").astype("Int64")
+    df["ITEM"] = pd.to_numeric(df.get("ITEM"), errors="coerce").astype("Int64")
+    df["OS_Item"] = df.get("OS- Item", "").astype(str).str.strip()
+    m = df["OS_Item"].eq("") | df["OS_Item"].isna()
+    df.loc[m, "OS_Item"] = df["OS"].astype(str) + "-" + df["ITEM"].astype(str)
+    df["PROC"] = df.get("Afiação/Erosão", df.get("AFIACAO/EROSAO", "")).astype(str).str.strip()
+    mov = df.get("ENTRADA/SAIDA", "").astype(str).str.strip().str.lower()
+    df["MOV"] = pd.NA
+    df.loc[mov.str.contains("entrada", na=False), "MOV"] = "Entrada"
+    df.loc[mov.str.contains("saída", na=False) | mov.str.contains("saida", na=False), "MOV"] = "Saída"
+    df["TS"] = pd.to_datetime(df["DATA"].astype(str) + " " + df["HORA"].astype(str), dayfirst=True, errors="coerce")
+    df["TS"] = df["TS"].dt.tz_localize(TZ, nonexistent="NaT", ambiguous="NaT")
+    df = df.dropna(subset=["OS", "ITEM", "MOV", "TS"]).copy()
+    return df.sort_values("TS").reset_index(drop=True)
+
+
+def medir(fn, memoria: bool, repeticoes: int = 1):
+    """(resultado, menor tempo em s, pico em MB ou None). O pico é medido numa execução
+    à parte com tracemalloc, para não distorcer o tempo."""
+    seg = float("inf")
+    for _ in range(repeticoes):
+        res = None
+        gc.collect()
+        t = time.perf_counter()
+        res = fn()
+        seg = min(seg, time.perf_counter() - t)
+    pico = None
+    if memoria:
+        del res
+        gc.collect()
+        tracemalloc.start()
+        res = fn()
+        pico = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return res, seg, pico
+
+
+def rodar(n: int, perfil: Perfil, memoria: bool, repeticoes: int) -> dict:
+    out: dict = {}
+    rep = repeticoes if n <= 1_000_000 else 1
+
+    def anotar(nome, seg, pico):
+        out[f"{nome}_s"] = round(seg, 4)
+        if pico is not None:
+            out[f"{nome}_pico_mb"] = round(pico, 1)
+
+    regs, seg, _ = medir(lambda: gerar_registros(n, perfil), False)
+    out["linhas"] = len(regs)
+    out["gerar_s"] = round(seg, 4)
+
+    antigo, seg, pico = medir(lambda: transformar_antigo(regs), memoria, rep)
+    anotar("transformar_antigo", seg, pico)
+    out["frame_antigo_mb"] = round(antigo.memory_usage(deep=True).sum() / 2**20, 1)
+    del antigo
+    df, seg, pico = medir(lambda: transformar(regs), memoria, rep)
+    anotar("transformar", seg, pico)
+    del regs
+    out["frame_mb"] = round(df.memory_usage(deep=True).sum() / 2**20, 1)
+
+    for por_proc in (False, True):
+        sufixo = "_proc" if por_proc else ""
+        (pares, _, _), seg, pico = medir(lambda: parear(df, por_proc, extras=("MAQUINA",)), memoria, rep)
+        anotar(f"parear{sufixo}", seg, pico)
+        out[f"pares{sufixo}"] = len(pares)
+
+        _, seg, pico = medir(lambda: tempo_por_os_item(pares, por_proc), memoria, rep)
+        anotar(f"agregar{sufixo}", seg, pico)
+
+    _, seg, pico = medir(lambda: RollupDiario().atualizar(df, 1), memoria, rep)
+    anotar("rollup", seg, pico)
+
+    d_ini, d_fim = df["TS"].min().date(), df["TS"].max().date()
+    _, seg, pico = medir(lambda: MapaOcupacao(pares, d_ini, d_fim).por_maquina(), memoria, rep)
+    anotar("ocupacao", seg, pico)
+    return out
+
+
+def verificar(perfil: Perfil, n: int = 20_000) -> None:
+    """parear (vetorizado) tem de bater com o laço de referência."""
+    df = transformar(gerar_registros(n, perfil))
+    for por_proc in (False, True):
+        for a, b in zip(parear(df, por_proc), parear_loop(df, por_proc)):
+            if a.empty and b.empty:      # o laço devolve DataFrame() sem colunas quando não há nada
+                continue
+            pd.testing.assert_frame_equal(a.reset_index(drop=True).astype(object),
+                                          b.reset_index(drop=True).astype(object), check_dtype=False)
+    print(f"ok: parear == parear_loop ({n} linhas)")
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list[str]:
+    """Medidas (tempo/memória) que pioraram além da tolerância em relação à baseline."""
+    regressoes = []
+    for tam, medidas in atual.items():
+        ref = base.get(tam, {})
+        for k, v in medidas.items():
+            if not (k.endswith("_s") or k.endswith("_mb")) or k == "gerar_s" or not ref.get(k):
+                continue
+            folga = FOLGA["_s" if k.endswith("_s") else "_mb"]
+            if v > ref[k] * (1 + tolerancia) and v - ref[k] > folga:
+                regressoes.append(f"{tam} {k}: {v} (baseline {ref[k]}, +{(v / ref[k] - 1) * 100:.0f}%)")
+    return regressoes
+
+
+def ambiente() -> dict:
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "maquina": platform.machine(), "data": date.today().isoformat()}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark do pipeline de movimentações (dados sintéticos).")
+    ap.add_argument("--tamanhos", default="10k,100k,1M", help="ex.: 10k,100k,1M,5M")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--taxa-orfas", type=float, default=Perfil.taxa_orfas)
+    ap.add_argument("--taxa-abertas", type=float, default=Perfil.taxa_abertas)
+    ap.add_argument("--n-os", type=int, default=Perfil.n_os)
+    ap.add_argument("--repeticoes", type=int, default=3, help="tempo = menor de N execuções (até 1M linhas)")
+    ap.add_argument("--sem-memoria", action="store_true", help="não mede pico (mais rápido)")
+    ap.add_argument("--verificar", action="store_true", help="confere parear == parear_loop")
+    ap.add_argument("--salvar", action="store_true", help="grava os resultados como baseline")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--tolerancia", type=float, default=0.25, help="fração de piora aceita (0.25 = 25%%)")
+    args = ap.parse_args(argv)
+
+    perfil = Perfil(n_os=args.n_os, taxa_orfas=args.taxa_orfas, taxa_abertas=args.taxa_abertas, seed=args.seed)
+    if args.verificar:
+        verificar(perfil)
+
+    resultados = {}
+    for n in map(_tamanho, args.tamanhos.split(",")):
+        r = rodar(n, perfil, memoria=not args.sem_memoria, repeticoes=args.repeticoes)
+        resultados[_rotulo(n)] = r
+        print(_rotulo(n), json.dumps(r, ensure_ascii=False))
+
+    base = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+
+    if args.salvar:
+        base.setdefault("resultados", {}).update(resultados)
+        base["ambiente"] = ambiente()
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(base, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline gravada em {args.baseline}")
+        return 0
+
+    if not base:
+        print("sem baseline: rode com --salvar para criar")
+        return 0
+    regressoes = comparar(resultados, base.get("resultados", {}), args.tolerancia)
+    for r in regressoes:
+        print("REGRESSÃO", r)
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# bench/nfe.py
+# Benchmark da leitura de NF-e (core/nfe.py): parser por árvore (parse_nfe_xml) contra o
+# extrator de uma passada (extrair_nfe), em XML/s, para notas com poucos e muitos itens.
+#
+#   python -m bench.nfe                          # 5, 50 e 300 itens por nota
+#   python -m bench.nfe --itens 1000 --notas 20
+#   python -m bench.nfe --verificar              # também confere saída idêntica
+#
+# Sai com código 1 se --verificar achar alguma diferença.
+import argparse
+import sys
+import time
+
+from bench.sintetico import gerar_nfe
+from core.nfe import extrair_nfe, parse_nfe_xml
+
+PARSERS = {"arvore": parse_nfe_xml, "uma_passada": extrair_nfe}
+
+
+def medir(fn, blobs: list[bytes], repeticoes: int) -> float:
+    """XML/s (melhor de N execuções)."""
+    seg = float("inf")
+    for _ in range(repeticoes):
+        t = time.perf_counter()
+        for b in blobs:
+            fn(b)
+        seg = min(seg, time.perf_counter() - t)
+    return len(blobs) / seg
+
+
+def verificar(blobs: list[bytes]) -> list[int]:
+    """Índices dos XML em que os dois parsers divergem (valores ou ordem das colunas)."""
+    diferentes = []
+    for i, b in enumerate(blobs):
+        a, e = parse_nfe_xml(b), extrair_nfe(b)
+        colunas = lambda r: (list(r[0] or {}), [list(x) for x in r[1] or []])
+        if a != e or colunas(a) != colunas(e):
+            diferentes.append(i)
+    return diferentes
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark da leitura de XML de NF-e (dados sintéticos).")
+    ap.add_argument("--itens", default="5,50,300", help="itens por nota, ex.: 5,50,300")
+    ap.add_argument("--notas", type=int, default=0, help="notas por tamanho (padrão: ~15k itens no total)")
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--verificar", action="store_true", help="confere parse_nfe_xml == extrair_nfe")
+    args = ap.parse_args(argv)
+
+    falhas = 0
+    for itens in map(int, args.itens.split(",")):
+        blobs = gerar_nfe(args.notas or max(20, 15_000 // max(itens, 1)), itens, args.seed)
+        if args.verificar:
+            dif = verificar(blobs)
+            falhas += len(dif)
+            print(f"{itens} itens: {'ok' if not dif else f'{len(dif)} XML diferentes (ex.: #{dif[0]})'}")
+        taxas = {nome: medir(fn, blobs, args.repeticoes) for nome, fn in PARSERS.items()}
+        mb = sum(map(len, blobs)) / 2**20
+        print(f"{itens:>5} itens/nota, {len(blobs)} notas ({mb:.1f} MB): "
+              + ", ".join(f"{nome} {taxa:,.0f} XML/s" for nome, taxa in taxas.items())
+              + f" (x{taxas['uma_passada'] / taxas['arvore']:.2f})")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# bench/sintetico.py
+# Gerador de linhas realistas da aba EntradaSaidaOS (mesmo cabeçalho e formatos do
+# Operacional) para benchmarks sem tocar no Google Sheets.
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from core.storage import HEADERS
+
+
+@dataclass
+class Perfil:
+    """Parâmetros do gerador. `taxa_orfas`/`taxa_abertas` são frações dos ciclos que
+    ficam só com a Saída / só com a Entrada."""
+    n_os: int = 2_000
+    itens_por_os: int = 5
+    mix_processo: dict = field(default_factory=lambda: {"Afiação": 0.7, "Erosão": 0.3})
+    maquinas: dict = field(default_factory=lambda: {"Afiação": ["AF-01", "AF-02", "AF-03", "AF-04"],
+                                                    "Erosão": ["ER-01", "ER-02"]})
+    operadores: int = 12
+    dias: int = 365
+    duracao_mediana_min: float = 45.0
+    taxa_orfas: float = 0.01
+    taxa_abertas: float = 0.02
+    inicio: str = "2025-01-02 07:00"
+    seed: int = 0
+
+
+def gerar_colunas(n_linhas: int, perfil: Perfil | None = None) -> dict[str, np.ndarray]:
+    """~`n_linhas` linhas em colunas (HEADERS), em ordem de data/hora como na planilha."""
+    p = perfil or Perfil()
+    rng = np.random.default_rng(p.seed)
+    completos = 1.0 - p.taxa_orfas - p.taxa_abertas
+    n_ciclos = max(1, int(round(n_linhas / (2 * completos + p.taxa_orfas + p.taxa_abertas))))
+
+    os_ = rng.integers(10_000, 10_000 + p.n_os, n_ciclos)
+    item = rng.integers(1, p.itens_por_os + 1, n_ciclos)
+    procs = list(p.mix_processo)
+    proc = rng.choice(len(procs), n_ciclos, p=np.array(list(p.mix_processo.values())) / sum(p.mix_processo.values()))
+    maquina = np.empty(n_ciclos, dtype=object)
+    for k, nome in enumerate(procs):
+        sel = proc == k
+        maquina[sel] = rng.choice(p.maquinas[nome], sel.sum())
+    operador = rng.integers(1, p.operadores + 1, n_ciclos)
+    qtd = rng.integers(1, 20, n_ciclos)
+
+    # entrada em horário de turno (07h–19h); duração log-normal em torno da mediana
+    dia = rng.integers(0, p.dias, n_ciclos)
+    seg_turno = rng.integers(0, 12 * 3600, n_ciclos)
+    ini = pd.Timestamp(p.inicio).value // 10**9 + dia * 86_400 + seg_turno
+    dur = np.maximum(60, rng.lognormal(np.log(p.duracao_mediana_min * 60), 0.6, n_ciclos)).astype(np.int64)
+
+    tipo = rng.choice(3, n_ciclos, p=[completos, p.taxa_orfas, p.taxa_abertas])  # 0 ok, 1 órfã, 2 aberta
+    tem_e = tipo != 1
+    tem_s = tipo != 2
+    ciclo = np.concatenate((np.flatnonzero(tem_e), np.flatnonzero(tem_s)))
+    entrada = np.concatenate((np.ones(tem_e.sum(), bool), np.zeros(tem_s.sum(), bool)))
+    ts = np.where(entrada, ini[ciclo], ini[ciclo] + dur[ciclo])
+    ordem = np.argsort(ts, kind="stable")
+    ciclo, entrada, ts = ciclo[ordem], entrada[ordem], ts[ordem]
+
+    quando = pd.to_datetime(ts, unit="s")
+    os_c, item_c = os_[ciclo], item[ciclo]
+    os_item = pd.Series(os_c).astype(str) + "-" + pd.Series(item_c).astype(str)
+    proc_nome = np.array(procs, dtype=object)[proc[ciclo]]
+    mov = np.where(entrada, "Entrada", "Saída").astype(object)
+    return {
+        "OS": os_c, "ITEM": item_c, "QUANTIDADE": qtd[ciclo],
+        "DATA": quando.strftime("%d/%m/%Y").to_numpy(dtype=object),
+        "HORA": quando.strftime("%H:%M:%S").to_numpy(dtype=object),
+        "OPERADOR": np.char.add("op", operador[ciclo].astype(str)).astype(object),
+        "MAQUINA": maquina[ciclo],
+        "ENTRADA/SAIDA": mov,
+        "OS- Item": os_item.to_numpy(dtype=object),
+        "Afiação/Erosão": proc_nome,
+        "Controle": (os_item + "&" + mov + "&" + proc_nome).to_numpy(dtype=object),
+    }
+
+
+def gerar_registros(n_linhas: int, perfil: Perfil | None = None) -> list[dict]:
+    """Registros {header: valor} como `MovimentosStorage.registros()` devolve."""
+    colunas = gerar_colunas(n_linhas, perfil)
+    return pd.DataFrame(colunas, columns=HEADERS).to_dict("records")
+
+
+# ========= NF-e (pages/xml.py) =========
+NS_NFE = "http://www.portalfiscal.inf.br/nfe"
+
+
+def _det_nfe(rng: np.random.Generator, i: int) -> str:
+    simples = i % 2 == 0                               # alterna ICMS normal / Simples Nacional
+    icms = (f"<ICMSSN102><orig>0</orig><CSOSN>102</CSOSN></ICMSSN102>" if simples else
+            f"<ICMS00><orig>0</orig><CST>00</CST><modBC>3</modBC><vBC>{rng.uniform(10, 900):.2f}</vBC>"
+            f"<pICMS>18.00</pICMS><vICMS>{rng.uniform(1, 160):.2f}</vICMS></ICMS00>")
+    desc = f"<vDesc>{rng.uniform(0, 5):.2f}</vDesc>" if i % 3 == 0 else ""
+    q, vu = int(rng.integers(1, 50)), rng.uniform(1, 300)
+    return (f'<det nItem="{i}"><prod><cProd>P{rng.integers(1, 9999):04d}</cProd><cEAN>SEM GTIN</cEAN>'
+            f"<xProd>Fresa topo {rng.integers(2, 20)} mm &amp; cia</xProd><NCM>82077010</NCM><CFOP>5102</CFOP>"
+            f"<uCom>UN</uCom><qCom>{q}.0000</qCom><vUnCom>{vu:.10f}</vUnCom><vProd>{q * vu:.2f}</vProd>"
+            f"<cEANTrib>SEM GTIN</cEANTrib><uTrib>UN</uTrib><qTrib>{q}.0000</qTrib><vUnTrib>{vu:.10f}</vUnTrib>"
+            f"{desc}<indTot>1</indTot></prod><imposto><vTotTrib>0.00</vTotTrib><ICMS>{icms}</ICMS>"
+            f"<IPI><cEnq>999</cEnq><IPINT><CST>53</CST></IPINT></IPI>"
+            f"<PIS><PISAliq><CST>01</CST><vBC>{q * vu:.2f}</vBC><pPIS>1.65</pPIS><vPIS>0.00</vPIS></PISAliq></PIS>"
+            f"<COFINS><COFINSAliq><CST>01</CST><vBC>{q * vu:.2f}</vBC><pCOFINS>7.60</pCOFINS><vCOFINS>0.00</vCOFINS>"
+            f"</COFINSAliq></COFINS></imposto></det>")
+
+
+def gerar_nfe(n: int, itens: int = 10, seed: int = 0, autorizadas: float = 0.8) -> list[bytes]:
+    """`n` XML de NF-e modelo 55 com `itens` itens cada; a fração `autorizadas` vem
+    embrulhada em <nfeProc> com protocolo, o resto só com <NFe>."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for k in range(n):
+        chave = f"3525{k:040d}"
+        dets = "".join(_det_nfe(rng, i) for i in range(1, itens + 1))
+        dest = ("<dest><CNPJ>98765432000188</CNPJ><xNome>Cliente Ltda</xNome><enderDest><UF>SP</UF></enderDest>"
+                "<indIEDest>1</indIEDest><IE>222333444</IE></dest>") if k % 4 else \
+               "<dest><CPF>12345678901</CPF><xNome>Consumidor</xNome><indIEDest>9</indIEDest></dest>"
+        v = rng.uniform(100, 50_000)
+        inf = (f'<infNFe versao="4.00" Id="NFe{chave}"><ide><cUF>35</cUF><cNF>{k % 10**8:08d}</cNF>'
+               f"<natOp>VENDA DE MERCADORIA</natOp><mod>55</mod><serie>1</serie><nNF>{k + 1}</nNF>"
+               f"<dhEmi>2025-03-{1 + k % 28:02d}T10:{k % 60:02d}:00-03:00</dhEmi><tpNF>1</tpNF><idDest>1</idDest>"
+               f"<cMunFG>3550308</cMunFG><tpImp>1</tpImp><tpEmis>1</tpEmis></ide>"
+               f"<emit><CNPJ>12345678000199</CNPJ><xNome>Rossi Ferramentas Ltda</xNome><xFant>Rossi</xFant>"
+               f"<enderEmit><xLgr>Rua A</xLgr><nro>1</nro><xMun>Sao Paulo</xMun><UF>SP</UF></enderEmit>"
+               f"<IE>111222333</IE><CRT>3</CRT></emit>{dest}{dets}"
+               f"<total><ICMSTot><vBC>{v:.2f}</vBC><vICMS>{v * 0.18:.2f}</vICMS><vICMSDeson>0.00</vICMSDeson>"
+               f"<vFCP>0.00</vFCP><vBCST>0.00</vBCST><vST>0.00</vST><vProd>{v:.2f}</vProd><vFrete>0.00</vFrete>"
+               f"<vSeg>0.00</vSeg><vDesc>0.00</vDesc><vII>0.00</vII><vIPI>0.00</vIPI><vPIS>{v * 0.0165:.2f}</vPIS>"
+               f"<vCOFINS>{v * 0.076:.2f}</vCOFINS><vOutro>0.00</vOutro><vNF>{v:.2f}</vNF></ICMSTot></total>"
+               f"<transp><modFrete>9</modFrete></transp>"
+               f"<pag><detPag><tPag>15</tPag><vPag>{v / 2:.2f}</vPag></detPag><detPag><tPag>01</tPag>"
+               f"<vPag>{v / 2:.2f}</vPag></detPag></pag></infNFe>")
+        nfe = f'<NFe xmlns="{NS_NFE}">{inf}</NFe>'
+        if rng.random() < autorizadas:
+            xml = (f'<?xml version="1.0" encoding="UTF-8"?><nfeProc xmlns="{NS_NFE}" versao="4.00">{nfe}'
+                   f'<protNFe versao="4.00"><infProt><tpAmb>1</tpAmb><chNFe>{chave}</chNFe><cStat>100</cStat>'
+                   f"<xMotivo>Autorizado o uso da NF-e</xMotivo></infProt></protNFe></nfeProc>")
+        else:
+            xml = f'<?xml version="1.0" encoding="UTF-8"?>{nfe}'
+        out.append(xml.encode("utf-8"))
+    return out
@@ -0,0 +1,2 @@
+# core/__init__.py
+# Código compartilhado entre as páginas (fora de pages/ para o Streamlit não listar como página).
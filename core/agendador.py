@@ -0,0 +1,178 @@
+# core/agendador.py
+# Agendador de chamadas ao Google Sheets no processo: token bucket no tamanho da cota,
+# escritas com prioridade sobre leituras e leituras idênticas simultâneas mescladas.
+import threading
+import time
+from collections import Counter, deque
+
+from gspread.exceptions import APIError
+
+from core.rastreio import tamanho_payload
+
+LEITURA = "leitura"
+ESCRITA = "escrita"
+
+
+class _Voo:
+    """Leitura em andamento compartilhada por quem pediu a mesma chave."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro: BaseException | None = None
+
+
+class QuotaScheduler:
+    """Token bucket de `por_minuto` requisições (cota por usuário do Sheets = 60/min).
+
+    Escritas podem usar qualquer token; leituras só passam se nenhuma escrita estiver
+    esperando e se sobrarem `reserva_escrita` tokens depois delas. `relogio` (segundos,
+    monotônico) só muda nos testes.
+    """
+
+    def __init__(self, por_minuto: int = 60, reserva_escrita: int = 5, rastreador=None,
+                 relogio=time.monotonic):
+        self.capacidade = float(por_minuto)
+        self.taxa       = por_minuto / 60.0     # tokens por segundo
+        self.reserva    = reserva_escrita
+        self.tokens     = float(por_minuto)
+        self.relogio    = relogio
+        self._t         = relogio()
+        self.cond       = threading.Condition()
+        self.esperando  = {ESCRITA: 0, LEITURA: 0}
+        self.esperas    = {ESCRITA: deque(maxlen=500), LEITURA: deque(maxlen=500)}
+        self.chamadas   = Counter()
+        self.mescladas  = 0
+        self.limitadas  = 0                     # respostas 429 recebidas
+        self._em_voo: dict = {}
+        self.rastreador = rastreador            # core/rastreio.Rastreador (opcional)
+
+    # ---- bucket ----
+    def _repor(self) -> None:
+        agora = self.relogio()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self._t) * self.taxa)
+        self._t = agora
+
+    def _adquirir(self, tipo: str) -> float:
+        t0 = self.relogio()
+        minimo = 1 if tipo == ESCRITA else 1 + self.reserva
+        with self.cond:
+            self.esperando[tipo] += 1
+            try:
+                while True:
+                    self._repor()
+                    livre = tipo == ESCRITA or self.esperando[ESCRITA] == 0
+                    if livre and self.tokens >= minimo:
+                        self.tokens -= 1
+                        break
+                    falta = max(minimo - self.tokens, 0) / self.taxa
+                    self.cond.wait(timeout=max(falta, 0.05))
+            finally:
+                self.esperando[tipo] -= 1
+                self.cond.notify_all()
+        espera = self.relogio() - t0
+        self.esperas[tipo].append(espera)
+        self.chamadas[tipo] += 1
+        return espera
+
+    def _chamar(self, tipo: str, fn, args, kwargs, op: str | None, rastreador=None):
+        espera = self._adquirir(tipo)
+        t0 = time.perf_counter()
+        resultado, erro = None, None
+        try:
+            resultado = fn(*args, **kwargs)
+            return resultado
+        except APIError as e:
+            erro = f"APIError {getattr(e.response, 'status_code', '')}: {e}"
+            if getattr(e.response, "status_code", None) == 429:
+                with self.cond:  # cota estourada (outro processo/projeto): esvazia o bucket
+                    self.limitadas += 1
+                    self.tokens = min(self.tokens, 0.0)
+            raise
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            rastreador = rastreador or self.rastreador
+            if rastreador is not None:
+                payload = resultado if tipo == LEITURA else (args, kwargs)
+                rastreador.registrar(
+                    op or getattr(fn, "__name__", "chamada"), time.perf_counter() - t0,
+                    espera=espera, nbytes=tamanho_payload(payload), erro=erro,
+                )
+
+    # ---- API ----
+    def executar(self, tipo: str, fn, *args, chave=None, op: str | None = None, rastreador=None, **kwargs):
+        """Executa `fn(*args, **kwargs)` respeitando a cota.
+
+        Para leituras com `chave`, chamadas simultâneas com a mesma chave esperam
+        a primeira e recebem o mesmo resultado (uma única requisição). `op` nomeia
+        a chamada no rastreio (padrão: nome da função); `rastreador` substitui o do
+        agendador nesta chamada.
+        """
+        if tipo != LEITURA or chave is None:
+            return self._chamar(tipo, fn, args, kwargs, op, rastreador)
+        with self.cond:
+            voo = self._em_voo.get(chave)
+            dono = voo is None
+            if dono:
+                voo = self._em_voo[chave] = _Voo()
+            else:
+                self.mescladas += 1
+        if not dono:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado
+        try:
+            voo.resultado = self._chamar(tipo, fn, args, kwargs, op, rastreador)
+            return voo.resultado
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self.cond:
+                self._em_voo.pop(chave, None)
+            voo.evento.set()
+
+    def stats(self) -> dict:
+        """Fila atual, tokens disponíveis e tempos de espera (s) por tipo."""
+        def pct(xs, p):
+            if not xs:
+                return 0.0
+            xs = sorted(xs)
+            return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+        with self.cond:
+            self._repor()
+            out = {
+                "tokens": round(self.tokens, 1),
+                "capacidade": int(self.capacidade),
+                "mescladas": self.mescladas,
+                "limitadas_429": self.limitadas,
+            }
+            for tipo in (ESCRITA, LEITURA):
+                esperas = list(self.esperas[tipo])
+                out[tipo] = {
+                    "fila": self.esperando[tipo],
+                    "chamadas": self.chamadas[tipo],
+                    "espera_p50": pct(esperas, 0.50),
+                    "espera_p95": pct(esperas, 0.95),
+                    "espera_max": max(esperas, default=0.0),
+                }
+        return out
+
+
+class VistaAgendador:
+    """Um QuotaScheduler compartilhado visto por um pool: mesma cota, mas as chamadas
+    vão para o rastreador do pool (cada empresa vê só as suas)."""
+
+    def __init__(self, agendador: QuotaScheduler, rastreador=None):
+        self.base = agendador
+        self.rastreador = rastreador
+
+    def executar(self, tipo: str, fn, *args, chave=None, op: str | None = None, **kwargs):
+        return self.base.executar(tipo, fn, *args, chave=chave, op=op, rastreador=self.rastreador, **kwargs)
+
+    def stats(self) -> dict:
+        return self.base.stats()
@@ -0,0 +1,144 @@
+# core/cache_nfe.py
+# Cache local (SQLite) das NF-e já lidas pelo pages/xml.py: o resultado da leitura
+# (cabeçalho, itens, erro) fica guardado pelo hash do conteúdo do XML, então reimportar
+# o mesmo ZIP (ou ZIPs que se sobrepõem) só lê do disco o que já foi visto.
+# A chave é só o conteúdo: duas versões de uma nota são duas entradas, e qual delas vale
+# quem decide é importar_xmls (a última lida), como sem cache.
+# O arquivo tem teto de tamanho; passando dele, saem as entradas usadas há mais tempo.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import streamlit as st
+
+from core.nfe import VERSAO_EXTRATOR
+
+CACHE_PATH = os.environ.get("NFE_CACHE_PATH", os.path.join("data", "nfe_cache.sqlite"))
+LIMITE_MB  = float(os.environ.get("NFE_CACHE_MB", 512))
+FOLGA      = 0.9      # ao estourar o teto, descarta até ficar em 90% dele
+LOTE_SQL   = 500      # hashes por consulta (limite de parâmetros do SQLite)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS xml (
+    hash       TEXT    PRIMARY KEY,     -- blake2b(versão do extrator + bytes do XML)
+    resultado  BLOB    NOT NULL,        -- JSON (header, itens em colunas, erro) comprimido
+    bytes      INTEGER NOT NULL,
+    usado_em   REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_xml_usado ON xml (usado_em);
+"""
+
+
+def hash_xml(blob: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(VERSAO_EXTRATOR.encode())
+    h.update(blob)
+    return h.hexdigest()
+
+
+class CacheNFe:
+    """Resultados de leitura de NF-e por hash do conteúdo, com teto em bytes (LRU)."""
+
+    def __init__(self, path: str = CACHE_PATH, limite_mb: float = LIMITE_MB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.limite = int(limite_mb * 2**20)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        (total,) = self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM xml").fetchone()
+        self.total = int(total)
+        self.acertos = self.gravados = self.descartes = 0
+
+    def hashes(self, blobs: list[bytes]) -> list[str]:
+        return [hash_xml(b) for b in blobs]
+
+    def buscar(self, hashes: list[str]) -> dict[str, tuple]:
+        """{hash: (header, itens, erro)} dos hashes já no cache (e marca como usados);
+        os itens vêm em colunas ({coluna: valores}), que importar_xmls aceita direto."""
+        unicos = list(dict.fromkeys(hashes))
+        achados = {}
+        with self.lock:
+            for i in range(0, len(unicos), LOTE_SQL):
+                parte = unicos[i:i + LOTE_SQL]
+                rows = self.conn.execute(
+                    f"SELECT hash, resultado FROM xml WHERE hash IN ({', '.join('?' * len(parte))})", parte
+                ).fetchall()
+                for h, blob in rows:
+                    achados[h] = tuple(json.loads(zlib.decompress(blob)))
+                if rows:
+                    self.conn.execute(f"UPDATE xml SET usado_em = ? WHERE hash IN ({', '.join('?' * len(rows))})",
+                                      [time.time()] + [h for h, _ in rows])
+        self.acertos += sum(1 for h in hashes if h in achados)
+        return achados
+
+    def gravar(self, novos: dict[str, tuple]) -> None:
+        """Guarda resultados novos (hash → (header, itens, erro))."""
+        if not novos:
+            return
+        agora = time.time()
+        linhas = []
+        for h, (header, itens, erro) in novos.items():
+            # itens em colunas: JSON menor e mais rápido de ler, e já no formato de _Colunas
+            if itens is not None and not isinstance(itens, dict):
+                itens = {k: [i.get(k) for i in itens] for k in itens[0]} if itens else {}
+            res = (header, itens, erro)
+            blob = zlib.compress(json.dumps(res, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 1)
+            linhas.append((h, blob, len(blob), agora))
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self._apagar("SELECT hash, bytes FROM xml WHERE hash IN (%s)" % ", ".join("?" * len(linhas)),
+                             [l[0] for l in linhas])
+                self.conn.executemany(
+                    "INSERT INTO xml (hash, resultado, bytes, usado_em) VALUES (?, ?, ?, ?)", linhas
+                )
+                self.total += sum(l[2] for l in linhas)
+                self.gravados += len(linhas)
+                if self.total > self.limite:
+                    self._enxugar()
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                (self.total,) = self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM xml").fetchone()
+                raise
+
+    def _apagar(self, sql: str, params) -> int:
+        rows = self.conn.execute(sql, params).fetchall()
+        if rows:
+            self.conn.executemany("DELETE FROM xml WHERE hash = ?", [(h,) for h, _ in rows])
+            self.total -= sum(b for _, b in rows)
+        return len(rows)
+
+    def _enxugar(self) -> None:
+        """Descarta as entradas usadas há mais tempo até caber em FOLGA do teto."""
+        alvo, sair, liberado = int(self.limite * FOLGA), [], 0
+        for h, b in self.conn.execute("SELECT hash, bytes FROM xml ORDER BY usado_em, hash"):
+            if self.total - liberado <= alvo:
+                break
+            sair.append((h,))
+            liberado += b
+        self.conn.executemany("DELETE FROM xml WHERE hash = ?", sair)
+        self.total -= liberado
+        self.descartes += len(sair)
+
+    def limpar(self) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM xml")
+            self.conn.execute("VACUUM")
+            self.total = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            (n,) = self.conn.execute("SELECT COUNT(*) FROM xml").fetchone()
+        return {"entradas": n, "mb": round(self.total / 2**20, 1), "limite_mb": round(self.limite / 2**20, 1),
+                "acertos": self.acertos, "gravados": self.gravados, "descartes": self.descartes}
+
+
+@st.cache_resource(show_spinner=False)
+def cache_nfe(path: str = CACHE_PATH) -> CacheNFe:
+    return CacheNFe(path)
@@ -0,0 +1,197 @@
+# core/carga.py
+# Carga incremental do DataFrame de movimentações: mantém o frame já tipado e um cursor
+# de linhas; a cada atualização busca só as linhas novas (uma leitura) e anexa.
+# O frame é salvo em disco (Arrow/Feather) para o próximo processo partir dele.
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import streamlit as st
+
+from core.movimentos import SCHEMA_VERSAO, concatenar, transformar
+
+INTERVALO        = 60.0        # s entre buscas de linhas novas
+# Âncora e contagem de linhas pegam exclusões e edições da última linha lida; uma célula
+# editada no meio da aba não muda nenhuma das duas. Por isso, de propósito, há também
+# uma recarga total periódica: limita o tempo que uma correção dessas leva para aparecer.
+RECARGA_COMPLETA = 30 * 60.0   # s
+SNAPSHOT_DIR     = os.path.join("data", "snapshots")
+
+
+def snapshot_path(alvo: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, hashlib.sha1(alvo.encode("utf-8")).hexdigest()[:16] + ".feather")
+
+
+def resumo_linhas(regs: list[dict], inicio: int = 0) -> int:
+    """Soma (mod 2**128) do hash de cada (posição, valores): a de um bloco de linhas se
+    soma à das anteriores, então anexar ou reler tudo dá o mesmo resumo."""
+    total = 0
+    for i, r in enumerate(regs, inicio):
+        h = hashlib.blake2b(repr((i, tuple(r.values()))).encode("utf-8"), digest_size=16)
+        total += int.from_bytes(h.digest(), "little")
+    return total % 2**128
+
+
+def hash_marca(cursor: int, header, ultima, conteudo: int = 0) -> str:
+    # snapshot de outro esquema não bate; `conteudo` (resumo_linhas) pega edições no meio
+    dados = [SCHEMA_VERSAO, cursor, header, ultima, conteudo]
+    return hashlib.sha256(json.dumps(dados, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def salvar_snapshot(path: str, df: pd.DataFrame, cursor: int, header: list[str], ultima: dict | None,
+                    linhas: int | None = None, conteudo: int = 0) -> None:
+    """Grava o frame (Feather sem compressão, mapeável em memória) com a marca d'água
+    {cursor, linhas, cabeçalho, última linha, resumo, hash} nos metadados do schema.
+    Escrita atômica."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    marca = {"cursor": cursor, "linhas": cursor if linhas is None else linhas, "header": header,
+             "ultima": ultima, "conteudo": conteudo, "hash": hash_marca(cursor, header, ultima, conteudo)}
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(tabela.schema.metadata or {})
+    meta[b"marca"] = json.dumps(marca, ensure_ascii=False, default=str).encode("utf-8")
+    tmp = f"{path}.tmp"
+    feather.write_feather(tabela.replace_schema_metadata(meta), tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+
+def carregar_snapshot(path: str) -> tuple[pd.DataFrame, dict] | None:
+    """(frame, marca) do snapshot, ou None se ausente/corrompido."""
+    try:
+        with pa.memory_map(path, "r") as src:
+            tabela = pa.ipc.open_file(src).read_all()
+        marca = json.loads(tabela.schema.metadata[b"marca"])
+        if marca.get("hash") != hash_marca(marca["cursor"], marca["header"], marca["ultima"],
+                                           marca.get("conteudo", 0)):
+            return None
+        return tabela.to_pandas(), marca
+    except Exception:
+        return None
+
+
+def continua(header, ultima, linhas: int, delta: tuple) -> bool:
+    """O `delta` (de MovimentosStorage.delta) só acrescenta linhas ao que já foi lido?
+    Cabeçalho e âncora iguais, e o total do storage é o já lido mais as novas."""
+    header_atual, ultima_atual, regs, _, total = delta
+    return header_atual == header and ultima_atual == ultima and total == linhas + len(regs)
+
+
+class CargaIncremental:
+    """Frame tipado + cursor. Recarrega tudo se o cabeçalho mudar, se a linha âncora
+    (última já lida) não bater mais ou se o total de linhas do storage não for o já lido
+    mais as novas — sinais de linhas editadas/excluídas.
+
+    Com `snapshot`, parte do arquivo salvo pelo processo anterior e só reconcilia a diferença.
+    """
+
+    def __init__(self, snapshot: str | None = None):
+        self.lock      = threading.Lock()
+        self.snapshot  = snapshot
+        self.df        = pd.DataFrame()
+        self.cursor    = 0
+        self.linhas    = 0                     # registros brutos lidos até o cursor
+        self.header: list[str] | None = None
+        self.ultima: dict | None = None        # registro bruto na posição do cursor
+        self.conteudo  = 0                     # resumo_linhas de tudo o que foi lido
+        self.t_completa    = 0.0
+        self.t_atualizacao = 0.0
+        self.recargas  = 0
+        self.versao    = 0                     # muda a cada recarga/anexação
+        self.geracao   = 0                     # muda quando o frame não é só o anterior + linhas novas
+        self._versao_salva = 0
+        if snapshot:
+            self._abrir_snapshot()
+
+    def _abrir_snapshot(self) -> None:
+        carregado = carregar_snapshot(self.snapshot)
+        if carregado is None:
+            return
+        self.df, marca = carregado
+        self.cursor = marca["cursor"]
+        self.linhas = marca.get("linhas", self.cursor)
+        self.header, self.ultima = marca["header"], marca["ultima"]
+        self.conteudo = marca.get("conteudo", 0)
+        self.t_completa = time.time()
+
+    def _salvar_snapshot(self) -> None:
+        if not self.snapshot or self.versao == self._versao_salva:
+            return
+        try:
+            salvar_snapshot(self.snapshot, self.df, self.cursor, self.header, self.ultima,
+                            self.linhas, self.conteudo)
+            self._versao_salva = self.versao
+        except Exception:
+            pass  # snapshot é só aceleração; falha de disco não impede o relatório
+
+    def _recarregar(self, storage) -> None:
+        header, _, regs, cursor, _ = storage.delta(0)
+        self.df = transformar(regs)
+        self.header, self.cursor, self.linhas = header, cursor, len(regs)
+        self.conteudo = resumo_linhas(regs)
+        self.ultima = regs[-1] if regs else None
+        self.t_completa = time.time()
+        self.recargas += 1
+        self.versao += 1
+        self.geracao += 1
+
+    def _anexar(self, regs: list[dict], cursor: int) -> None:
+        novo = transformar(regs)
+        if not novo.empty:
+            if self.df.empty:
+                self.df = novo
+            else:
+                em_ordem = novo["TS"].iloc[0] >= self.df["TS"].iloc[-1]
+                df = concatenar(self.df, novo)
+                if em_ordem:
+                    self.df = df
+                else:
+                    self.df = df.sort_values("TS", kind="stable").reset_index(drop=True)
+                    self.geracao += 1
+        self.cursor = cursor
+        self.conteudo = (self.conteudo + resumo_linhas(regs, self.linhas)) % 2**128
+        self.linhas += len(regs)
+        self.ultima = regs[-1]
+        self.versao += 1
+
+    def estado(self) -> tuple[pd.DataFrame, int, int]:
+        """(frame, versão, geração) lidos juntos. Na mesma geração, o frame de uma versão
+        mais nova só acrescenta linhas ao fim (ver core/rollup.py)."""
+        with self.lock:
+            return self.df, self.versao, self.geracao
+
+    def marca(self) -> str | None:
+        """Hash da marca d'água atual (o mesmo do snapshot); identifica os dados carregados
+        e muda com qualquer linha diferente, inclusive numa recarga que mantém o cursor."""
+        with self.lock:
+            if self.header is None:
+                return None
+            return hash_marca(self.cursor, self.header, self.ultima, self.conteudo)
+
+    def atualizar(self, storage, forcar: bool = False) -> pd.DataFrame:
+        """Frame atualizado (compartilhado: não altere in-place)."""
+        with self.lock:
+            agora = time.time()
+            if not forcar and agora - self.t_atualizacao < INTERVALO:
+                return self.df
+            if self.header is None or forcar or agora - self.t_completa > RECARGA_COMPLETA:
+                self._recarregar(storage)
+            else:
+                delta = storage.delta(self.cursor)
+                _, _, regs, cursor, _ = delta
+                if not continua(self.header, self.ultima, self.linhas, delta):
+                    self._recarregar(storage)
+                elif regs:
+                    self._anexar(regs, cursor)
+            self._salvar_snapshot()
+            self.t_atualizacao = agora
+            return self.df
+
+
+@st.cache_resource(show_spinner=False)
+def carga_incremental(alvo: str) -> CargaIncremental:
+    """Uma carga por destino (ver MovimentosStorage.alvo), compartilhada entre sessões."""
+    return CargaIncremental(snapshot_path(alvo))
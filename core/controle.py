@@ -0,0 +1,74 @@
+# core/controle.py
+# Índice em memória da coluna Controle (OS-Item&Entrada|Saída&Afiação|Erosão),
+# compartilhado entre sessões e sincronizado incrementalmente com o storage.
+import threading
+
+import streamlit as st
+
+
+def os_item_key(os_: int, item_: int) -> str:
+    return f"{os_}-{item_}"
+
+
+def controle_key(os_: int, item_: int, mov: str, proc: str) -> str:
+    """Controle = OS-Item&Entrada|Saída&Afiação|Erosão (com acentos)."""
+    return f"{os_item_key(os_, item_)}&{mov}&{proc}"
+
+
+class ControleIndex:
+    """Chaves Controle já gravadas + cursor das linhas já lidas do storage.
+
+    `chaves` são as que já estão no storage; `pendentes` as que estão no journal
+    aguardando envio (ver core/journal.py). Ambas contam para as regras de gravação.
+    """
+
+    def __init__(self):
+        self.lock       = threading.RLock()
+        self.chaves:    set[str] = set()
+        self.pendentes: set[str] = set()
+        self.cursor     = 0                     # linhas de dados já lidas
+        self.carregado  = False
+
+    def sincronizar(self, storage) -> bool:
+        """Lê só os Controles gravados após o cursor. False se a leitura falhar."""
+        with self.lock:
+            cursor = self.cursor
+        try:
+            novas, novo_cursor = storage.controles_desde(cursor)
+        except Exception:
+            return False  # mantém o que já sabemos; tenta de novo depois
+        with self.lock:
+            if self.cursor != cursor:  # outra thread já avançou o cursor
+                return True
+            for chave in novas:
+                if chave:
+                    self.chaves.add(chave)
+                    self.pendentes.discard(chave)
+            self.cursor = novo_cursor
+            self.carregado = True
+        return True
+
+    def marcar_pendente(self, chave: str) -> None:
+        with self.lock:
+            self.pendentes.add(chave)
+
+    def registrar(self, chaves: list[str], posicao: tuple[int, int] | None = None) -> None:
+        """Move as chaves recém-gravadas para `chaves`; avança o cursor se as linhas forem as próximas."""
+        with self.lock:
+            for chave in chaves:
+                self.chaves.add(chave)
+                self.pendentes.discard(chave)
+            if posicao and posicao[0] == self.cursor + 1:
+                self.cursor = posicao[1]
+
+    def na_planilha(self, chave: str) -> bool:
+        return chave in self.chaves
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self.chaves or chave in self.pendentes
+
+
+@st.cache_resource(show_spinner=False)
+def controle_index(alvo: str) -> ControleIndex:
+    """Um índice por destino (ver MovimentosStorage.alvo)."""
+    return ControleIndex()
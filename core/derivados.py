@@ -0,0 +1,191 @@
+# core/derivados.py
+# Resultados derivados do Relatório (filtro, pareamento, agregados) memorizados por
+# (versão dos dados, período, OS, máquinas, parear por processo), com descarte LRU.
+# Um ciclo tem uma definição só, a mesma dos rollups (core/rollup.py): pareado sobre o
+# histórico inteiro do OS-Item, conta no dia da Saída e na máquina da Entrada.
+# Um cache por destino (empresa), cada um com seu orçamento de memória: uma empresa
+# grande não descarta nem disputa o cache das outras.
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.movimentos import TZ, chaves_pareamento, fmt_hms, parear
+from core.ocupacao import MapaOcupacao
+
+MAX_ENTRADAS = 32
+EXTRAS = ("MAQUINA", "OPERADOR", "QUANTIDADE")   # da Entrada (pares/abertas) ou da Saída (órfãs)
+
+
+def tamanho(valor) -> int:
+    """Bytes aproximados de um resultado (frames, arrays e contêineres deles)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sum(tamanho(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho(v) for v in valor)
+    if hasattr(valor, "__dict__") and not isinstance(valor, type):
+        return sum(tamanho(v) for v in vars(valor).values())
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Dicionário limitado: ao passar de `maximo` itens ou `max_bytes`, descarta o menos
+    usado recentemente (o item recém-calculado sempre fica)."""
+
+    def __init__(self, maximo: int = MAX_ENTRADAS, max_bytes: int | None = None):
+        self.lock   = threading.Lock()
+        self.maximo = maximo
+        self.max_bytes = max_bytes
+        self.itens: OrderedDict = OrderedDict()
+        self.tamanhos: dict = {}
+        self.bytes = 0
+        self.acertos = self.faltas = self.descartes = 0
+
+    def obter(self, chave, calcular):
+        with self.lock:
+            if chave in self.itens:
+                self.itens.move_to_end(chave)
+                self.acertos += 1
+                return self.itens[chave]
+            self.faltas += 1
+        valor = calcular()  # fora do lock: cálculos de chaves diferentes não se bloqueiam
+        nbytes = tamanho(valor) if self.max_bytes else 0
+        with self.lock:
+            if chave in self.itens:
+                self.bytes -= self.tamanhos[chave]
+            self.itens[chave] = valor
+            self.tamanhos[chave] = nbytes
+            self.bytes += nbytes
+            self.itens.move_to_end(chave)
+            while len(self.itens) > 1 and (len(self.itens) > self.maximo
+                                           or (self.max_bytes and self.bytes > self.max_bytes)):
+                antiga, _ = self.itens.popitem(last=False)
+                self.bytes -= self.tamanhos.pop(antiga)
+                self.descartes += 1
+        return valor
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"itens": len(self.itens), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "acertos": self.acertos, "faltas": self.faltas, "descartes": self.descartes}
+
+
+def particao(versao) -> str:
+    """Destino (alvo) de uma versão `(alvo, n)`; o cache é separado por destino."""
+    return str(versao[0]) if isinstance(versao, tuple) and versao else ""
+
+
+@st.cache_resource(show_spinner=False)
+def cache_derivados(alvo: str = "") -> CacheLRU:
+    """Cache do destino `alvo`, com o orçamento de memória da empresa dona (core/empresas.py)."""
+    from core.empresas import MEMORIA_MB_PADRAO, empresa_por_alvo
+    e = empresa_por_alvo(alvo) if alvo else None
+    return CacheLRU(max_bytes=(e.memoria_mb if e else MEMORIA_MB_PADRAO) * 2**20)
+
+
+def _no_periodo(ts: pd.Series, d_ini: date, d_fim: date) -> pd.Series:
+    """TS em [d_ini, d_fim] (dias locais), comparando direto com os limites, sem .dt.date."""
+    ini = pd.Timestamp(d_ini).tz_localize(TZ)
+    fim = pd.Timestamp(d_fim + timedelta(days=1)).tz_localize(TZ)
+    return (ts >= ini) & (ts < fim)
+
+
+def filtrar(df: pd.DataFrame, d_ini: date, d_fim: date, os_sel=(), maquina_sel=()) -> pd.DataFrame:
+    """Movimentações do período [d_ini, d_fim] (dias locais), das OS e máquinas escolhidas."""
+    mask = _no_periodo(df["TS"], d_ini, d_fim)
+    if os_sel:
+        mask &= df["OS"].isin(os_sel)
+    if maquina_sel:
+        mask &= df["MAQUINA"].astype(str).isin(maquina_sel)
+    return df.loc[mask]
+
+
+def selecionar(pares: tuple, d_ini: date, d_fim: date, os_sel=(), maquina_sel=()) -> tuple:
+    """Recorte de (df_pairs, df_open, df_orph) pareados sobre o histórico: pares e órfãs
+    pelo dia da Saída, abertas pelo dia da Entrada; máquina e OS de cada linha (nos pares,
+    as da Entrada), como nos baldes do rollup."""
+    out = []
+    for frame, col in zip(pares, ("Saida_TS", "Entrada_TS", "Saida_TS")):
+        mask = _no_periodo(frame[col], d_ini, d_fim)
+        if os_sel:
+            mask &= frame["OS"].isin(os_sel)
+        if maquina_sel:
+            mask &= frame["MAQUINA"].astype(str).isin(maquina_sel)
+        out.append(frame.loc[mask].reset_index(drop=True))
+    return tuple(out)
+
+
+def tempo_por_os_item(df_pairs: pd.DataFrame, por_processo: bool) -> pd.DataFrame:
+    """Agregado por OS-Item (opcionalmente por processo)."""
+    if df_pairs.empty:
+        return pd.DataFrame(columns=["OS_Item","PROC","Ciclos","Segundos","Primeiro","Ultimo","HH:MM:SS"])
+    out = (df_pairs
+        .groupby(chaves_pareamento(por_processo), as_index=False)
+        .agg(Ciclos=("Dur_s","count"),
+             Segundos=("Dur_s","sum"),
+             Primeiro=("Entrada_TS","min"),
+             Ultimo=("Saida_TS","max"))
+    )
+    out["HH:MM:SS"] = out["Segundos"].map(fmt_hms)
+    return out
+
+
+def chave_filtro(versao, d_ini, d_fim, os_sel, maquina_sel, por_processo) -> tuple:
+    return (versao, d_ini, d_fim, tuple(sorted(os_sel)), tuple(sorted(map(str, maquina_sel))), bool(por_processo))
+
+
+def calcular_relatorio(df: pd.DataFrame, d_ini, d_fim, os_sel=(), maquina_sel=(), por_processo=False) -> dict:
+    """df_pairs, df_open, df_orph e tempo_os_item para o filtro (sem memória).
+
+    Pareia o histórico inteiro só dos OS-Item com movimentação no período (o FIFO de um
+    OS-Item não depende dos outros), então o resultado é o do pareamento de tudo, recortado.
+    """
+    itens = filtrar(df, d_ini, d_fim, os_sel)["OS_Item"].unique()
+    pares = parear(df.loc[df["OS_Item"].isin(itens)], por_processo, extras=EXTRAS)
+    df_pairs, df_open, df_orph = selecionar(pares, d_ini, d_fim, os_sel, maquina_sel)
+    return {
+        "df_pairs": df_pairs, "df_open": df_open, "df_orph": df_orph,
+        "tempo_os_item": tempo_por_os_item(df_pairs, por_processo),
+    }
+
+
+def relatorio(df: pd.DataFrame, versao, d_ini, d_fim, os_sel=(), maquina_sel=(), por_processo=False) -> dict:
+    """`calcular_relatorio` memorizado por filtro.
+
+    `versao` identifica os dados (ex.: (alvo, CargaIncremental.versao)); os frames
+    devolvidos são compartilhados entre sessões e não devem ser alterados in-place.
+    """
+    chave = chave_filtro(versao, d_ini, d_fim, os_sel, maquina_sel, por_processo)
+    return cache_derivados(particao(versao)).obter(
+        chave, lambda: calcular_relatorio(df, d_ini, d_fim, os_sel, maquina_sel, por_processo))
+
+
+def ocupacao(df: pd.DataFrame, versao, d_ini, d_fim, os_sel=(), maquina_sel=(), por_processo=False) -> MapaOcupacao:
+    """Ocupação das máquinas sobre os pares do mesmo filtro (memorizada junto)."""
+    def calcular():
+        res = relatorio(df, versao, d_ini, d_fim, os_sel, maquina_sel, por_processo)
+        return MapaOcupacao(res["df_pairs"], d_ini, d_fim)
+    chave = ("ocupacao",) + chave_filtro(versao, d_ini, d_fim, os_sel, maquina_sel, por_processo)
+    return cache_derivados(particao(versao)).obter(chave, calcular)
+
+
+def opcoes_filtro(df: pd.DataFrame, versao) -> dict:
+    """Período mínimo/máximo e listas de OS/Máquina para os filtros (uma vez por versão)."""
+    def calcular():
+        return {
+            "min_d": df["TS"].min().date(),
+            "max_d": df["TS"].max().date(),
+            "os": sorted(df["OS"].dropna().unique().tolist()),
+            "maquinas": sorted(df["MAQUINA"].astype(str).unique().tolist()),
+        }
+    return cache_derivados(particao(versao)).obter(("opcoes", versao), calcular)
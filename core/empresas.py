@@ -0,0 +1,83 @@
+# core/empresas.py
+# Registro de empresas (tenants): código da empresa → planilha/aba, credencial, cota
+# e orçamento de memória dos caches. Padrões aqui; secrets podem sobrescrever/adicionar:
+#
+#   [empresas.3377]
+#   nome            = "Rossi Ferramentas"
+#   spreadsheet_url = "https://docs.google.com/spreadsheets/d/<id>/edit"
+#   worksheet       = "EntradaSaidaOS"
+#   memoria_mb      = 256                       # caches do Relatório desta empresa
+#   quota_por_minuto = 60                       # opcional (padrão: [sheets] quota_por_minuto)
+#   service_account = "GOOGLE_SERVICE_ACCOUNT"  # nome do secret com a credencial
+#   sqlite_path     = "data/movimentos-3377.sqlite"  # com STORAGE_BACKEND=sqlite
+from dataclasses import dataclass, replace
+
+import streamlit as st
+
+from core.sheets import spreadsheet_id_from_url
+
+MEMORIA_MB_PADRAO = 256
+
+
+@dataclass(frozen=True)
+class Empresa:
+    codigo: str
+    nome: str
+    spreadsheet_url: str
+    worksheet: str = "EntradaSaidaOS"
+    memoria_mb: int = MEMORIA_MB_PADRAO
+    quota_por_minuto: int | None = None
+    service_account: str = "GOOGLE_SERVICE_ACCOUNT"
+    sqlite_path: str | None = None
+
+    @property
+    def spreadsheet_id(self) -> str:
+        return spreadsheet_id_from_url(self.spreadsheet_url)
+
+
+EMPRESAS_PADRAO = {
+    "3377": Empresa(
+        codigo="3377",
+        nome="Rossi Ferramentas",
+        spreadsheet_url="https://docs.google.com/spreadsheets/d/1t82JJfHgiVeANV6fik5ShN6r30UMeDWUqDvlUK0Ok38/edit?gid=0#gid=0",
+    ),
+}
+
+
+def registro() -> dict[str, Empresa]:
+    """Empresas padrão + [empresas.<código>] dos secrets."""
+    empresas = dict(EMPRESAS_PADRAO)
+    try:
+        extras = dict(st.secrets.get("empresas", {}))
+    except Exception:  # sem secrets.toml
+        extras = {}
+    for codigo, cfg in extras.items():
+        codigo, cfg = str(codigo), dict(cfg)
+        campos = {k: cfg[k] for k in Empresa.__dataclass_fields__ if k in cfg and k != "codigo"}
+        if codigo in empresas:
+            empresas[codigo] = replace(empresas[codigo], **campos)
+        elif "spreadsheet_url" in campos:
+            empresas[codigo] = Empresa(codigo=codigo, nome=campos.pop("nome", codigo), **campos)
+    return empresas
+
+
+def empresa(codigo: str | None) -> Empresa | None:
+    return registro().get(str(codigo or "").strip())
+
+
+def empresa_por_alvo(alvo: str) -> Empresa | None:
+    """Empresa dona de um destino de storage ("<spreadsheet_id>/<aba>")."""
+    for e in registro().values():
+        if alvo == f"{e.spreadsheet_id}/{e.worksheet}":
+            return e
+    return None
+
+
+def empresa_da_sessao() -> Empresa:
+    """Empresa do login (st.session_state["empresa"]); sem cadastro, a página para."""
+    codigo = st.session_state.get("empresa", "")
+    e = empresa(codigo)
+    if e is None:
+        st.error(f"Empresa {codigo or '(sem código)'} sem planilha configurada.")
+        st.stop()
+    return e
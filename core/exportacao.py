@@ -0,0 +1,130 @@
+# core/exportacao.py
+# Exportações CSV/Excel geradas só quando o usuário clica em baixar: escritas em blocos
+# num arquivo em disco (sem montar o arquivo inteiro em memória) e reaproveitadas por
+# (chave do filtro, tabela, formato) durante alguns minutos. A chave precisa identificar
+# os dados também entre processos (ex.: marca d'água da carga, não um contador em memória).
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+EXPORT_DIR   = os.path.join("data", "exports")
+TTL          = 10 * 60.0   # s; depois disso o arquivo é gerado de novo
+MAX_ARQUIVOS = 64
+BLOCO        = 50_000      # linhas por bloco
+
+FORMATOS = {
+    "csv":  ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+_lock = threading.Lock()
+
+
+def _sem_fuso(df: pd.DataFrame) -> pd.DataFrame:
+    """Excel não guarda fuso: datas com fuso viram horário local sem fuso."""
+    cols = [c for c in df.columns if isinstance(df[c].dtype, pd.DatetimeTZDtype)]
+    return df.assign(**{c: df[c].dt.tz_localize(None) for c in cols}) if cols else df
+
+
+def escrever_csv(df: pd.DataFrame, path: str, bloco: int = BLOCO) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        df.iloc[:0].to_csv(f, index=False)
+        for i in range(0, len(df), bloco):
+            df.iloc[i:i + bloco].to_csv(f, index=False, header=False)
+
+
+def _coluna_xlsx(s: pd.Series):
+    """(valores Python, função de escrita) de um bloco de coluna; nulos viram None."""
+    nulos = s.isna().to_numpy()
+    if s.dtype.kind == "M":
+        vals, escrita = list(s.dt.to_pydatetime()), "data"
+    elif pd.api.types.is_bool_dtype(s.dtype):
+        vals, escrita = s.astype(object).tolist(), "bool"
+    elif pd.api.types.is_numeric_dtype(s.dtype):
+        vals, escrita = s.astype("float64").tolist(), "num"
+    else:
+        vals, escrita = s.astype(str).tolist(), "txt"
+    for i in np.flatnonzero(nulos):
+        vals[i] = None
+    return vals, escrita
+
+
+def escrever_xlsx(df: pd.DataFrame, path: str, aba: str = "Dados", bloco: int = BLOCO) -> None:
+    """xlsxwriter em constant_memory: cada linha vai para o disco assim que é escrita."""
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+    ws = wb.add_worksheet(aba[:31])
+    fmt_header = wb.add_format({"bold": True, "bg_color": "#F2F2F2", "border": 1})
+    fmt_data   = wb.add_format({"num_format": "dd/mm/yyyy hh:mm:ss"})
+    escritores = {
+        "data": lambda r, c, v: ws.write_datetime(r, c, v, fmt_data),
+        "bool": ws.write_boolean,
+        "num":  ws.write_number,
+        "txt":  ws.write_string,
+    }
+    df = _sem_fuso(df)
+    for j, c in enumerate(df.columns):
+        ws.write_string(0, j, str(c), fmt_header)
+        ws.set_column(j, j, max(10, min(40, len(str(c)) + 2)))
+    linha = 1
+    for i in range(0, len(df), bloco):
+        colunas = [_coluna_xlsx(df[c].iloc[i:i + bloco]) for c in df.columns]
+        fns = [escritores[e] for _, e in colunas]
+        for valores in zip(*(v for v, _ in colunas)):
+            for j, v in enumerate(valores):
+                if v is not None:
+                    fns[j](linha, j, v)
+            linha += 1
+    wb.close()
+
+
+def _path(chave: tuple, ext: str) -> str:
+    nome = hashlib.sha1(repr(chave).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(EXPORT_DIR, f"{nome}.{ext}")
+
+
+def _limpar() -> None:
+    """Mantém só os MAX_ARQUIVOS mais recentes."""
+    try:
+        arquivos = [os.path.join(EXPORT_DIR, n) for n in os.listdir(EXPORT_DIR) if not n.endswith(".tmp")]
+    except FileNotFoundError:
+        return
+    arquivos.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+    for p in arquivos[MAX_ARQUIVOS:]:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def gerar(chave: tuple, formato: str, montar, aba: str = "Dados") -> str:
+    """Caminho do arquivo de `montar()` no `formato`, gerando só se não houver um recente."""
+    path = _path(chave + (formato,), FORMATOS[formato][1])
+    try:
+        if time.time() - os.path.getmtime(path) < TTL:
+            return path
+    except OSError:
+        pass
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    df = montar()
+    if formato == "csv":
+        escrever_csv(df, tmp)
+    else:
+        escrever_xlsx(df, tmp, aba)
+    os.replace(tmp, path)  # geração concorrente da mesma chave: o último vence, ambos válidos
+    with _lock:
+        _limpar()
+    return path
+
+
+def sob_demanda(chave: tuple, formato: str, montar, aba: str = "Dados"):
+    """Callable para `st.download_button(data=...)`: só roda quando o botão é clicado."""
+    def dados() -> bytes:
+        with open(gerar(chave, formato, montar, aba), "rb") as f:
+            return f.read()
+    return dados
@@ -0,0 +1,78 @@
+# core/grade.py
+# Grade paginada no servidor: busca e ordenação rodam aqui, sobre o frame em cache, e só
+# a página visível vai para o navegador (AgGrid). As posições ordenadas/filtradas ficam
+# memorizadas por (dados, ordenação, busca), então trocar de página é só um fatiamento.
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+
+from core.derivados import cache_derivados, particao
+
+TAMANHOS = [25, 50, 100, 250]
+
+
+def posicoes(df: pd.DataFrame, chave: tuple, ordenar_por: str | None, crescente: bool, busca: str) -> np.ndarray:
+    """Posições (iloc) das linhas que casam com `busca`, na ordem pedida. Memorizado."""
+    def calcular():
+        pos = np.arange(len(df))
+        termo = busca.strip().lower()
+        if termo:
+            casa = np.zeros(len(df), dtype=bool)
+            for c in df.columns:
+                if df[c].dtype.kind in "OSU" or isinstance(df[c].dtype, (pd.CategoricalDtype, pd.StringDtype)):
+                    casa |= df[c].astype(str).str.lower().str.contains(termo, regex=False).to_numpy()
+            pos = pos[casa]
+        if ordenar_por:
+            s = df[ordenar_por].iloc[pos].reset_index(drop=True)
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype(str)
+            pos = pos[s.sort_values(ascending=crescente, kind="stable", na_position="last").index.to_numpy()]
+        return pos
+    return cache_derivados(particao(chave[0])).obter(("grade",) + chave + (ordenar_por, crescente, busca.strip().lower()), calcular)
+
+
+def pagina(df: pd.DataFrame, pos: np.ndarray, n: int, tamanho: int) -> pd.DataFrame:
+    """Página `n` (1-based) já formatada para exibição (datas em texto, categorias como str)."""
+    out = df.iloc[pos[(n - 1) * tamanho: n * tamanho]].copy()
+    for c in out.columns:
+        if out[c].dtype.kind == "M" or isinstance(out[c].dtype, pd.DatetimeTZDtype):
+            out[c] = out[c].dt.strftime("%d/%m/%Y %H:%M:%S")
+        elif isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(str)
+    return out
+
+
+def grade_paginada(df: pd.DataFrame, chave: tuple, key: str, ordem_padrao: str | None = None,
+                   altura: int = 420) -> None:
+    """Controles de busca/ordenação/página no Streamlit + AgGrid só com a página visível."""
+    colunas = list(df.columns)
+    c1, c2, c3, c4 = st.columns([2, 1.4, 0.8, 0.8])
+    with c1:
+        busca = st.text_input("Buscar", key=f"{key}_busca", placeholder="texto em qualquer coluna")
+    with c2:
+        ordenar_por = st.selectbox("Ordenar por", colunas, key=f"{key}_ordem",
+                                   index=colunas.index(ordem_padrao) if ordem_padrao in colunas else 0)
+    with c3:
+        crescente = st.radio("Sentido", ["↑", "↓"], key=f"{key}_sentido", horizontal=True) == "↑"
+    with c4:
+        tamanho = st.selectbox("Linhas", TAMANHOS, key=f"{key}_tamanho", index=1)
+
+    pos = posicoes(df, chave, ordenar_por, crescente, busca)
+    total_paginas = max(1, math.ceil(len(pos) / tamanho))
+    # a página vive só no session_state (sem value= no widget, que o Streamlit recusa junto)
+    st.session_state.setdefault(f"{key}_pagina", 1)
+    if st.session_state[f"{key}_pagina"] > total_paginas:  # busca/tamanho reduziram as páginas
+        st.session_state[f"{key}_pagina"] = total_paginas
+    n = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas,
+                        step=1, key=f"{key}_pagina")
+
+    vis = pagina(df, pos, int(n), tamanho)
+    gb = GridOptionsBuilder.from_dataframe(vis)
+    gb.configure_default_column(sortable=False, filter=False, resizable=True)  # ordenação/busca são no servidor
+    AgGrid(vis, gridOptions=gb.build(), height=altura, update_mode=GridUpdateMode.NO_UPDATE,
+           show_download_button=False, show_search=False, server_sync_strategy="server_wins",
+           key=f"{key}_grid")
+    st.caption(f"{len(pos)} linha(s) · página {n} de {total_paginas}")
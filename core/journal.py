@@ -0,0 +1,225 @@
+# core/journal.py
+# Journal local (SQLite) para os salvamentos do Operacional: o registro é gravado
+# primeiro aqui e um flusher em segundo plano envia em lotes com append_rows.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+JOURNAL_PATH    = os.environ.get("JOURNAL_PATH", os.path.join("data", "journal.sqlite"))
+LOTE_MAX        = 200     # linhas por append_rows
+INTERVALO_FLUSH = 2.0     # s entre verificações da fila
+INTERVALO_SYNC  = 15.0    # s entre leituras do índice Controle sem fila
+BACKOFF_BASE    = 2.0     # s (dobra a cada falha)
+BACKOFF_MAX     = 300.0   # s
+MAX_TENTATIVAS  = 8       # depois disso a linha fica como "falha" até reenvio manual
+RETER_ENVIADOS  = 7 * 24 * 3600  # s que linhas enviadas ficam no journal
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    alvo        TEXT    NOT NULL,             -- spreadsheet_id/worksheet
+    controle    TEXT    NOT NULL,
+    linha       TEXT    NOT NULL,             -- JSON da linha da planilha
+    status      TEXT    NOT NULL DEFAULT 'pendente',  -- pendente | falha | enviado
+    tentativas  INTEGER NOT NULL DEFAULT 0,
+    proximo_em  REAL    NOT NULL DEFAULT 0,
+    erro        TEXT,
+    criado_em   REAL    NOT NULL,
+    enviado_em  REAL,
+    UNIQUE (alvo, controle)
+);
+CREATE INDEX IF NOT EXISTS ix_journal_fila ON journal (alvo, status, proximo_em);
+"""
+
+
+class Journal:
+    """Fila durável de linhas a enviar para a planilha (uma por chave Controle)."""
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(_SCHEMA)
+
+    def enfileirar(self, alvo: str, controle: str, linha: list) -> bool:
+        """Grava a linha no journal. False se a chave já estiver lá (duplicidade)."""
+        with self.lock:
+            try:
+                self.conn.execute(
+                    "INSERT INTO journal (alvo, controle, linha, criado_em) VALUES (?, ?, ?, ?)",
+                    (alvo, controle, json.dumps(linha, ensure_ascii=False), time.time()),
+                )
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    def enfileirar_lote(self, alvo: str, itens: list[tuple[str, list]]) -> list[str]:
+        """Grava várias linhas numa única transação; devolve as chaves recusadas (já no journal)."""
+        recusadas = []
+        agora = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for controle, linha in itens:
+                    cur = self.conn.execute(
+                        "INSERT OR IGNORE INTO journal (alvo, controle, linha, criado_em) VALUES (?, ?, ?, ?)",
+                        (alvo, controle, json.dumps(linha, ensure_ascii=False), agora),
+                    )
+                    if cur.rowcount == 0:
+                        recusadas.append(controle)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return recusadas
+
+    def proximos(self, alvo: str, limite: int = LOTE_MAX) -> list[tuple[int, str, list]]:
+        """Pendentes prontos para envio (em ordem de gravação): (id, controle, linha)."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, controle, linha FROM journal "
+                "WHERE alvo = ? AND status = 'pendente' AND proximo_em <= ? ORDER BY id LIMIT ?",
+                (alvo, time.time(), limite),
+            ).fetchall()
+        return [(i, c, json.loads(l)) for i, c, l in rows]
+
+    def chaves_abertas(self, alvo: str) -> list[str]:
+        """Chaves ainda não enviadas (pendentes ou com falha)."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT controle FROM journal WHERE alvo = ? AND status != 'enviado'", (alvo,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def marcar_enviados(self, ids: list[int]) -> None:
+        if not ids:
+            return
+        agora = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE journal SET status = 'enviado', enviado_em = ?, erro = NULL WHERE id = ?",
+                [(agora, i) for i in ids],
+            )
+            self.conn.execute(
+                "DELETE FROM journal WHERE status = 'enviado' AND enviado_em < ?",
+                (agora - RETER_ENVIADOS,),
+            )
+
+    def adiar(self, ids: list[int], erro: str) -> None:
+        """Backoff exponencial por linha; após MAX_TENTATIVAS vira 'falha'."""
+        agora = time.time()
+        with self.lock:
+            for i in ids:
+                (n,) = self.conn.execute("SELECT tentativas FROM journal WHERE id = ?", (i,)).fetchone()
+                n += 1
+                espera = min(BACKOFF_BASE * 2 ** (n - 1), BACKOFF_MAX)
+                status = "falha" if n >= MAX_TENTATIVAS else "pendente"
+                self.conn.execute(
+                    "UPDATE journal SET tentativas = ?, proximo_em = ?, status = ?, erro = ? WHERE id = ?",
+                    (n, agora + espera, status, erro[:500], i),
+                )
+
+    def reenviar_falhas(self, alvo: str) -> int:
+        with self.lock:
+            cur = self.conn.execute(
+                "UPDATE journal SET status = 'pendente', tentativas = 0, proximo_em = 0 "
+                "WHERE alvo = ? AND status = 'falha'",
+                (alvo,),
+            )
+            return cur.rowcount
+
+    def status(self, alvo: str) -> dict[str, int]:
+        """Contagem por status: {'pendente': n, 'falha': n, 'enviado': n}."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM journal WHERE alvo = ? GROUP BY status", (alvo,)
+            ).fetchall()
+        out = {"pendente": 0, "falha": 0, "enviado": 0}
+        out.update(dict(rows))
+        return out
+
+    def falhas(self, alvo: str, limite: int = 100) -> list[tuple]:
+        """(controle, tentativas, erro, criado_em) das linhas com falha."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT controle, tentativas, erro, criado_em FROM journal "
+                "WHERE alvo = ? AND status = 'falha' ORDER BY id LIMIT ?",
+                (alvo, limite),
+            ).fetchall()
+
+
+class Flusher(threading.Thread):
+    """Envia as linhas pendentes do journal para o storage, em lotes, com replay idempotente.
+
+    Antes de cada lote o índice Controle é sincronizado: linhas cuja chave já está
+    gravada (ex.: append que deu timeout mas foi aplicado) são só marcadas como enviadas.
+    """
+
+    def __init__(self, journal: Journal, storage, idx, rastreador=None):
+        super().__init__(daemon=True, name=f"journal-flusher:{storage.alvo}")
+        self.journal = journal
+        self.storage = storage
+        self.idx     = idx
+        self.alvo    = storage.alvo
+        self.rastreador = rastreador
+        self.acordar = threading.Event()
+        self._ultimo_sync = 0.0
+
+    def run(self):
+        while True:
+            self.acordar.wait(timeout=INTERVALO_FLUSH)
+            self.acordar.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # erros já ficam registrados no journal; nunca derruba a thread
+
+    def flush(self) -> None:
+        while True:
+            lote = self.journal.proximos(self.alvo)
+            if not lote:
+                if time.time() - self._ultimo_sync >= INTERVALO_SYNC:
+                    self._ultimo_sync = time.time()
+                    self.idx.sincronizar(self.storage)
+                return
+            ids = [i for i, _, _ in lote]
+            t0 = time.perf_counter()
+            try:
+                if not self.idx.sincronizar(self.storage):
+                    raise RuntimeError("falha ao ler a coluna Controle")
+                self._ultimo_sync = time.time()
+                novos = [(c, l) for _, c, l in lote if not self.idx.na_planilha(c)]
+                if novos:
+                    posicao = self.storage.append([l for _, l in novos])
+                    self.idx.registrar([c for c, _ in novos], posicao)
+                self._rastrear(t0, f"{len(novos)}/{len(lote)} linhas enviadas")
+            except Exception as e:
+                self._rastrear(t0, f"{len(lote)} linhas", f"{type(e).__name__}: {e}")
+                self.journal.adiar(ids, f"{type(e).__name__}: {e}")
+                return
+            self.journal.marcar_enviados(ids)
+
+    def _rastrear(self, t0: float, detalhe: str, erro: str | None = None) -> None:
+        if self.rastreador is not None:
+            self.rastreador.registrar("flush_lote", time.perf_counter() - t0, erro=erro, detalhe=detalhe)
+
+
+@st.cache_resource(show_spinner=False)
+def journal(path: str = JOURNAL_PATH) -> Journal:
+    return Journal(path)
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_flusher(_journal: Journal, _storage, _idx, alvo: str, _rastreador=None) -> Flusher:
+    """Um flusher por destino e por processo (parâmetros com _ não entram na chave do cache)."""
+    for chave in _journal.chaves_abertas(alvo):
+        _idx.marcar_pendente(chave)
+    f = Flusher(_journal, _storage, _idx, _rastreador)
+    f.start()
+    return f
@@ -0,0 +1,109 @@
+# core/lote.py
+# Lançamento em lote do pages/Operacional.py: leitura da tabela colada/CSV ou das
+# leituras do scanner e as regras do Controle aplicadas ao lote inteiro. Funções puras
+# (sem Streamlit): o índice entra como parâmetro e a gravação fica na página.
+import re
+from io import StringIO
+
+import pandas as pd
+from unidecode import unidecode
+
+from core.controle import ControleIndex, controle_key
+
+
+def campos_validos(os_, maq, qtd, mov, proc):
+    """Campos mínimos de um lançamento (o Item pode ser 0)."""
+    return (os_ > 0) and bool(maq.strip()) and (qtd >= 1) \
+           and (mov in ("Entrada", "Saída")) and (proc in ("Afiação", "Erosão"))
+
+
+def _norm(v) -> str:
+    return unidecode(str(v if v is not None else "")).strip().lower()
+
+
+_MOVS  = {"entrada": "Entrada", "e": "Entrada", "saida": "Saída", "s": "Saída"}
+_PROCS = {"afiacao": "Afiação", "a": "Afiação", "erosao": "Erosão", "e": "Erosão"}
+_COLS_LOTE = {  # nome normalizado da coluna -> campo do registro
+    "os": "OS", "item": "Item", "quantidade": "Quantidade", "qtd": "Quantidade", "qtde": "Quantidade",
+    "maquina": "Máquina", "movimento": "Movimento", "mov": "Movimento", "entrada/saida": "Movimento",
+    "processo": "Processo", "proc": "Processo", "afiacao/erosao": "Processo",
+}
+
+
+def _int(v) -> int:
+    try:
+        return int(float(str(v).replace(",", ".")))
+    except (TypeError, ValueError):
+        return 0
+
+
+def ler_lote_tabela(texto: str) -> list[dict]:
+    """Tabela colada (Excel/planilha) ou CSV com cabeçalho: OS, Item, Quantidade, Máquina, Movimento, Processo."""
+    df = pd.read_csv(StringIO(texto), sep=None, engine="python", dtype=str, keep_default_na=False)
+    df = df.rename(columns={c: _COLS_LOTE.get(_norm(c), c) for c in df.columns})
+    faltando = [c for c in ("OS", "Item", "Máquina", "Movimento", "Processo") if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes: {', '.join(faltando)}")
+    if "Quantidade" not in df.columns:
+        df["Quantidade"] = "1"
+    return [
+        {
+            "OS": _int(r["OS"]),
+            "Item": _int(r["Item"]),
+            "Quantidade": _int(r["Quantidade"]),
+            "Máquina": str(r["Máquina"]).strip(),
+            "Movimento": _MOVS.get(_norm(r["Movimento"]), str(r["Movimento"]).strip()),
+            "Processo": _PROCS.get(_norm(r["Processo"]), str(r["Processo"]).strip()),
+        }
+        for r in df.to_dict("records")
+    ]
+
+
+_RE_SCAN = re.compile(r"^\s*(\d+)\D+(\d+)(?:\D+(\d+))?\s*$")  # OS-Item[;Quantidade]
+
+
+def ler_lote_scan(texto: str, maq: str, qtd: int, mov: str | None, proc: str | None) -> tuple[list[dict], list[str]]:
+    """Uma leitura por linha ('OS-Item' ou 'OS-Item;Qtd'); demais campos valem para o lote todo."""
+    registros, invalidas = [], []
+    for ln in texto.splitlines():
+        if not ln.strip():
+            continue
+        m = _RE_SCAN.match(ln)
+        if not m:
+            invalidas.append(ln.strip())
+            continue
+        registros.append({
+            "OS": int(m.group(1)), "Item": int(m.group(2)),
+            "Quantidade": int(m.group(3)) if m.group(3) else int(qtd),
+            "Máquina": maq.strip(), "Movimento": mov, "Processo": proc,
+        })
+    return registros, invalidas
+
+
+def validar_lote(registros: list[dict], idx: ControleIndex) -> tuple[list[dict], list[dict]]:
+    """Aplica as regras do Controle ao lote inteiro numa passada.
+
+    Saída é aceita se a Entrada já existe ou vem antes no próprio lote; chaves já
+    gravadas ou repetidas dentro do lote são recusadas.
+    """
+    aceitos, recusados, vistos = [], [], set()
+    for n, r in enumerate(registros, start=1):
+        motivo = None
+        if not campos_validos(r["OS"], r["Máquina"] or "", r["Quantidade"], r["Movimento"], r["Processo"]):
+            motivo = "Campos inválidos/incompletos"
+        else:
+            chave = controle_key(r["OS"], r["Item"], r["Movimento"], r["Processo"])
+            chave_entrada = controle_key(r["OS"], r["Item"], "Entrada", r["Processo"])
+            if chave in vistos:
+                motivo = "Duplicado dentro do lote"
+            elif chave in idx:
+                motivo = "Duplicidade (Controle já registrado)"
+            elif r["Movimento"] == "Saída" and chave_entrada not in idx and chave_entrada not in vistos:
+                motivo = "Saída sem Entrada"
+            else:
+                vistos.add(chave)
+        if motivo:
+            recusados.append({"Linha": n, **r, "Motivo": motivo})
+        else:
+            aceitos.append(r)
+    return aceitos, recusados
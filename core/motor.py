@@ -0,0 +1,217 @@
+# core/motor.py
+# Motor do Relatório sem interface: carrega as movimentações (snapshot local ou storage),
+# calcula pareamento/agregados e grava os relatórios em lote (CSV/XLSX/Parquet).
+# Com --publicar, deixa o resultado pronto para o pages/Relatorio.py carregar sem recalcular.
+#
+#   python -m core.motor --snapshot data/snapshots/<hash>.feather --saida out --formatos csv,xlsx
+#   python -m core.motor --planilha <URL> --aba EntradaSaidaOS --publicar
+#   python -m core.motor --empresa 3377 --publicar     # planilha/aba do registro (core/empresas.py)
+#
+# Sem --de/--ate o período é o dos dados, como o padrão da página.
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+from core.carga import carregar_snapshot, hash_marca, resumo_linhas
+from core.derivados import cache_derivados, calcular_relatorio
+from core.exportacao import escrever_csv, escrever_xlsx
+from core.movimentos import TZ, fmt_hms, transformar
+
+PUBLICADOS_DIR = os.path.join("data", "relatorios")
+FRAMES    = ("df_pairs", "df_open", "df_orph", "tempo_os_item")
+FORMATO   = 2      # muda com a definição/colunas dos frames (2: ciclo pareado sobre o histórico)
+RELATORIOS = {
+    "tempo_por_os_item":  "Tempo por OS-Item",
+    "entradas_sem_saida": "Entradas sem Saída",
+    "saidas_sem_entrada": "Saídas sem Entrada",
+}
+
+
+# ---------- entrada ----------
+def carregar_de_snapshot(path: str) -> tuple[pd.DataFrame, str]:
+    """(frame, marca) de um snapshot salvo pela carga incremental (core/carga.py)."""
+    carregado = carregar_snapshot(path)
+    if carregado is None:
+        raise RuntimeError(f"Snapshot ausente ou inválido: {path}")
+    df, marca = carregado
+    return df, marca["hash"]
+
+
+def carregar_de_storage(storage) -> tuple[pd.DataFrame, str]:
+    """(frame, marca) lendo a aba inteira; a marca bate com a da carga incremental da página."""
+    header, _, regs, cursor, _ = storage.delta(0)
+    return transformar(regs), hash_marca(cursor, header, regs[-1] if regs else None, resumo_linhas(regs))
+
+
+# ---------- cálculo ----------
+def filtro(df: pd.DataFrame, d_ini=None, d_fim=None, os_sel=(), maquina_sel=(), por_processo=False) -> dict:
+    """Filtro normalizado (serializável); período vazio = período dos dados."""
+    return {
+        "d_ini": (d_ini or df["TS"].min().date()).isoformat(),
+        "d_fim": (d_fim or df["TS"].max().date()).isoformat(),
+        "os": sorted(int(o) for o in os_sel),
+        "maquinas": sorted(map(str, maquina_sel)),
+        "por_processo": bool(por_processo),
+    }
+
+
+def calcular(df: pd.DataFrame, f: dict) -> dict:
+    return calcular_relatorio(df, date.fromisoformat(f["d_ini"]), date.fromisoformat(f["d_fim"]),
+                              f["os"], f["maquinas"], f["por_processo"])
+
+
+def tabelas(res: dict, por_processo: bool, agora: datetime | None = None) -> dict[str, pd.DataFrame]:
+    """Os três relatórios com as colunas mostradas na página."""
+    proc = ["PROC"] if por_processo else []
+    tempo = res["tempo_os_item"]
+    abertas = res["df_open"]
+    if not abertas.empty:
+        agora = agora or datetime.now(TZ)
+        abertas = abertas.assign(**{"Aberto_hh:mm:ss": (agora - abertas["Entrada_TS"]).dt.total_seconds().map(fmt_hms)})
+    else:
+        abertas = abertas.assign(**{"Aberto_hh:mm:ss": pd.Series(dtype=object)})
+    return {
+        "tempo_por_os_item":  tempo[["OS_Item"] + proc + ["Ciclos", "HH:MM:SS", "Primeiro", "Ultimo"]],
+        "entradas_sem_saida": abertas[["OS_Item"] + proc + ["Entrada_TS", "Aberto_hh:mm:ss"]],
+        "saidas_sem_entrada": res["df_orph"][["OS_Item"] + proc + ["Saida_TS"]],
+    }
+
+
+# ---------- saída ----------
+def exportar(tabs: dict[str, pd.DataFrame], saida: str, formatos: list[str]) -> list[str]:
+    os.makedirs(saida, exist_ok=True)
+    gerados = []
+    for nome, df in tabs.items():
+        for fmt in formatos:
+            path = os.path.join(saida, f"{nome}.{fmt}")
+            if fmt == "csv":
+                escrever_csv(df, path)
+            elif fmt == "xlsx":
+                escrever_xlsx(df, path, aba=RELATORIOS[nome])
+            elif fmt == "parquet":
+                df.to_parquet(path, index=False)
+            else:
+                raise ValueError(f"Formato desconhecido: {fmt!r} (use csv, xlsx ou parquet)")
+            gerados.append(path)
+    return gerados
+
+
+def _dir_publicado(alvo: str, pasta: str = PUBLICADOS_DIR) -> str:
+    return os.path.join(pasta, hashlib.sha1(alvo.encode("utf-8")).hexdigest()[:16])
+
+
+def publicar(res: dict, alvo: str, marca: str, f: dict, pasta: str = PUBLICADOS_DIR) -> str:
+    """Grava os frames do resultado (Parquet) + manifesto; o manifesto vai por último
+    (escrita atômica), então um leitor nunca vê um conjunto pela metade como válido."""
+    destino = _dir_publicado(alvo, pasta)
+    os.makedirs(destino, exist_ok=True)
+    for nome in FRAMES:
+        res[nome].to_parquet(os.path.join(destino, f"{nome}.parquet"), index=False)
+    manifesto = {"alvo": alvo, "marca": marca, "filtro": f, "formato": FORMATO, "gerado_em": time.time()}
+    tmp = os.path.join(destino, "manifesto.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(manifesto, fp, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(destino, "manifesto.json"))
+    return destino
+
+
+def manifesto_publicado(alvo: str, pasta: str = PUBLICADOS_DIR) -> tuple[dict, float] | None:
+    """(manifesto, mtime) do resultado publicado para o destino, ou None."""
+    path = os.path.join(_dir_publicado(alvo, pasta), "manifesto.json")
+    try:
+        with open(path, encoding="utf-8") as fp:
+            return json.load(fp), os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None
+
+
+def carregar_publicado(alvo: str, marca: str | None, f: dict, pasta: str = PUBLICADOS_DIR) -> dict | None:
+    """Resultado publicado se foi calculado sobre os mesmos dados (marca) e o mesmo filtro."""
+    lido = manifesto_publicado(alvo, pasta)
+    if (marca is None or lido is None or lido[0].get("formato") != FORMATO
+            or lido[0].get("marca") != marca or lido[0].get("filtro") != f):
+        return None
+    destino = _dir_publicado(alvo, pasta)
+    try:
+        return {nome: pd.read_parquet(os.path.join(destino, f"{nome}.parquet")) for nome in FRAMES}
+    except Exception:
+        return None
+
+
+def resultado_publicado(alvo: str, marca: str | None, f: dict) -> dict | None:
+    """`carregar_publicado` memorizado (por marca, filtro e data do manifesto) para a página."""
+    lido = manifesto_publicado(alvo)
+    if lido is None or marca is None:
+        return None
+    chave = ("publicado", alvo, marca, lido[1], json.dumps(f, sort_keys=True))
+    return cache_derivados(alvo).obter(chave, lambda: carregar_publicado(alvo, marca, f))
+
+
+# ---------- linha de comando ----------
+def _lista(txt: str | None) -> list[str]:
+    return [x.strip() for x in (txt or "").split(",") if x.strip()]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Relatórios de movimentações em lote (sem Streamlit).")
+    fonte = ap.add_mutually_exclusive_group(required=True)
+    fonte.add_argument("--snapshot", help="arquivo .feather da carga incremental")
+    fonte.add_argument("--planilha", help="URL ou ID da planilha (usa o backend de storage configurado)")
+    fonte.add_argument("--empresa", help="código da empresa: planilha/aba do registro (core/empresas.py)")
+    ap.add_argument("--aba", default="EntradaSaidaOS")
+    ap.add_argument("--de", type=date.fromisoformat, help="AAAA-MM-DD (padrão: início dos dados)")
+    ap.add_argument("--ate", type=date.fromisoformat, help="AAAA-MM-DD (padrão: fim dos dados)")
+    ap.add_argument("--os", default="", help="lista de OS separadas por vírgula")
+    ap.add_argument("--maquina", default="", help="lista de máquinas separadas por vírgula")
+    ap.add_argument("--por-processo", action="store_true")
+    ap.add_argument("--saida", help="pasta dos relatórios (CSV/XLSX/Parquet)")
+    ap.add_argument("--formatos", default="csv", help="csv,xlsx,parquet")
+    ap.add_argument("--publicar", action="store_true", help="deixa o resultado pronto para a página")
+    ap.add_argument("--alvo", help="destino para --publicar com --snapshot (ex.: <id>/EntradaSaidaOS)")
+    args = ap.parse_args(argv)
+
+    if args.snapshot:
+        df, marca = carregar_de_snapshot(args.snapshot)
+        alvo = args.alvo
+    elif args.empresa:
+        from core.empresas import empresa
+        from core.storage import movimentos_storage
+        emp = empresa(args.empresa)
+        if emp is None:
+            ap.error(f"empresa {args.empresa} sem planilha configurada")
+        storage = movimentos_storage(emp.spreadsheet_id, emp.worksheet, emp.codigo)
+        df, marca = carregar_de_storage(storage)
+        alvo = storage.alvo
+    else:
+        from core.sheets import spreadsheet_id_from_url
+        from core.storage import movimentos_storage
+        storage = movimentos_storage(spreadsheet_id_from_url(args.planilha), args.aba)
+        df, marca = carregar_de_storage(storage)
+        alvo = storage.alvo
+    if df.empty:
+        print("Sem dados.")
+        return 1
+
+    f = filtro(df, args.de, args.ate, [int(o) for o in _lista(args.os)], _lista(args.maquina), args.por_processo)
+    t = time.perf_counter()
+    res = calcular(df, f)
+    print(f"{len(df)} movimentações, {len(res['df_pairs'])} ciclos em {time.perf_counter() - t:.2f}s")
+
+    if args.saida:
+        for path in exportar(tabelas(res, f["por_processo"]), args.saida, _lista(args.formatos)):
+            print("gravado", path)
+    if args.publicar:
+        if not alvo:
+            ap.error("--publicar com --snapshot exige --alvo")
+        print("publicado em", publicar(res, alvo, marca, f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
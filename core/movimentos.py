@@ -0,0 +1,241 @@
+# core/movimentos.py
+# Regras sobre o DataFrame de movimentações: tipagem dos registros da aba (load_df)
+# e pareamento Entrada -> Saída.
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+TZ = ZoneInfo("America/Sao_Paulo")
+
+COLS_PARES    = ["OS_Item", "OS", "Item", "PROC", "Entrada_TS", "Saida_TS", "Dur_s"]
+COLS_ABERTAS  = ["OS_Item", "OS", "Item", "PROC", "Entrada_TS"]
+COLS_ORFAS    = ["OS_Item", "OS", "Item", "PROC", "Saida_TS"]
+
+
+# ========= Esquema do DataFrame de movimentações =========
+SCHEMA_VERSAO = 3           # muda quando o esquema abaixo muda (invalida snapshots)
+FMT_DATA = "%d/%m/%Y"  # HORA = HH:MM:SS
+MOV_DTYPE = pd.CategoricalDtype(["Entrada", "Saída"])
+ESQUEMA = {
+    "OS": "Int64", "ITEM": "Int64", "QUANTIDADE": "Int64",
+    "OPERADOR": "category", "MAQUINA": "category",
+    "OS_Item": "category", "PROC": "category", "MOV": MOV_DTYPE,
+    "TS": pd.DatetimeTZDtype(unit="ns", tz=TZ),   # explícito: o pandas 3 infere "us" das strings
+}
+COLUNAS = list(ESQUEMA)
+
+
+def _inteiro(s: pd.Series) -> pd.Series:
+    n = pd.to_numeric(s, errors="coerce")
+    return n.where(n == n.round()).astype("Int64")
+
+
+def transformar(rows: list[dict]) -> pd.DataFrame:
+    """Registros da aba ({header: valor}) -> DataFrame no ESQUEMA, sem linhas inválidas, ordenado por TS.
+
+    Colunas brutas (DATA, HORA, ENTRADA/SAIDA, OS- Item, Afiação/Erosão, Controle) não são mantidas.
+    """
+    if not rows:
+        return pd.DataFrame()
+
+    raw = pd.DataFrame(rows)
+    # Cabeçalho esperado:
+    # OS | ITEM | QUANTIDADE | AFIACAO/EROSAO | DATA | HORA | OPERADOR | MAQUINA |
+    # ENTRADA/SAIDA | OS- Item | Afiação/Erosão | Controle
+    def col(nome: str) -> pd.Series:
+        return raw[nome] if nome in raw else pd.Series("", index=raw.index)
+
+    df = pd.DataFrame(index=raw.index)
+    for c in ("OS", "ITEM", "QUANTIDADE"):
+        df[c] = _inteiro(col(c))
+    df["OPERADOR"] = col("OPERADOR").astype(str).str.strip()
+    df["MAQUINA"]  = col("MAQUINA").astype(str).str.strip()
+
+    # OS-Item (fallback A-B se coluna vier vazia)
+    os_item = col("OS- Item").astype(str).str.strip()
+    m = os_item.eq("")
+    os_item[m] = df["OS"].astype(str)[m] + "-" + df["ITEM"].astype(str)[m]
+    df["OS_Item"] = os_item
+
+    # Processo
+    df["PROC"] = (col("Afiação/Erosão") if "Afiação/Erosão" in raw else col("AFIACAO/EROSAO")).astype(str).str.strip()
+
+    # Movimento normalizado
+    mov = col("ENTRADA/SAIDA").astype(str).str.strip().str.lower()
+    df["MOV"] = np.select(
+        [mov.str.contains("entrada", regex=False), mov.str.contains("saída", regex=False) | mov.str.contains("saida", regex=False)],
+        ["Entrada", "Saída"], default=None,
+    )
+
+    # Timestamp com fuso São Paulo: formato fixo, convertendo só os valores distintos de
+    # DATA e HORA (poucos dias/horários, muitas linhas); o que não casar cai na inferência
+    data, hora = col("DATA").astype(str).str.strip(), col("HORA").astype(str).str.strip()
+    cod_d, uniq_d = pd.factorize(data)
+    cod_h, uniq_h = pd.factorize(hora)
+    dias  = pd.to_datetime(pd.Index(uniq_d), format=FMT_DATA, errors="coerce").to_numpy()[cod_d]
+    horas = pd.to_timedelta(pd.Index(uniq_h), errors="coerce").to_numpy()[cod_h]
+    ts = pd.Series(dias + horas, index=raw.index)
+    falhas = ts.isna() & data.ne("")
+    if falhas.any():
+        txt = data[falhas] + " " + hora[falhas]
+        iso = pd.to_datetime(txt, format="ISO8601", errors="coerce")
+        ts[falhas] = iso.fillna(pd.to_datetime(txt, dayfirst=True, errors="coerce", format="mixed"))
+    df["TS"] = ts.dt.tz_localize(TZ, nonexistent="NaT", ambiguous="NaT")
+
+    df = df.dropna(subset=["OS", "ITEM", "MOV", "TS"])
+    df = df.sort_values("TS", kind="stable").reset_index(drop=True)
+    return df.astype(ESQUEMA)
+
+
+def concatenar(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Concatena dois frames do ESQUEMA sem perder os categóricos (une as categorias antes)."""
+    if a.empty:
+        return b
+    if b.empty:
+        return a
+    a, b = a.copy(deep=False), b.copy(deep=False)
+    for c, t in ESQUEMA.items():
+        if t == "category":
+            cats = a[c].cat.categories.union(b[c].cat.categories)
+            a[c] = a[c].cat.set_categories(cats)
+            b[c] = b[c].cat.set_categories(cats)
+    return pd.concat([a, b], ignore_index=True)
+
+
+def fmt_hms(secs: float) -> str:
+    secs = int(round(secs))
+    h, r = divmod(secs, 3600); m, s = divmod(r, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def chaves_pareamento(por_processo: bool) -> list[str]:
+    return ["OS_Item"] + (["PROC"] if por_processo else [])
+
+
+def _cumsum_grupo(x: np.ndarray, inicio: np.ndarray) -> np.ndarray:
+    """Soma acumulada que reinicia a cada grupo (`inicio` = índice da 1ª linha do grupo de cada linha)."""
+    c = np.cumsum(x)
+    base = np.concatenate(([0], c))[inicio]
+    return c - base
+
+
+def parear(df: pd.DataFrame, por_processo: bool = False,
+           extras: tuple[str, ...] = ()) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Pareia Entradas e Saídas por OS-Item (e Processo) em FIFO, sem laço por linha.
+
+    Retorna (df_pairs, df_open, df_orph) com a mesma semântica do laço original
+    (`parear_loop`): dentro de cada grupo, em ordem de TS, cada Saída fecha a Entrada
+    aberta mais antiga; sem Entrada aberta ela é órfã; Entradas que sobram ficam abertas.
+    Ordem de saída: grupos na ordem em que aparecem, linhas na ordem de TS.
+
+    Vetorização: com E/S = Entradas/Saídas acumuladas no grupo, o total de órfãs até
+    cada linha é o máximo acumulado de max(S - E, 0); uma Saída é órfã quando esse
+    máximo aumenta. A k-ésima Saída pareada do grupo fecha a k-ésima Entrada.
+
+    `extras` são colunas de `df` copiadas da linha de Entrada (pares e abertas) ou da
+    própria Saída (órfãs), ex.: MAQUINA/OPERADOR/QUANTIDADE para os rollups.
+    """
+    extras = list(extras)
+    vazio = (pd.DataFrame(columns=COLS_PARES + extras), pd.DataFrame(columns=COLS_ABERTAS + extras),
+             pd.DataFrame(columns=COLS_ORFAS + extras))
+    if df.empty:
+        return vazio
+
+    grupo = df.groupby(chaves_pareamento(por_processo), sort=False, observed=True).ngroup().to_numpy()
+    validas = np.flatnonzero(grupo >= 0)  # chave nula fica fora, como no groupby
+    if validas.size == 0:
+        return vazio
+    ts = df["TS"].to_numpy()
+    ordem = validas[np.lexsort((validas, ts[validas], grupo[validas]))]
+
+    g = grupo[ordem]
+    n = g.size
+    novo = np.empty(n, dtype=bool)
+    novo[0] = True
+    novo[1:] = g[1:] != g[:-1]
+    inicio = np.maximum.accumulate(np.where(novo, np.arange(n), 0))
+
+    entrada = (df["MOV"].astype(object).to_numpy()[ordem] == "Entrada")
+    saida = ~entrada
+    E = _cumsum_grupo(entrada.astype(np.int64), inicio)
+    S = _cumsum_grupo(saida.astype(np.int64), inicio)
+
+    deficit = np.maximum(S - E, 0)
+    orfas_acum = pd.Series(deficit).groupby(g).cummax().to_numpy()
+    antes = np.where(novo, 0, np.concatenate(([0], orfas_acum[:-1])))
+    orfa = saida & (orfas_acum > antes)
+    pareada = saida & ~orfa
+
+    k_saida = _cumsum_grupo(pareada.astype(np.int64), inicio)   # k-ésima Saída pareada
+    total_pareadas = np.bincount(g, weights=pareada, minlength=g.max() + 1).astype(np.int64)
+    aberta = entrada & (E > total_pareadas[g])
+
+    # posição (em `ordem`) da k-ésima Entrada de cada grupo
+    pos_entradas = np.flatnonzero(entrada)
+    primeira_entrada = np.concatenate(([0], np.cumsum(np.bincount(g[entrada], minlength=g.max() + 1))))
+    idx_s = np.flatnonzero(pareada)
+    idx_e = pos_entradas[primeira_entrada[g[idx_s]] + k_saida[idx_s] - 1]
+
+    def _cols(linhas: np.ndarray) -> dict:
+        sel = df.iloc[ordem[linhas]]
+        return {"OS_Item": sel["OS_Item"].astype(object).to_numpy(), "OS": sel["OS"].to_numpy(),
+                "Item": sel["ITEM"].to_numpy(), "PROC": sel["PROC"].astype(object).to_numpy()}
+
+    def _extras(destino: pd.DataFrame, linhas: np.ndarray) -> None:
+        sel = df.iloc[ordem[linhas]]
+        for c in extras:
+            destino[c] = sel[c].reset_index(drop=True)
+
+    ts_ord = df["TS"].iloc[ordem].reset_index(drop=True)
+    entrada_ts = ts_ord.iloc[idx_e].reset_index(drop=True)
+    saida_ts = ts_ord.iloc[idx_s].reset_index(drop=True)
+    df_pairs = pd.DataFrame(_cols(idx_s))
+    df_pairs["Entrada_TS"] = entrada_ts
+    df_pairs["Saida_TS"] = saida_ts
+    df_pairs["Dur_s"] = (saida_ts - entrada_ts).dt.total_seconds()
+    _extras(df_pairs, idx_e)
+
+    idx_o = np.flatnonzero(orfa)
+    df_orph = pd.DataFrame(_cols(idx_o))
+    df_orph["Saida_TS"] = ts_ord.iloc[idx_o].reset_index(drop=True)
+    _extras(df_orph, idx_o)
+
+    idx_a = np.flatnonzero(aberta)
+    df_open = pd.DataFrame(_cols(idx_a))
+    df_open["Entrada_TS"] = ts_ord.iloc[idx_a].reset_index(drop=True)
+    _extras(df_open, idx_a)
+
+    return df_pairs[COLS_PARES + extras], df_open[COLS_ABERTAS + extras], df_orph[COLS_ORFAS + extras]
+
+
+def parear_loop(df: pd.DataFrame, por_processo: bool = False) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Implementação original (groupby + iterrows + fila). Mantida como referência para conferir `parear`."""
+    pairs, entradas_sem_saida, saidas_sem_entrada = [], [], []
+    key_cols = ["OS_Item"] + (["PROC"] if por_processo else [])
+    for _, g in df.groupby(key_cols, sort=False):
+        g = g.sort_values("TS")
+        fila = []
+        for _, r in g.iterrows():
+            if r["MOV"] == "Entrada":
+                fila.append(r)
+            else:
+                if fila:
+                    r_in = fila.pop(0)
+                    dur = (r["TS"] - r_in["TS"]).total_seconds()
+                    pairs.append({
+                        "OS_Item": r["OS_Item"], "OS": r["OS"], "Item": r["ITEM"],
+                        "PROC": r["PROC"], "Entrada_TS": r_in["TS"], "Saida_TS": r["TS"],
+                        "Dur_s": dur
+                    })
+                else:
+                    saidas_sem_entrada.append({
+                        "OS_Item": r["OS_Item"], "OS": r["OS"], "Item": r["ITEM"],
+                        "PROC": r["PROC"], "Saida_TS": r["TS"]
+                    })
+        for r_in in fila:
+            entradas_sem_saida.append({
+                "OS_Item": r_in["OS_Item"], "OS": r_in["OS"], "Item": r_in["ITEM"],
+                "PROC": r_in["PROC"], "Entrada_TS": r_in["TS"]
+            })
+    return pd.DataFrame(pairs), pd.DataFrame(entradas_sem_saida), pd.DataFrame(saidas_sem_entrada)
@@ -0,0 +1,671 @@
+# core/nfe.py
+# Leitura de XML de NF-e (modelo 55) → cabeçalho + itens, usada por pages/xml.py.
+# Fica fora da página para poder rodar em processos filhos (o pool precisa importar
+# as funções por nome). Os uploads são lidos em fluxo: um membro do ZIP por vez,
+# com só as linhas extraídas acumuladas (ver importar_xmls).
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+import zlib
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import pandas as pd
+
+# ========= Helpers e parsing =========
+NS = {"nfe": "http://www.portalfiscal.inf.br/nfe"}
+
+def _txt(el, path):
+    """Retorna texto de um subelemento (ou "") já com strip."""
+    if el is None:
+        return ""
+    x = el.find(path, NS)
+    return (x.text or "").strip() if x is not None and x.text is not None else ""
+
+def _num(el, path):
+    """Converte para float com segurança (ou 0.0)."""
+    t = _txt(el, path)
+    try:
+        return float(t.replace(",", ".")) if t else 0.0
+    except Exception:
+        return 0.0
+
+def parse_nfe_xml(xml_bytes):
+    """
+    Lê um XML de NF-e (modelo 55) e retorna:
+      header: dict com dados da nota
+      items:  list[dict] com os itens
+    Lida com namespaces oficiais da NF-e.
+    """
+    try:
+        root = ET.fromstring(xml_bytes)
+    except ET.ParseError:
+        return None, None, "XML inválido"
+
+    # Pode vir embrulhado com <nfeProc> ou só <NFe>
+    nfe = root.find(".//nfe:NFe", NS) or root
+    inf = nfe.find(".//nfe:infNFe", NS)
+    if inf is None:
+        return None, None, "NF-e não encontrada (infNFe ausente)"
+
+    # chave
+    chave = (inf.attrib.get("Id", "") or "").replace("NFe", "")
+
+    ide  = inf.find("nfe:ide", NS)
+    emit = inf.find("nfe:emit", NS)
+    dest = inf.find("nfe:dest", NS)
+    total = inf.find("nfe:total/nfe:ICMSTot", NS)
+    transp = inf.find("nfe:transp", NS)
+    pag = inf.find("nfe:pag", NS)  # em versões novas tem <pag><detPag>...
+
+    # protocolo/autorização (quando presente)
+    prot = root.find(".//nfe:protNFe", NS)
+    cStat = _txt(prot, "nfe:infProt/nfe:cStat")
+    xMotivo = _txt(prot, "nfe:infProt/nfe:xMotivo")
+
+    # ===== Cabeçalho =====
+    header = {
+        "Chave": chave,
+        "Modelo": _txt(ide, "nfe:mod"),
+        "Série": _txt(ide, "nfe:serie"),
+        "Número": _txt(ide, "nfe:nNF"),
+        "Emissão": _txt(ide, "nfe:dhEmi") or _txt(ide, "nfe:dEmi"),
+        "Tipo NF (0=Entrada,1=Saída)": _txt(ide, "nfe:tpNF"),
+        "Natureza da Operação": _txt(ide, "nfe:natOp"),
+        "Município Fato Gerador": _txt(ide, "nfe:cMunFG"),
+        "UF Emitente": _txt(emit, "nfe:enderEmit/nfe:UF"),
+        # Emitente
+        "Emit_CNPJ": _txt(emit, "nfe:CNPJ") or _txt(emit, "nfe:CPF"),
+        "Emit_Nome": _txt(emit, "nfe:xNome"),
+        "Emit_IE": _txt(emit, "nfe:IE"),
+        # Destinatário
+        "Dest_CNPJ": _txt(dest, "nfe:CNPJ") or _txt(dest, "nfe:CPF"),
+        "Dest_Nome": _txt(dest, "nfe:xNome"),
+        "Dest_IE": _txt(dest, "nfe:IE"),
+        # Totais
+        "vBC": _num(total, "nfe:vBC"),
+        "vICMS": _num(total, "nfe:vICMS"),
+        "vICMSDeson": _num(total, "nfe:vICMSDeson"),
+        "vFCP": _num(total, "nfe:vFCP"),
+        "vBCST": _num(total, "nfe:vBCST"),
+        "vST": _num(total, "nfe:vST"),
+        "vProd": _num(total, "nfe:vProd"),
+        "vFrete": _num(total, "nfe:vFrete"),
+        "vSeg": _num(total, "nfe:vSeg"),
+        "vDesc": _num(total, "nfe:vDesc"),
+        "vII": _num(total, "nfe:vII"),
+        "vIPI": _num(total, "nfe:vIPI"),
+        "vPIS": _num(total, "nfe:vPIS"),
+        "vCOFINS": _num(total, "nfe:vCOFINS"),
+        "vOutro": _num(total, "nfe:vOutro"),
+        "vNF": _num(total, "nfe:vNF"),
+        # Transporte
+        "modFrete": _txt(transp, "nfe:modFrete"),
+        # Pagamento (soma dos detPag)
+        "vPag_total": 0.0,
+        # Protocolo/Status
+        "cStat": cStat,
+        "xMotivo": xMotivo,
+    }
+
+    # Pagamento: múltiplos <detPag>
+    vpag_sum = 0.0
+    if pag is not None:
+        for det in pag.findall("nfe:detPag", NS):
+            vpag_sum += _num(det, "nfe:vPag")
+    header["vPag_total"] = vpag_sum
+
+    # ===== Itens =====
+    itens_out = []
+    for det in inf.findall("nfe:det", NS):
+        nItem = det.attrib.get("nItem", "")
+        prod = det.find("nfe:prod", NS)
+
+        icms = det.find("nfe:imposto/nfe:ICMS", NS)
+        icms_det = None
+        icms_cst = ""
+        icms_origem = ""
+        icms_aliq = 0.0
+        if icms is not None and list(icms):
+            icms_det = list(icms)[0]  # ICMS00/ICMS10/ICMS20...
+            icms_cst = _txt(icms_det, "nfe:CST") or _txt(icms_det, "nfe:CSOSN")
+            icms_origem = _txt(icms_det, "nfe:orig")
+            icms_aliq = _num(icms_det, "nfe:pICMS")
+
+        pis = det.find("nfe:imposto/nfe:PIS", NS)
+        pis_det = None
+        pis_cst = ""
+        pis_aliq = 0.0
+        if pis is not None and list(pis):
+            pis_det = list(pis)[0]
+            pis_cst = _txt(pis_det, "nfe:CST")
+            pis_aliq = _num(pis_det, "nfe:pPIS")
+
+        cofins = det.find("nfe:imposto/nfe:COFINS", NS)
+        cof_det = None
+        cof_cst = ""
+        cof_aliq = 0.0
+        if cofins is not None and list(cofins):
+            cof_det = list(cofins)[0]
+            cof_cst = _txt(cof_det, "nfe:CST")
+            cof_aliq = _num(cof_det, "nfe:pCOFINS")
+
+        item_dict = {
+            "Chave": chave,
+            "nItem": nItem,
+            "cProd": _txt(prod, "nfe:cProd"),
+            "cEAN": _txt(prod, "nfe:cEAN"),
+            "xProd": _txt(prod, "nfe:xProd"),
+            "NCM": _txt(prod, "nfe:NCM"),
+            "CFOP": _txt(prod, "nfe:CFOP"),
+            "uCom": _txt(prod, "nfe:uCom"),
+            "qCom": _num(prod, "nfe:qCom"),
+            "vUnCom": _num(prod, "nfe:vUnCom"),
+            "vProd": _num(prod, "nfe:vProd"),
+            "cEANTrib": _txt(prod, "nfe:cEANTrib"),
+            "uTrib": _txt(prod, "nfe:uTrib"),
+            "qTrib": _num(prod, "nfe:qTrib"),
+            "vUnTrib": _num(prod, "nfe:vUnTrib"),
+            "vDesc_item": _num(prod, "nfe:vDesc"),
+            "indTot": _txt(prod, "nfe:indTot"),
+            # Impostos principais
+            "ICMS_orig": icms_origem,
+            "ICMS_CST_CSOSN": icms_cst,
+            "ICMS_pICMS": icms_aliq,
+            "PIS_CST": pis_cst,
+            "PIS_pPIS": pis_aliq,
+            "COFINS_CST": cof_cst,
+            "COFINS_pCOFINS": cof_aliq,
+        }
+        itens_out.append(item_dict)
+
+    return header, itens_out, None
+
+
+# ========= Extrator em uma passada =========
+# Mesmo resultado de parse_nfe_xml, mas o documento é percorrido uma vez só, direto dos
+# eventos do expat (XMLParser com target, sem montar a árvore): cada elemento avança
+# numa árvore de caminhos a partir de <infNFe>, e a tabela abaixo diz em que campo cai
+# o texto dele. Como no find(), vale só a 1ª ocorrência de cada caminho (exceto <det> e
+# <detPag>, que se repetem); "*" é o 1º filho do grupo ICMS/PIS/COFINS (ICMS00,
+# ICMSSN102, PISAliq...). Documentos fora do padrão voltam para parse_nfe_xml.
+_PREFIXO = "{" + NS["nfe"] + "}"
+VERSAO_EXTRATOR = "1"   # mudou a saída do extrator? suba, e o cache (core/cache_nfe.py) recomeça
+
+# coluna → caminhos desde <infNFe> (alternativas, na ordem do `or`) e se é numérico
+_CAMPOS_NOTA = [
+    ("Modelo", ("ide/mod",), False),
+    ("Série", ("ide/serie",), False),
+    ("Número", ("ide/nNF",), False),
+    ("Emissão", ("ide/dhEmi", "ide/dEmi"), False),
+    ("Tipo NF (0=Entrada,1=Saída)", ("ide/tpNF",), False),
+    ("Natureza da Operação", ("ide/natOp",), False),
+    ("Município Fato Gerador", ("ide/cMunFG",), False),
+    ("UF Emitente", ("emit/enderEmit/UF",), False),
+    ("Emit_CNPJ", ("emit/CNPJ", "emit/CPF"), False),
+    ("Emit_Nome", ("emit/xNome",), False),
+    ("Emit_IE", ("emit/IE",), False),
+    ("Dest_CNPJ", ("dest/CNPJ", "dest/CPF"), False),
+    ("Dest_Nome", ("dest/xNome",), False),
+    ("Dest_IE", ("dest/IE",), False),
+    *((c, (f"total/ICMSTot/{c}",), True) for c in (
+        "vBC", "vICMS", "vICMSDeson", "vFCP", "vBCST", "vST", "vProd", "vFrete", "vSeg",
+        "vDesc", "vII", "vIPI", "vPIS", "vCOFINS", "vOutro", "vNF")),
+    ("modFrete", ("transp/modFrete",), False),
+]
+_CAMPOS_ITEM = [   # caminhos desde <det>
+    *((c, (f"prod/{c}",), False) for c in ("cProd", "cEAN", "xProd", "NCM", "CFOP", "uCom")),
+    *((c, (f"prod/{c}",), True) for c in ("qCom", "vUnCom", "vProd")),
+    ("cEANTrib", ("prod/cEANTrib",), False),
+    ("uTrib", ("prod/uTrib",), False),
+    ("qTrib", ("prod/qTrib",), True),
+    ("vUnTrib", ("prod/vUnTrib",), True),
+    ("vDesc_item", ("prod/vDesc",), True),
+    ("indTot", ("prod/indTot",), False),
+    ("ICMS_orig", ("imposto/ICMS/*/orig",), False),
+    ("ICMS_CST_CSOSN", ("imposto/ICMS/*/CST", "imposto/ICMS/*/CSOSN"), False),
+    ("ICMS_pICMS", ("imposto/ICMS/*/pICMS",), True),
+    ("PIS_CST", ("imposto/PIS/*/CST",), False),
+    ("PIS_pPIS", ("imposto/PIS/*/pPIS",), True),
+    ("COFINS_CST", ("imposto/COFINS/*/CST",), False),
+    ("COFINS_pCOFINS", ("imposto/COFINS/*/pCOFINS",), True),
+]
+
+
+class _No:
+    """Nó da árvore de caminhos: filhos por tag completa ("{ns}nome"), ou `grupo` para
+    "qualquer 1º filho"; `campo` é a chave onde o texto do elemento é guardado."""
+    __slots__ = ("filhos", "grupo", "campo", "captura", "repete", "abaixo")
+
+    def __init__(self):
+        self.filhos: dict[str, "_No"] = {}
+        self.grupo: "_No | None" = None
+        self.campo = None
+        self.captura = False            # guarda o texto (campos; <det> só marca o item)
+        self.repete = False
+        self.abaixo: list["_No"] = []   # nós da subárvore (zerados a cada repetição)
+
+
+def _arvore(caminhos: dict) -> _No:
+    raiz = _No()
+    for caminho, campo in caminhos.items():
+        no = raiz
+        for parte in caminho.split("/"):
+            if parte == "*":
+                no.grupo = no.grupo or _No()
+                no = no.grupo
+            else:
+                no = no.filhos.setdefault(_PREFIXO + parte, _No())
+        no.campo = campo
+        no.captura = campo[0] != "det"
+    return raiz
+
+
+def _marcar(no: _No, repetem: set, caminho: str = "") -> list:
+    """Marca os nós que se repetem e guarda em cada um os nós abaixo dele."""
+    filhos = list(no.filhos.items()) + ([("*", no.grupo)] if no.grupo else [])
+    todos = []
+    for parte, filho in filhos:
+        c = f"{caminho}/{parte[len(_PREFIXO):] if parte != '*' else '*'}".lstrip("/")
+        abaixo = _marcar(filho, repetem, c)
+        filho.repete = c in repetem
+        if filho.repete:
+            filho.abaixo = abaixo
+        todos += [filho] + abaixo
+    return todos
+
+
+_INF = _arvore({
+    **{p: ("nota", p) for _, alts, _ in _CAMPOS_NOTA for p in alts},
+    **{f"det/{p}": ("item", p) for _, alts, _ in _CAMPOS_ITEM for p in alts},
+    "det": ("det", None),
+    "pag/detPag/vPag": ("vPag", None),
+})
+_marcar(_INF, {"det", "pag/detPag"})
+_PROT = _arvore({"infProt/cStat": ("prot", "cStat"), "infProt/xMotivo": ("prot", "xMotivo")})
+_DET = _INF.filhos[_PREFIXO + "det"]
+_TAG_NFE, _TAG_INF, _TAG_PROT = _PREFIXO + "NFe", _PREFIXO + "infNFe", _PREFIXO + "protNFe"
+_ESPECIAIS = {_TAG_NFE, _TAG_INF, _TAG_PROT}
+_FORA = {False: (None, None, False), True: (None, None, True)}   # elemento sem campo
+
+
+def _float(t: str) -> float:
+    try:
+        return float(t.replace(",", ".")) if t else 0.0
+    except Exception:
+        return 0.0
+
+
+def _montar(campos, textos: dict) -> dict:
+    out = {}
+    for coluna, alts, numerico in campos:
+        t = ""
+        for p in alts:
+            t = textos.get(p, "")
+            if t:
+                break
+        out[coluna] = _float(t) if numerico else t
+    return out
+
+
+class _Extrator:
+    """Target do XMLParser: recebe start/data/end e preenche cabeçalho e itens."""
+
+    def __init__(self):
+        self.pilha = []           # por elemento aberto: (nó em _INF, nó em _PROT, dentro da 1ª <NFe>)
+        self.vistos = set()       # nós já visitados (1ª ocorrência); zerados por repetição
+        self.buf = None           # texto do elemento-campo aberto (até o 1º filho, como .text)
+        self.aberto = None        # campo do elemento cujo texto está sendo lido
+        self.n_nfe = 0
+        self.inf_achado = self.inf_na_1a_nfe = self.prot_achado = False
+        self.chave = ""
+        self.nota: dict = {}
+        self.prot: dict = {}
+        self.vpag = 0.0
+        self.item: dict | None = None
+        self.n_item = ""
+        self.itens = []
+
+    def _guardar(self, campo, texto: str) -> None:
+        tipo, chave = campo
+        if tipo == "item":
+            self.item[chave] = texto
+        elif tipo == "nota":
+            self.nota[chave] = texto
+        elif tipo == "vPag":
+            self.vpag += _float(texto)
+        else:
+            self.prot[chave] = texto
+
+    def start(self, tag, attrib):
+        if self.buf is not None:                  # .text termina no 1º filho
+            self._guardar(self.aberto, "".join(self.buf).strip())
+            self.buf = None
+        pilha = self.pilha
+        if not pilha:                             # raiz: o find(".//") não a considera
+            pilha.append(_FORA[False])
+            return
+        topo = pilha[-1]
+        pai = topo[0]
+        if topo[1] is None and tag not in _ESPECIAIS:
+            # caminho comum: dentro de <infNFe> (ou fora de tudo), sem protocolo
+            if pai is None:
+                pilha.append(_FORA[topo[2]])
+                return
+            no = pai.filhos.get(tag)
+            if no is None:
+                no = pai.grupo
+                if no is None or no in self.vistos:
+                    pilha.append(_FORA[topo[2]])
+                    return
+            if no.repete or no in self.vistos:
+                self._entrar(no, attrib, topo[2])
+                return
+            self.vistos.add(no)
+            if no.captura:
+                self.buf, self.aberto = [], no.campo
+            pilha.append((no, None, topo[2]))
+            return
+
+        pai_prot, na_nfe = topo[1], topo[2]
+        if tag == _TAG_NFE:
+            self.n_nfe += 1
+            na_nfe = na_nfe or self.n_nfe == 1
+        no = None
+        if pai is not None:
+            no = pai.filhos.get(tag) or (pai.grupo if pai.grupo is not None and pai.grupo not in self.vistos else None)
+        elif tag == _TAG_INF and not self.inf_achado:
+            self.inf_achado, self.inf_na_1a_nfe = True, na_nfe
+            self.chave = (attrib.get("Id", "") or "").replace("NFe", "")
+            pilha.append((_INF, None, na_nfe))
+            return
+
+        no_prot = None
+        if pai_prot is not None:
+            no_prot = pai_prot.filhos.get(tag)
+            if no_prot is not None:
+                if no_prot in self.vistos:
+                    no_prot = None
+                else:
+                    self.vistos.add(no_prot)
+                    if no_prot.campo is not None:
+                        self.buf, self.aberto = [], no_prot.campo
+        elif tag == _TAG_PROT and not self.prot_achado:
+            self.prot_achado = True
+            no_prot = _PROT
+        if no is None:
+            pilha.append((None, no_prot, na_nfe))
+        else:
+            self._entrar(no, attrib, na_nfe, no_prot)
+
+    def _entrar(self, no: _No, attrib, na_nfe: bool, no_prot=None) -> None:
+        """Abre um elemento que casou com um nó de _INF (respeitando a 1ª ocorrência)."""
+        if no.repete:
+            self.vistos.difference_update(no.abaixo)
+            if no is _DET:
+                self.item, self.n_item = {}, attrib.get("nItem", "")
+        elif no in self.vistos:
+            self.pilha.append((None, no_prot, na_nfe) if no_prot is not None else _FORA[na_nfe])
+            return
+        else:
+            self.vistos.add(no)
+            if no.captura:
+                self.buf, self.aberto = [], no.campo
+        self.pilha.append((no, no_prot, na_nfe))
+
+    def data(self, texto):
+        if self.buf is not None:
+            self.buf.append(texto)
+
+    def end(self, tag):
+        no = self.pilha.pop()[0]
+        if self.buf is not None:
+            self._guardar(self.aberto, "".join(self.buf).strip())
+            self.buf = None
+        elif no is _DET:
+            item = {"Chave": self.chave, "nItem": self.n_item}
+            item.update(_montar(_CAMPOS_ITEM, self.item))
+            self.itens.append(item)
+
+    def close(self):
+        return self
+
+
+def extrair_nfe(xml_bytes):
+    """Como parse_nfe_xml (mesmos dicts, mesmos erros), numa passada só pelo documento."""
+    ext = _Extrator()
+    parser = ET.XMLParser(target=ext)
+    try:
+        parser.feed(xml_bytes)
+        parser.close()
+    except ET.ParseError:
+        return None, None, "XML inválido"
+
+    if not ext.inf_achado:
+        return None, None, "NF-e não encontrada (infNFe ausente)"
+    if ext.n_nfe and not ext.inf_na_1a_nfe:
+        return parse_nfe_xml(xml_bytes)    # infNFe fora da 1ª <NFe>: caso raro, segue o find()
+
+    header = {"Chave": ext.chave}
+    header.update(_montar(_CAMPOS_NOTA, ext.nota))
+    header["vPag_total"] = ext.vpag
+    header["cStat"] = ext.prot.get("cStat", "")
+    header["xMotivo"] = ext.prot.get("xMotivo", "")
+    return header, ext.itens, None
+
+
+# ========= Leitura dos uploads (um XML por vez) =========
+def contar_xmls(arquivos) -> int:
+    """Quantos XML há nos uploads (pelo diretório central do ZIP, sem descompactar)."""
+    total = 0
+    for f in arquivos:
+        nome = f.name.lower()
+        if nome.endswith(".zip"):
+            try:
+                with zipfile.ZipFile(f) as z:
+                    total += sum(1 for i in z.infolist() if i.filename.lower().endswith(".xml") and not i.is_dir())
+            except zipfile.BadZipFile:
+                pass
+            f.seek(0)
+        elif nome.endswith(".xml"):
+            total += 1
+    return total
+
+
+def iterar_xmls(arquivos, erros: list) -> Iterator[bytes]:
+    """Bytes de cada XML dos uploads (.zip ou .xml), descompactados um membro por vez;
+    ZIP/membro corrompido vai para `erros` e a leitura segue."""
+    for f in arquivos:
+        nome = f.name.lower()
+        if nome.endswith(".zip"):
+            try:
+                with zipfile.ZipFile(f) as z:
+                    for info in z.infolist():
+                        if not info.filename.lower().endswith(".xml") or info.is_dir():
+                            continue
+                        try:
+                            with z.open(info) as zf:
+                                blob = zf.read()
+                        except (zipfile.BadZipFile, zlib.error, EOFError):
+                            erros.append((f"{nome}/{info.filename}", "ZIP corrompido"))
+                            continue
+                        yield blob
+            except zipfile.BadZipFile:
+                erros.append((nome, "ZIP corrompido"))
+        elif nome.endswith(".xml"):
+            yield f.read()
+
+
+# ========= Lote (serial ou em processos) =========
+MINIMO_PARALELO = 200     # abaixo disso, subir processos custa mais do que ganha
+LOTE_MAX        = 500     # XML por tarefa enviada a um processo
+LOTE_SERIAL     = 50      # XML entre atualizações do progresso no modo serial
+BUFFER_LINHAS   = 20_000  # linhas acumuladas antes de virar um bloco de DataFrame
+
+
+def nucleos() -> int:
+    """Núcleos disponíveis para este processo (respeita cgroup/affinity quando houver)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _parse_lote(blobs: list[bytes]) -> list[tuple]:
+    """Executa no processo filho: (header, itens, erro) de cada XML do lote, na ordem."""
+    return [extrair_nfe(b) for b in blobs]
+
+
+def _em_lotes(iteravel, tamanho: int) -> Iterator[list]:
+    it = iter(iteravel)
+    while lote := list(islice(it, tamanho)):
+        yield lote
+
+
+class _Pendente:
+    """Um lote a caminho: o que já veio do cache (pelo hash do conteúdo) e o que falta ler.
+    `acertos` conta os XML do lote servidos pelo cache."""
+    __slots__ = ("hashes", "prontos", "faltam", "acertos")
+
+    def __init__(self, lote: list[bytes], cache):
+        if cache is None:
+            self.hashes, self.prontos, self.faltam, self.acertos = None, {}, lote, 0
+            return
+        self.hashes = cache.hashes(lote)
+        self.prontos = cache.buscar(self.hashes)
+        self.faltam = [b for b, h in zip(lote, self.hashes) if h not in self.prontos]
+        self.acertos = len(lote) - len(self.faltam)
+
+    def completar(self, lidos: list[tuple], cache) -> list[tuple]:
+        """Resultados do lote inteiro, na ordem; os recém-lidos vão para o cache."""
+        if cache is None:
+            return lidos
+        novos = dict(zip([h for h in self.hashes if h not in self.prontos], lidos))
+        cache.gravar(novos)
+        return [self.prontos[h] if h in self.prontos else novos[h] for h in self.hashes]
+
+
+def _resultados(blobs, total: int, paralelo: bool, workers: int, cache=None) -> Iterator[tuple[list[tuple], int]]:
+    """(resultados de `_parse_lote`, acertos no cache) por lote, na ordem de entrada. No modo
+    paralelo há no máximo 2 lotes por processo em voo, então só esses XML ficam em memória
+    ao mesmo tempo. Com `cache` (core/cache_nfe.py), só os XML ainda não vistos são lidos."""
+    if not (paralelo and workers > 1 and total >= MINIMO_PARALELO):
+        for lote in _em_lotes(blobs, LOTE_SERIAL):
+            pend = _Pendente(lote, cache)
+            yield pend.completar(_parse_lote(pend.faltam), cache), pend.acertos
+        return
+
+    # ~4 lotes por processo equilibram a carga sem muito overhead de envio
+    tamanho = max(1, min(LOTE_MAX, -(-total // (workers * 4))))
+    lotes = _em_lotes(blobs, tamanho)
+    voando: deque = deque()
+    try:
+        # os processos só sobem no 1º submit: lote todo no cache não abre nenhum
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for lote in lotes:
+                pend = _Pendente(lote, cache)
+                voando.append((pool.submit(_parse_lote, pend.faltam) if pend.faltam else None, pend))
+                while len(voando) >= 2 * workers or (voando and (voando[0][0] is None or voando[0][0].done())):
+                    fut, pend = voando[0]
+                    pronto = pend.completar(fut.result() if fut else [], cache)
+                    voando.popleft()
+                    yield pronto, pend.acertos
+            while voando:
+                fut, pend = voando[0]
+                pronto = pend.completar(fut.result() if fut else [], cache)
+                voando.popleft()
+                yield pronto, pend.acertos
+    except (BrokenProcessPool, OSError):
+        # processo morreu/sem fork: o que estava em voo e o resto seguem em série
+        for _, pend in voando:
+            yield pend.completar(_parse_lote(pend.faltam), cache), pend.acertos
+        for lote in lotes:
+            pend = _Pendente(lote, cache)
+            yield pend.completar(_parse_lote(pend.faltam), cache), pend.acertos
+
+
+class _Colunas:
+    """Linhas (dicts com as mesmas chaves) acumuladas por coluna e fechadas em blocos de
+    DataFrame a cada BUFFER_LINHAS. `seq` marca de qual nota veio a linha; linhas de
+    notas repetidas depois (mesma Chave) são descartadas ao fechar cada bloco e no final."""
+
+    def __init__(self):
+        self.cols: dict[str, list] | None = None
+        self.seq: list[int] = []
+        self.blocos: list[pd.DataFrame] = []
+
+    def adicionar(self, linhas: list[dict] | dict[str, list], seq: int, ultima: dict) -> None:
+        """Acrescenta as linhas de uma nota: lista de dicts (extrator) ou já em colunas
+        {coluna: valores} (como vêm do cache)."""
+        if isinstance(linhas, dict):
+            n = len(next(iter(linhas.values()), ()))
+            colunas = linhas
+        else:
+            n = len(linhas)
+            colunas = None
+        if not n:
+            return
+        if self.cols is None:
+            self.cols = {k: [] for k in (colunas or linhas[0])}
+        for k, lista in self.cols.items():
+            if colunas is not None:
+                lista.extend(colunas.get(k) or [None] * n)
+            else:
+                lista.extend([l.get(k) for l in linhas])
+        self.seq.extend([seq] * n)
+        if len(self.seq) >= BUFFER_LINHAS:
+            self._fechar(ultima)
+
+    def _fechar(self, ultima: dict) -> None:
+        if not self.seq:
+            return
+        bloco = pd.DataFrame(self.cols)
+        bloco["_seq"] = self.seq
+        self.blocos.append(_vigentes(bloco, ultima))
+        self.cols = {k: [] for k in self.cols}
+        self.seq = []
+
+    def frame(self, ultima: dict) -> pd.DataFrame:
+        self._fechar(ultima)
+        if not self.blocos:
+            return pd.DataFrame()
+        df = pd.concat(self.blocos, ignore_index=True) if len(self.blocos) > 1 else self.blocos[0]
+        return _vigentes(df, ultima).drop(columns="_seq").reset_index(drop=True)
+
+
+def _vigentes(df: pd.DataFrame, ultima: dict) -> pd.DataFrame:
+    """Só as linhas da última ocorrência de cada Chave."""
+    return df[df["Chave"].map(ultima).to_numpy() == df["_seq"].to_numpy()]
+
+
+def importar_xmls(blobs, total: int, paralelo: bool = True, workers: int | None = None,
+                  ao_progredir=None, cache=None) -> tuple[pd.DataFrame, pd.DataFrame, list[tuple], int, int]:
+    """(df_notas, df_itens, erros, lidos, do_cache) a partir de um iterável de XML (ex.: `iterar_xmls`).
+
+    Cada XML é lido, interpretado e descartado; só as linhas extraídas ficam, em colunas.
+    Notas repetidas (mesma Chave) valem pela última lida, com os itens dela.
+    `total` (de `contar_xmls`) decide o modo paralelo e o tamanho dos lotes;
+    `ao_progredir(feitos, total)` é chamado a cada lote concluído. Com `cache`
+    (core/cache_nfe.py), XML já lidos em importações anteriores não são relidos;
+    `do_cache` conta os desta chamada (o contador do cache é do processo inteiro)."""
+    workers = workers or nucleos()
+    progresso = ao_progredir or (lambda feitos, total: None)
+    notas, itens = _Colunas(), _Colunas()
+    ultima: dict[str, int] = {}          # Chave → seq da última nota lida com ela
+    erros: list[tuple] = []
+    lidos = do_cache = 0
+    for resultados, acertos in _resultados(blobs, total, paralelo, workers, cache):
+        do_cache += acertos
+        for header, itens_out, err in resultados:
+            lidos += 1
+            if err:
+                erros.append((f"xml_{lidos}", err))
+                continue
+            ultima[header["Chave"]] = lidos
+            notas.adicionar([header], lidos, ultima)
+            itens.adicionar(itens_out, lidos, ultima)
+        progresso(lidos, max(total, lidos))
+    return notas.frame(ultima), itens.frame(ultima), erros, lidos, do_cache
@@ -0,0 +1,156 @@
+# core/ocupacao.py
+# Ocupação das máquinas a partir dos intervalos pareados (Entrada → Saída): horas ocupadas,
+# pico de OS-Items simultâneos, ociosidade e linha do tempo. Varredura pelos extremos
+# ordenados (O(n log n)), sem comparar intervalos dois a dois.
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.movimentos import TZ
+
+NS_H   = 3_600 * 10**9
+NS_DIA = 24 * NS_H
+
+
+def _ns_local(ts: pd.Series) -> np.ndarray:
+    """TS com fuso → ns do relógio local (dias/horas caem nas fronteiras locais)."""
+    return ts.dt.tz_convert(TZ).dt.tz_localize(None).astype("datetime64[ns]").to_numpy().astype(np.int64)
+
+
+def _ts_local(ns: np.ndarray) -> pd.Series:
+    return pd.Series(pd.to_datetime(ns, unit="ns")).dt.tz_localize(TZ)
+
+
+def varrer(ini: np.ndarray, fim: np.ndarray, grupo: np.ndarray):
+    """Varredura dos extremos: (grupo, t0, t1, nível) de cada trecho entre eventos
+    consecutivos do mesmo grupo, com `nível` = intervalos abertos no trecho.
+
+    Em empates a Saída vem antes da Entrada: intervalos que só se tocam não se sobrepõem.
+    Como cada intervalo soma +1 e -1, a soma acumulada global volta a 0 no fim de cada grupo.
+    """
+    n = ini.size
+    t = np.concatenate((ini, fim))
+    d = np.concatenate((np.ones(n, np.int64), -np.ones(n, np.int64)))
+    g = np.concatenate((grupo, grupo))
+    ordem = np.lexsort((d, t, g))
+    t, d, g = t[ordem], d[ordem], g[ordem]
+    nivel = np.cumsum(d)
+    mesmo = g[:-1] == g[1:]
+    return g[:-1][mesmo], t[:-1][mesmo], t[1:][mesmo], nivel[:-1][mesmo]
+
+
+def fatiar(t0: np.ndarray, t1: np.ndarray, passo: int):
+    """Quebra trechos [t0, t1) nas fronteiras de `passo` ns: (linha de origem, faixa, t0, t1)."""
+    b0 = t0 // passo
+    b1 = (t1 - 1) // passo
+    k = (b1 - b0 + 1).astype(np.int64)
+    origem = np.repeat(np.arange(t0.size), k)
+    desloc = np.arange(k.sum()) - np.repeat(np.cumsum(k) - k, k)
+    faixa = b0[origem] + desloc
+    return origem, faixa, np.maximum(t0[origem], faixa * passo), np.minimum(t1[origem], (faixa + 1) * passo)
+
+
+class MapaOcupacao:
+    """Trechos de ocupação por máquina dentro da janela [d_ini, d_fim] (dias locais)."""
+
+    def __init__(self, df_pairs: pd.DataFrame, d_ini: date, d_fim: date):
+        self.w0 = int(pd.Timestamp(d_ini).value)
+        self.w1 = int(pd.Timestamp(d_fim + timedelta(days=1)).value)
+        if df_pairs.empty:
+            self.maquinas = np.array([], dtype=object)
+            vazio = np.array([], dtype=np.int64)
+            self.g = self.t0 = self.t1 = self.nivel = vazio
+            self.n_intervalos = vazio
+            self.seg_ciclos = np.array([], dtype=float)
+            return
+        codigos, maquinas = pd.factorize(df_pairs["MAQUINA"].astype(str), sort=True)
+        self.maquinas = np.asarray(maquinas, dtype=object)
+        ini = np.clip(_ns_local(df_pairs["Entrada_TS"]), self.w0, self.w1)
+        fim = np.clip(_ns_local(df_pairs["Saida_TS"]), self.w0, self.w1)
+        ok = fim > ini
+        codigos, ini, fim = codigos[ok], ini[ok], fim[ok]
+        m = len(self.maquinas)
+        self.n_intervalos = np.bincount(codigos, minlength=m)
+        self.seg_ciclos = np.bincount(codigos, weights=(fim - ini) / 1e9, minlength=m)
+        g, t0, t1, nivel = varrer(ini, fim, codigos)
+        dur = t1 > t0
+        self.g, self.t0, self.t1, self.nivel = g[dur], t0[dur], t1[dur], nivel[dur]
+
+    def _ocupados(self):
+        oc = self.nivel > 0
+        return self.g[oc], self.t0[oc], self.t1[oc], self.nivel[oc]
+
+    def por_maquina(self) -> pd.DataFrame:
+        """Horas ocupada (união dos intervalos), pico de simultâneos, ociosidade e utilização na janela."""
+        m = len(self.maquinas)
+        cols = ["MAQUINA", "Intervalos", "Horas_ciclos", "Horas_ocupada", "Pico",
+                "Horas_ociosa", "Maior_ociosidade_h", "Utilizacao"]
+        if m == 0:
+            return pd.DataFrame(columns=cols)
+        g, t0, t1, nivel = self._ocupados()
+        ocupada = np.bincount(g, weights=(t1 - t0) / 1e9, minlength=m)
+        pico = np.zeros(m, dtype=np.int64)
+        np.maximum.at(pico, g, nivel)
+        livre = self.nivel == 0
+        gl, dl = self.g[livre], (self.t1[livre] - self.t0[livre]) / 1e9
+        ociosa = np.bincount(gl, weights=dl, minlength=m)
+        maior = np.zeros(m)
+        np.maximum.at(maior, gl, dl)
+        janela_h = (self.w1 - self.w0) / NS_H
+        return pd.DataFrame({
+            "MAQUINA": self.maquinas, "Intervalos": self.n_intervalos,
+            "Horas_ciclos": self.seg_ciclos / 3600.0, "Horas_ocupada": ocupada / 3600.0, "Pico": pico,
+            "Horas_ociosa": ociosa / 3600.0, "Maior_ociosidade_h": maior / 3600.0,
+            "Utilizacao": ocupada / 3600.0 / janela_h,
+        }, columns=cols)
+
+    def _por_faixa(self, passo: int) -> pd.DataFrame:
+        g, t0, t1, nivel = self._ocupados()
+        origem, faixa, a, b = fatiar(t0, t1, passo)
+        seg = (b - a) / 1e9
+        out = (pd.DataFrame({"g": g[origem], "faixa": faixa, "seg": seg, "nivel": nivel[origem]})
+               .groupby(["g", "faixa"], as_index=False)
+               .agg(Segundos=("seg", "sum"), Pico=("nivel", "max")))
+        out["MAQUINA"] = self.maquinas[out["g"].to_numpy()] if len(out) else []
+        out["Inicio"] = pd.to_datetime(out["faixa"].to_numpy() * passo, unit="ns")
+        out["Utilizacao"] = out["Segundos"] / (passo / 1e9)
+        return out
+
+    def por_dia(self) -> pd.DataFrame:
+        """Horas ocupada, pico e utilização (sobre 24 h) por máquina e dia."""
+        out = self._por_faixa(NS_DIA)
+        out["Dia"] = out["Inicio"].dt.date
+        out["Horas_ocupada"] = out["Segundos"] / 3600.0
+        return out[["Dia", "MAQUINA", "Horas_ocupada", "Pico", "Utilizacao"]]
+
+    def passo_automatico(self) -> int:
+        """Faixa da linha do tempo: ~no máximo algumas centenas de pontos por máquina."""
+        dias = (self.w1 - self.w0) / NS_DIA
+        if dias <= 3:
+            return NS_H // 4
+        if dias <= 45:
+            return NS_H
+        if dias <= 200:
+            return 6 * NS_H
+        return NS_DIA
+
+    def linha_tempo(self, passo: int | None = None) -> pd.DataFrame:
+        """Ocupação (%) por faixa de tempo × máquina (colunas), pronta para st.line_chart."""
+        passo = passo or self.passo_automatico()
+        out = self._por_faixa(passo)
+        faixas = pd.to_datetime(np.arange(self.w0 // passo, -(-self.w1 // passo)) * passo, unit="ns")
+        if out.empty:
+            return pd.DataFrame(index=faixas)
+        tab = out.pivot_table(index="Inicio", columns="MAQUINA", values="Utilizacao", aggfunc="sum")
+        return (tab.reindex(faixas).fillna(0.0) * 100.0).rename_axis("Inicio")
+
+    def ociosidades(self, minimo_min: float = 0.0) -> pd.DataFrame:
+        """Intervalos ociosos (nenhum OS-Item na máquina) entre o 1º e o último ciclo."""
+        livre = self.nivel == 0
+        out = pd.DataFrame({
+            "MAQUINA": self.maquinas[self.g[livre]] if livre.any() else [],
+            "Inicio": _ts_local(self.t0[livre]), "Fim": _ts_local(self.t1[livre]),
+            "Minutos": (self.t1[livre] - self.t0[livre]) / 60e9,
+        })
+        return out[out["Minutos"] >= minimo_min].sort_values("Minutos", ascending=False)
@@ -0,0 +1,106 @@
+# core/rastreio.py
+# Rastreio por chamada ao Google Sheets (latência, espera na cota, tamanho do payload, erro)
+# guardado num buffer circular por empresa (cada uma tem sua cota e suas chaves), com os
+# resumos usados na aba Configurações.
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+TAMANHO_BUFFER = 5000
+SPANS = ("salvar", "salvar_lote", "flush_lote")  # operações compostas (não são chamadas à API)
+FORA_DA_COTA = SPANS + ("auth", "refresh_token")  # não contam na cota do Sheets
+
+
+def tamanho_payload(obj) -> int:
+    """Tamanho aproximado (bytes) do JSON enviado/recebido."""
+    if obj is None:
+        return 0
+    try:
+        return len(json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8"))
+    except Exception:
+        return 0
+
+
+class Rastreador:
+    """Buffer circular de eventos {ts, op, dur, espera, bytes, erro, detalhe}."""
+
+    def __init__(self, tamanho: int = TAMANHO_BUFFER):
+        self.lock = threading.Lock()
+        self.eventos: deque[dict] = deque(maxlen=tamanho)
+
+    def registrar(self, op: str, dur: float, espera: float = 0.0, nbytes: int = 0,
+                  erro: str | None = None, detalhe: str = "") -> None:
+        with self.lock:
+            self.eventos.append({
+                "ts": time.time(), "op": op, "dur": dur, "espera": espera,
+                "bytes": nbytes, "erro": erro, "detalhe": detalhe,
+            })
+
+    @contextmanager
+    def span(self, op: str, detalhe: str = ""):
+        """Mede um bloco (ex.: um salvamento inteiro)."""
+        t0 = time.perf_counter()
+        erro = None
+        try:
+            yield
+        except BaseException as e:
+            erro = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.registrar(op, time.perf_counter() - t0, erro=erro, detalhe=detalhe)
+
+    def df(self) -> pd.DataFrame:
+        with self.lock:
+            ev = list(self.eventos)
+        cols = ["ts", "op", "dur", "espera", "bytes", "erro", "detalhe"]
+        return pd.DataFrame(ev, columns=cols).astype({"ts": float, "dur": float, "espera": float, "bytes": "int64"})
+
+    # ---- resumos ----
+    def resumo_por_operacao(self) -> pd.DataFrame:
+        """Latência p50/p95/p99 (ms), chamadas, erros e bytes médios por operação."""
+        d = self.df()
+        if d.empty:
+            return pd.DataFrame(columns=["Operação", "Chamadas", "Erros", "p50 (ms)", "p95 (ms)",
+                                         "p99 (ms)", "Espera p95 (ms)", "Bytes (média)"])
+        g = d.groupby("op")
+        out = pd.DataFrame({
+            "Chamadas": g.size(),
+            "Erros": g["erro"].count(),
+            "p50 (ms)": g["dur"].quantile(0.50) * 1000,
+            "p95 (ms)": g["dur"].quantile(0.95) * 1000,
+            "p99 (ms)": g["dur"].quantile(0.99) * 1000,
+            "Espera p95 (ms)": g["espera"].quantile(0.95) * 1000,
+            "Bytes (média)": g["bytes"].mean(),
+        }).round(1)
+        return out.rename_axis("Operação").reset_index().sort_values("p95 (ms)", ascending=False)
+
+    def chamadas_por_minuto(self, janela_min: int = 30) -> pd.DataFrame:
+        """Chamadas à API por minuto (só as que contam na cota) nos últimos `janela_min` minutos."""
+        d = self.df()
+        d = d[~d["op"].isin(FORA_DA_COTA) & (d["ts"] >= time.time() - janela_min * 60)]
+        agora = pd.Timestamp.now(tz="America/Sao_Paulo").floor("min")
+        idx = pd.date_range(end=agora, periods=janela_min, freq="min")
+        if d.empty:
+            return pd.DataFrame({"Chamadas": 0}, index=idx)
+        minuto = pd.to_datetime(d["ts"], unit="s", utc=True).dt.tz_convert("America/Sao_Paulo").dt.floor("min")
+        return minuto.value_counts().reindex(idx, fill_value=0).to_frame("Chamadas")
+
+    def mais_lentos(self, ops=SPANS, n: int = 20) -> pd.DataFrame:
+        d = self.df()
+        d = d[d["op"].isin(ops)].nlargest(n, "dur")
+        d["Quando"] = pd.to_datetime(d["ts"], unit="s", utc=True).dt.tz_convert("America/Sao_Paulo")
+        d["Duração (ms)"] = (d["dur"] * 1000).round(1)
+        return d[["Quando", "op", "Duração (ms)", "detalhe", "erro"]].rename(
+            columns={"op": "Operação", "detalhe": "Detalhe", "erro": "Erro"}
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def rastreador(empresa: str = "") -> Rastreador:
+    """Um buffer por empresa (core/empresas.py): a aba Configurações só mostra as chamadas dela."""
+    return Rastreador()
@@ -0,0 +1,198 @@
+# core/rollup.py
+# Rollups diários por Dia × MAQUINA × OPERADOR × PROC (ciclos, segundos, peças, abertos),
+# mantidos em memória e atualizados só com as linhas novas da carga incremental.
+# KPIs, série diária, gráficos por dimensão e percentis de qualquer período leem os baldes
+# em vez de reagrupar os movimentos. O ciclo é o mesmo do relatório (core/derivados.py):
+# pareado sobre o histórico, no dia da Saída e na máquina da Entrada. Com filtro de OS
+# (que não é dimensão dos baldes), `agregar` monta os mesmos baldes a partir dos pares do filtro.
+import threading
+from collections import deque
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+from core.derivados import EXTRAS
+from core.movimentos import chaves_pareamento, parear
+from core.sketch import balde
+
+DIMENSOES = ["Dia", "MAQUINA", "OPERADOR", "PROC"]
+METRICAS  = ["Ciclos", "Segundos", "Pecas", "Abertos"]
+DIM_SKETCH = ["Dia", "MAQUINA", "PROC"]   # sketches de duração (core/sketch.py), sem operador
+
+
+def _txt(v) -> str:
+    return "" if pd.isna(v) else str(v)
+
+
+def _qtd(v) -> int:
+    return 0 if pd.isna(v) else int(v)
+
+
+def _dims(frame: pd.DataFrame, col_ts: str, extras: list[str]) -> pd.DataFrame:
+    out = pd.DataFrame({"Dia": frame[col_ts].dt.date})
+    for c in extras:
+        out[c] = frame[c].astype(object).map(_txt)
+    return out
+
+
+def agregar(df_pairs: pd.DataFrame, df_open: pd.DataFrame) -> pd.DataFrame:
+    """Baldes (DIMENSOES + METRICAS) a partir de pares/abertas de `parear(..., extras=EXTRAS)`:
+    ciclo no dia da Saída, Abertos no dia da Entrada."""
+    partes = []
+    if not df_pairs.empty:
+        partes.append(_dims(df_pairs, "Saida_TS", ["MAQUINA", "OPERADOR", "PROC"]).assign(
+            Ciclos=1, Segundos=df_pairs["Dur_s"].to_numpy(),
+            Pecas=df_pairs["QUANTIDADE"].fillna(0).astype("int64").to_numpy(), Abertos=0))
+    if not df_open.empty:
+        partes.append(_dims(df_open, "Entrada_TS", ["MAQUINA", "OPERADOR", "PROC"]).assign(
+            Ciclos=0, Segundos=0.0, Pecas=0, Abertos=1))
+    if not partes:
+        return pd.DataFrame(columns=DIMENSOES + METRICAS)
+    return pd.concat(partes, ignore_index=True).groupby(DIMENSOES, as_index=False)[METRICAS].sum()
+
+
+def agregar_sketch(df_pairs: pd.DataFrame) -> pd.DataFrame:
+    """Sketches (DIM_SKETCH + Balde, N, Soma) da duração dos pares."""
+    if df_pairs.empty:
+        return pd.DataFrame(columns=DIM_SKETCH + ["Balde", "N", "Soma"])
+    sk = _dims(df_pairs, "Saida_TS", ["MAQUINA", "PROC"]).assign(
+        Balde=balde(df_pairs["Dur_s"]), Dur_s=df_pairs["Dur_s"].to_numpy())
+    return (sk.groupby(DIM_SKETCH + ["Balde"], as_index=False)["Dur_s"].agg(N="count", Soma="sum"))
+
+
+class RollupDiario:
+    """Baldes diários + filas FIFO de Entradas abertas, com o mesmo pareamento de `parear`.
+
+    O ciclo conta no dia da Saída; máquina, operador e peças vêm da Entrada (PROC da Saída).
+    `Abertos` conta, no dia da Entrada, as Entradas que ainda não fecharam.
+    Reconstrói tudo quando a carga recarrega ou reordena (muda a `geracao`); senão só
+    aplica as linhas anexadas desde a última atualização.
+
+    Junto, um sketch de quantis da duração por Dia × MAQUINA × PROC, guardado como
+    contagens por balde logarítmico: {(dia, maq, proc, balde): [n, soma_s]}.
+    """
+
+    def __init__(self, por_processo: bool = False):
+        self.lock = threading.Lock()
+        self.por_processo = por_processo
+        self.geracao = None
+        self.linhas  = 0                       # linhas do frame já aplicadas
+        self.filas: dict[tuple, deque] = {}
+        self.baldes: dict[tuple, list] = {}    # (dia, maq, op, proc) -> [ciclos, seg, peças, abertos]
+        self.sketch: dict[tuple, list] = {}    # (dia, maq, proc, balde) -> [n, soma_s]
+        self.reconstrucoes = 0
+        self._frame: pd.DataFrame | None = None
+        self._frame_sketch: pd.DataFrame | None = None
+
+    # ---------- manutenção ----------
+    def _balde(self, chave: tuple) -> list:
+        b = self.baldes.get(chave)
+        if b is None:
+            b = self.baldes[chave] = [0, 0.0, 0, 0]
+        return b
+
+    def _reconstruir(self, df: pd.DataFrame) -> None:
+        self.filas, self.baldes, self.sketch = {}, {}, {}
+        if df.empty:
+            return
+        df_pairs, df_open, _ = parear(df, self.por_processo, extras=EXTRAS)
+        for r in agregar(df_pairs, df_open).itertuples(index=False):
+            self.baldes[(r.Dia, r.MAQUINA, r.OPERADOR, r.PROC)] = [int(r.Ciclos), float(r.Segundos),
+                                                                  int(r.Pecas), int(r.Abertos)]
+        for r in agregar_sketch(df_pairs).itertuples(index=False):
+            self.sketch[(r.Dia, r.MAQUINA, r.PROC, int(r.Balde))] = [int(r.N), float(r.Soma)]
+        chaves = chaves_pareamento(self.por_processo)
+        for r in df_open.itertuples(index=False):
+            e = (r.Entrada_TS, _txt(r.MAQUINA), _txt(r.OPERADOR), _txt(r.PROC), _qtd(r.QUANTIDADE))
+            self.filas.setdefault(tuple(getattr(r, c) for c in chaves), deque()).append(e)
+
+    def _aplicar(self, novas: pd.DataFrame) -> None:
+        chaves = chaves_pareamento(self.por_processo)
+        cols = novas[["OS_Item", "PROC", "MOV", "TS", *EXTRAS]].astype(object)
+        for r in cols.itertuples(index=False):
+            chave = tuple(getattr(r, c) for c in chaves)
+            if any(pd.isna(c) for c in chave) or pd.isna(r.TS):
+                continue
+            proc = _txt(r.PROC)
+            if r.MOV == "Entrada":
+                e = (r.TS, _txt(r.MAQUINA), _txt(r.OPERADOR), proc, _qtd(r.QUANTIDADE))
+                self.filas.setdefault(chave, deque()).append(e)
+                self._balde((r.TS.date(), e[1], e[2], proc))[3] += 1
+                continue
+            fila = self.filas.get(chave)
+            if not fila:
+                continue  # Saída órfã não entra nos baldes
+            ts_e, maq, op, proc_e, qtd = fila.popleft()
+            if not fila:
+                del self.filas[chave]
+            self._balde((ts_e.date(), maq, op, proc_e))[3] -= 1
+            dur = (r.TS - ts_e).total_seconds()
+            b = self._balde((r.TS.date(), maq, op, proc))
+            b[0] += 1; b[1] += dur; b[2] += qtd
+            sk = self.sketch.setdefault((r.TS.date(), maq, proc, int(balde(dur))), [0, 0.0])
+            sk[0] += 1; sk[1] += dur
+
+    def atualizar(self, df: pd.DataFrame, geracao) -> None:
+        """Alinha os baldes ao frame da carga (ver CargaIncremental.estado)."""
+        with self.lock:
+            if geracao != self.geracao or len(df) < self.linhas:
+                self._reconstruir(df)
+                self.reconstrucoes += 1
+            elif len(df) > self.linhas:
+                self._aplicar(df.iloc[self.linhas:])
+            else:
+                return
+            self.geracao, self.linhas = geracao, len(df)
+            self._frame = self._frame_sketch = None
+
+    # ---------- consulta ----------
+    def frame(self) -> pd.DataFrame:
+        """Baldes como DataFrame (DIMENSOES + METRICAS); compartilhado, não altere in-place."""
+        with self.lock:
+            if self._frame is None:
+                linhas = [k + tuple(v) for k, v in self.baldes.items() if any(v)]
+                self._frame = pd.DataFrame(linhas, columns=DIMENSOES + METRICAS)
+            return self._frame
+
+    def frame_sketch(self) -> pd.DataFrame:
+        """Sketches como DataFrame (DIM_SKETCH + Balde, N, Soma); compartilhado."""
+        with self.lock:
+            if self._frame_sketch is None:
+                linhas = [k + tuple(v) for k, v in self.sketch.items()]
+                self._frame_sketch = pd.DataFrame(linhas, columns=DIM_SKETCH + ["Balde", "N", "Soma"])
+            return self._frame_sketch
+
+    def consultar(self, d_ini: date, d_fim: date, maquina_sel=(), sketch: bool = False) -> pd.DataFrame:
+        """Baldes (ou sketches) do período [d_ini, d_fim] e das máquinas selecionadas."""
+        f = self.frame_sketch() if sketch else self.frame()
+        mask = (f["Dia"] >= d_ini) & (f["Dia"] <= d_fim)
+        if maquina_sel:
+            mask &= f["MAQUINA"].isin([str(m) for m in maquina_sel])
+        return f.loc[mask]
+
+
+def serie(baldes: pd.DataFrame) -> pd.DataFrame:
+    """Horas/ciclos/peças por dia (dia da Saída)."""
+    out = baldes.groupby("Dia", as_index=False)[["Ciclos", "Segundos", "Pecas"]].sum()
+    out = out[out["Ciclos"] > 0]
+    out["Horas"] = out["Segundos"] / 3600.0
+    return out
+
+
+def por_dimensao(baldes: pd.DataFrame, dimensao: str) -> pd.DataFrame:
+    out = baldes.groupby(dimensao, as_index=False)[METRICAS].sum()
+    out["Horas"] = out["Segundos"] / 3600.0
+    return out.sort_values("Segundos", ascending=False)
+
+
+def kpis(baldes: pd.DataFrame) -> dict:
+    tot = baldes[METRICAS].sum()
+    return {"ciclos": int(tot["Ciclos"]), "horas": float(tot["Segundos"]) / 3600.0,
+            "pecas": int(tot["Pecas"]), "abertos": int(tot["Abertos"])}
+
+
+@st.cache_resource(show_spinner=False)
+def rollup_diario(alvo: str, por_processo: bool) -> RollupDiario:
+    """Um rollup por destino e modo de pareamento, compartilhado entre sessões."""
+    return RollupDiario(por_processo)
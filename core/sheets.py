@@ -0,0 +1,153 @@
+# core/sheets.py
+# Conexão compartilhada com o Google Sheets: um cliente autorizado por processo,
+# handles de Spreadsheet/Worksheet em cache e checagem de cabeçalho só na abertura.
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import gspread
+import streamlit as st
+from gspread.exceptions import WorksheetNotFound
+from oauth2client.service_account import ServiceAccountCredentials
+
+from core.agendador import ESCRITA, LEITURA, QuotaScheduler, VistaAgendador
+from core.rastreio import Rastreador
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+REFRESH_MARGIN = timedelta(minutes=5)  # renova o token antes de expirar
+QUOTA_POR_MIN  = 60                     # cota do Sheets por usuário (Service Account), leituras e escritas
+
+
+def spreadsheet_id_from_url(url: str) -> str:
+    try:
+        return url.split("/d/")[1].split("/")[0]
+    except Exception:
+        return url
+
+
+def quota_por_minuto() -> int:
+    """SHEETS_QUOTA_POR_MIN (env) ou [sheets] quota_por_minuto nos secrets."""
+    try:
+        return int(os.environ.get("SHEETS_QUOTA_POR_MIN")
+                   or st.secrets.get("sheets", {}).get("quota_por_minuto", QUOTA_POR_MIN))
+    except Exception:
+        return QUOTA_POR_MIN
+
+
+def get_sa_dict(secret: str = "GOOGLE_SERVICE_ACCOUNT") -> dict:
+    sa_str = st.secrets.get(secret, None)
+    if not sa_str:
+        raise RuntimeError(f"Secret {secret} não encontrado.")
+    try:
+        return json.loads(sa_str)
+    except Exception as e:
+        raise RuntimeError(f"{secret} inválido (não é STRING JSON escapada)") from e
+
+
+class SheetsPool:
+    """Cliente gspread + handles de planilha/aba reaproveitados entre reruns e sessões.
+
+    Toda chamada à API passa por `agendador` (ver core/agendador.py). Pools da mesma
+    credencial recebem a mesma `cota` (QuotaScheduler): a cota do Sheets é da Service
+    Account, não da empresa.
+    """
+
+    def __init__(self, quota: int = QUOTA_POR_MIN, rastreador: Rastreador | None = None,
+                 sa_secret: str = "GOOGLE_SERVICE_ACCOUNT", cota: QuotaScheduler | None = None):
+        self.lock = threading.RLock()
+        self.sa_secret = sa_secret
+        self.rastreador = rastreador or Rastreador()
+        self.agendador = VistaAgendador(cota or QuotaScheduler(quota), self.rastreador)
+        self._client: gspread.Client | None = None
+        self.sa_email = "desconhecido@sa"
+        self._spreadsheets: dict[str, gspread.Spreadsheet] = {}
+        self._worksheets: dict[tuple[str, str], gspread.Worksheet] = {}
+
+    # ---- cliente ----
+    def client(self) -> gspread.Client:
+        with self.lock:
+            if self._client is None:
+                with self.rastreador.span("auth"):
+                    sa_dict = get_sa_dict(self.sa_secret)
+                    creds = ServiceAccountCredentials.from_json_keyfile_dict(sa_dict, SCOPES)
+                    self._client = gspread.authorize(creds)
+                self.sa_email = sa_dict.get("client_email", "desconhecido@sa")
+            self._refresh_if_needed()
+            return self._client
+
+    def _refresh_if_needed(self) -> None:
+        auth = getattr(getattr(self._client, "http_client", None), "auth", None)
+        if auth is None or not hasattr(auth, "refresh"):
+            return
+        expiry = getattr(auth, "expiry", None)  # UTC; o google-auth o deixa sem fuso
+        if expiry is not None:
+            if expiry.tzinfo is None:
+                expiry = expiry.replace(tzinfo=timezone.utc)
+            if expiry - datetime.now(timezone.utc) > REFRESH_MARGIN:
+                return
+        from google.auth.transport.requests import Request
+        with self.rastreador.span("refresh_token"):
+            auth.refresh(Request())
+
+    # ---- planilha / aba ----
+    def spreadsheet(self, spreadsheet_id: str) -> gspread.Spreadsheet:
+        with self.lock:
+            sh = self._spreadsheets.get(spreadsheet_id)
+            if sh is None:
+                sh = self.agendador.executar(LEITURA, self.client().open_by_key, spreadsheet_id)
+                self._spreadsheets[spreadsheet_id] = sh
+            else:
+                self._refresh_if_needed()
+            return sh
+
+    def worksheet(self, spreadsheet_id: str, name: str, headers: list[str] | None = None) -> gspread.Worksheet:
+        """Aba em cache. Com `headers`, cria a aba se faltar e garante o cabeçalho (uma vez)."""
+        key = (spreadsheet_id, name)
+        with self.lock:
+            ws = self._worksheets.get(key)
+            if ws is not None:
+                self._refresh_if_needed()
+                return ws
+            sh = self.spreadsheet(spreadsheet_id)
+            try:
+                ws = self.agendador.executar(LEITURA, sh.worksheet, name)
+            except WorksheetNotFound:
+                if headers is None:
+                    raise
+                ws = self.agendador.executar(ESCRITA, sh.add_worksheet, title=name, rows=2000, cols=len(headers))
+            if headers is not None:
+                # garante cabeçalho (sem apagar linhas existentes)
+                try:
+                    first_row = self.agendador.executar(LEITURA, ws.row_values, 1)
+                except Exception:
+                    first_row = []
+                if first_row != headers:
+                    self.agendador.executar(ESCRITA, ws.update, "A1", [headers])
+            self._worksheets[key] = ws
+            return ws
+
+    def reset(self) -> None:
+        """Descarta cliente e handles (ex.: após erro de autenticação ou aba apagada)."""
+        with self.lock:
+            self._client = None
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def cota_sheets(sa_secret: str, quota: int) -> QuotaScheduler:
+    """Um token bucket por credencial (nome do secret) e cota, dividido entre as empresas que a usam."""
+    return QuotaScheduler(quota)
+
+
+@st.cache_resource(show_spinner=False)
+def sheets_pool(empresa: str = "") -> SheetsPool:
+    """Um pool (cliente, handles e rastreio) por empresa; ver core/empresas.py. A cota é
+    a da credencial da empresa (`cota_sheets`)."""
+    from core.empresas import empresa as _empresa
+    from core.rastreio import rastreador
+    e = _empresa(empresa) if empresa else None
+    sa_secret = e.service_account if e else "GOOGLE_SERVICE_ACCOUNT"
+    quota = (e.quota_por_minuto if e else None) or quota_por_minuto()
+    return SheetsPool(quota, rastreador(empresa), sa_secret, cota_sheets(sa_secret, quota))
@@ -0,0 +1,64 @@
+# core/sketch.py
+# Sketch de quantis no estilo DDSketch: cada duração cai num balde logarítmico
+# (erro relativo ≤ ALFA no quantil), e sketches se combinam somando as contagens
+# dos mesmos baldes. O sketch de um grupo são as linhas (Balde, N, Soma) dele — como o
+# rollup guarda (core/rollup.py) —, então mesclar é um groupby-sum; percentis de qualquer
+# período saem da soma dos baldes do período, sem ordenar todas as durações.
+import math
+
+import numpy as np
+import pandas as pd
+
+ALFA  = 0.01                          # erro relativo máximo do quantil (1%)
+GAMA  = (1 + ALFA) / (1 - ALFA)
+LOG_GAMA = math.log(GAMA)
+MINIMO = 1.0                          # s; durações menores caem no balde 0
+
+
+def balde(valores) -> np.ndarray:
+    """Índice do balde de cada valor (segundos): ceil(log_γ(v)), com v < MINIMO → 0."""
+    v = np.maximum(np.asarray(valores, dtype=float), MINIMO)
+    return np.ceil(np.log(v) / LOG_GAMA - 1e-12).astype(np.int64)
+
+
+def valor(indices) -> np.ndarray:
+    """Representante do balde (ponto médio relativo): 2·γ^i / (γ + 1)."""
+    return 2.0 * np.power(GAMA, np.asarray(indices, dtype=float)) / (GAMA + 1.0)
+
+
+def quantis(indices: np.ndarray, contagens: np.ndarray, qs=(0.5, 0.9, 0.99)) -> list[float]:
+    """Quantis (s) a partir de baldes/contagens de um sketch (baldes em qualquer ordem)."""
+    total = int(np.sum(contagens))
+    if total == 0:
+        return [float("nan")] * len(qs)
+    ordem = np.argsort(indices, kind="stable")
+    idx, acum = np.asarray(indices)[ordem], np.cumsum(np.asarray(contagens)[ordem])
+    # posto (0-based) do quantil como no DDSketch: floor(q·(n-1))
+    return [float(valor(idx[np.searchsorted(acum, math.floor(q * (total - 1)) + 1)])) for q in qs]
+
+
+def resumo(bins: pd.DataFrame, por: str, qs=(0.5, 0.9, 0.99)) -> pd.DataFrame:
+    """Mescla as linhas (por, Balde, N, Soma) de vários sketches por grupo `por` e devolve
+    Ciclos, média e os quantis (em segundos) por grupo."""
+    cols = [por, "Ciclos", "Media_s"] + [f"p{round(q * 100):g}_s" for q in qs]
+    if bins.empty:
+        return pd.DataFrame(columns=cols)
+    mesclado = bins.groupby([por, "Balde"], as_index=False, observed=True)[["N", "Soma"]].sum()
+    linhas = []
+    for grupo, g in mesclado.groupby(por, observed=True, sort=True):
+        n = int(g["N"].sum())
+        linhas.append([grupo, n, float(g["Soma"].sum()) / n] + quantis(g["Balde"].to_numpy(), g["N"].to_numpy(), qs))
+    return pd.DataFrame(linhas, columns=cols)
+
+
+def histograma(bins: pd.DataFrame, por: str, bordas_min: list[float]) -> pd.DataFrame:
+    """Contagem de ciclos por faixa de duração (bordas em minutos) × grupo, a partir dos baldes."""
+    if bins.empty:
+        return pd.DataFrame()
+    mesclado = bins.groupby([por, "Balde"], as_index=False, observed=True)["N"].sum()
+    minutos = valor(mesclado["Balde"].to_numpy()) / 60.0
+    bordas = list(bordas_min) + [np.inf]
+    rotulos = [f"{a:g}–{b:g} min" if np.isfinite(b) else f"≥ {a:g} min" for a, b in zip(bordas[:-1], bordas[1:])]
+    mesclado["Faixa"] = pd.cut(minutos, bordas, right=False, labels=rotulos)
+    return (mesclado.pivot_table(index="Faixa", columns=por, values="N", aggfunc="sum", observed=False)
+            .fillna(0).astype(int))
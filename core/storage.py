@@ -0,0 +1,286 @@
+# core/storage.py
+# Armazenamento das movimentações de OS (EntradaSaidaOS) atrás de uma interface comum:
+# Google Sheets (produção) ou SQLite local (testes, carga, operação offline).
+# Backend escolhido por STORAGE_BACKEND (env) ou [storage] backend = "sheets" | "sqlite" nos secrets.
+import os
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import streamlit as st
+from gspread.utils import numericise_all, rowcol_to_a1
+
+from core.agendador import ESCRITA, LEITURA
+
+# ========= Cabeçalho da aba EntradaSaidaOS =========
+HEADERS = [
+    "OS", "ITEM", "QUANTIDADE",
+    "DATA", "HORA", "OPERADOR", "MAQUINA", "ENTRADA/SAIDA",
+    "OS- Item", "Afiação/Erosão", "Controle"
+]
+IDX_CONTROLE = 12  # 1-based (última coluna)
+
+FMT_DATA_HORA = "%d/%m/%Y %H:%M:%S"
+SQLITE_PATH   = os.path.join("data", "movimentos.sqlite")
+
+_RE_UPDATED = re.compile(r"![A-Z]+(\d+)(?::[A-Z]+(\d+))?")
+
+
+class MovimentosStorage(ABC):
+    """Interface do armazenamento de movimentações.
+
+    Linhas são listas na ordem de HEADERS; registros são dicts {header: valor}
+    (mesmo formato do `get_all_records` do gspread). O cursor é o número de linhas
+    de dados já consumidas (0 = nenhuma) e só cresce, pois a base é só de inclusão.
+    """
+
+    nome = ""
+    alvo = ""  # identifica o destino (usado como chave no journal)
+
+    @abstractmethod
+    def preparar(self) -> None:
+        """Garante a estrutura (aba/cabeçalho ou tabela)."""
+
+    @abstractmethod
+    def append(self, linhas: list[list]) -> tuple[int, int] | None:
+        """Inclui as linhas; devolve (primeiro, último) cursor gravado, se conhecido."""
+
+    @abstractmethod
+    def controles_desde(self, cursor: int) -> tuple[list[str], int]:
+        """Valores de Controle após o cursor (vazios incluídos como "") e o novo cursor."""
+
+    @abstractmethod
+    def registros_desde(self, cursor: int) -> tuple[list[dict], int]:
+        """Registros após o cursor e o novo cursor (busca incremental)."""
+
+    def registros(self) -> list[dict]:
+        return self.registros_desde(0)[0]
+
+    @abstractmethod
+    def delta(self, cursor: int) -> tuple[list[str], dict | None, list[dict], int, int]:
+        """Numa só leitura: (cabeçalho atual, registro na posição `cursor`, registros após
+        o cursor, novo cursor, total de linhas de dados). O registro no cursor e o total
+        servem para detectar edição/exclusão."""
+
+    def buscar_controle(self, chave: str) -> list[dict]:
+        """Registros com a chave Controle informada."""
+        return [r for r in self.registros() if r.get("Controle") == chave]
+
+    def intervalo(self, ini: datetime, fim: datetime) -> list[dict]:
+        """Registros com DATA/HORA em [ini, fim] (datetimes sem fuso, horário local)."""
+        out = []
+        for r in self.registros():
+            ts = _parse_ts(r.get("DATA"), r.get("HORA"))
+            if ts is not None and ini <= ts <= fim:
+                out.append(r)
+        return out
+
+
+def _parse_ts(data, hora) -> datetime | None:
+    try:
+        return datetime.strptime(f"{data} {hora}", FMT_DATA_HORA)
+    except (TypeError, ValueError):
+        return None
+
+
+# ========= Google Sheets =========
+class SheetsStorage(MovimentosStorage):
+    nome = "sheets"
+
+    def __init__(self, pool, spreadsheet_id: str, worksheet_name: str,
+                 headers: list[str] = HEADERS, col_controle: int = IDX_CONTROLE):
+        self.pool = pool
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet_name = worksheet_name
+        self.headers = list(headers)
+        self.col_controle = col_controle
+        self.alvo = f"{spreadsheet_id}/{worksheet_name}"
+
+    def ws(self):
+        return self.pool.worksheet(self.spreadsheet_id, self.worksheet_name, headers=self.headers)
+
+    def preparar(self) -> None:
+        self.ws()
+
+    def _values(self, a1: str) -> list[list]:
+        ws = self.ws()
+        rng = f"'{ws.title}'!{a1}"
+        resp = self.pool.agendador.executar(
+            LEITURA, ws.spreadsheet.values_get, rng, chave=(self.spreadsheet_id, rng)
+        )
+        return resp.get("values", [])
+
+    def append(self, linhas):
+        ws = self.ws()
+        resp = self.pool.agendador.executar(
+            ESCRITA, ws.append_rows, linhas, value_input_option="USER_ENTERED"
+        )
+        m = _RE_UPDATED.search(((resp or {}).get("updates") or {}).get("updatedRange", ""))
+        if not m:
+            return None
+        ini = int(m.group(1))
+        return ini - 1, int(m.group(2) or ini) - 1  # linha da planilha -> cursor (sem cabeçalho)
+
+    def controles_desde(self, cursor):
+        inicio = rowcol_to_a1(cursor + 2, self.col_controle)
+        coluna = re.sub(r"\d+", "", inicio)
+        vals = self._values(f"{inicio}:{coluna}")
+        return [row[0] if row else "" for row in vals], cursor + len(vals)
+
+    def delta(self, cursor):
+        ws = self.ws()
+        ult = re.sub(r"\d+", "", rowcol_to_a1(1, len(self.headers)))
+        # linha de dados k está na linha k+1 da planilha; relê a última conhecida (âncora)
+        ranges = [f"'{ws.title}'!A1:{ult}1", f"'{ws.title}'!A{max(cursor, 1) + 1}:{ult}"]
+        resp = self.pool.agendador.executar(
+            LEITURA, ws.spreadsheet.values_batch_get, ranges,
+            chave=(self.spreadsheet_id, tuple(ranges)),
+        )
+        vr = resp.get("valueRanges", [{}, {}])
+        topo = vr[0].get("values", [])
+        header = topo[0] if topo else []
+        vals = vr[1].get("values", [])
+        regs = [self._registro(row, header) for row in vals]
+        if cursor == 0:
+            return header, None, regs, len(regs), len(regs)
+        # o intervalo vai até a última linha preenchida: dá o tamanho da aba de graça
+        ultima = regs[0] if regs else None
+        return header, ultima, regs[1:], cursor + max(len(regs) - 1, 0), cursor - 1 + len(regs)
+
+    @staticmethod
+    def _registro(row: list, header: list[str]) -> dict:
+        return dict(zip(header, numericise_all(list(row) + [""] * (len(header) - len(row)))))
+
+    def registros_desde(self, cursor):
+        ult = re.sub(r"\d+", "", rowcol_to_a1(1, len(self.headers)))
+        if cursor == 0:
+            vals = self._values(f"A1:{ult}")
+            if not vals:
+                return [], 0
+            header, vals = vals[0], vals[1:]
+        else:
+            header = self.headers
+            vals = self._values(f"A{cursor + 2}:{ult}")
+        return [self._registro(row, header) for row in vals], cursor + len(vals)
+
+
+# ========= SQLite =========
+_COLS = ["os", "item", "quantidade", "data", "hora", "operador", "maquina",
+         "mov", "os_item", "proc", "controle"]  # mesma ordem de HEADERS
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS movimentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{c} TEXT" for c in _COLS)},
+    ts TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_mov_controle ON movimentos (controle);
+CREATE INDEX IF NOT EXISTS ix_mov_ts ON movimentos (ts);
+"""
+
+
+class SQLiteStorage(MovimentosStorage):
+    nome = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH, headers: list[str] = HEADERS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.headers = list(headers)
+        self.alvo = f"sqlite:{os.path.abspath(path)}"
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+    def preparar(self) -> None:
+        with self.lock:
+            self.conn.executescript(_SCHEMA)
+
+    def _rows(self, sql: str, params=()) -> list[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _registro(self, row) -> dict:
+        return dict(zip(self.headers, numericise_all(["" if v is None else v for v in row])))
+
+    def append(self, linhas):
+        if not linhas:
+            return None
+        vals = []
+        for l in linhas:
+            l = ["" if v is None else str(v) for v in l]
+            ts = _parse_ts(l[3], l[4])
+            vals.append(l + [ts.isoformat(sep=" ") if ts else None])
+        ph = ", ".join("?" * (len(_COLS) + 1))
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                f"INSERT INTO movimentos ({', '.join(_COLS)}, ts) VALUES ({ph})", vals
+            )
+            (ult,) = self.conn.execute("SELECT MAX(id) FROM movimentos").fetchone()
+            self.conn.execute("COMMIT")
+        return ult - len(vals) + 1, ult
+
+    def controles_desde(self, cursor):
+        rows = self._rows("SELECT id, controle FROM movimentos WHERE id > ? ORDER BY id", (cursor,))
+        return [c or "" for _, c in rows], (rows[-1][0] if rows else cursor)
+
+    def registros_desde(self, cursor):
+        rows = self._rows(f"SELECT id, {', '.join(_COLS)} FROM movimentos WHERE id > ? ORDER BY id", (cursor,))
+        return [self._registro(r[1:]) for r in rows], (rows[-1][0] if rows else cursor)
+
+    def delta(self, cursor):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, {', '.join(_COLS)} FROM movimentos WHERE id >= ? ORDER BY id", (cursor,)
+            ).fetchall()
+            (total,) = self.conn.execute("SELECT COUNT(*) FROM movimentos").fetchone()
+        ultima = None
+        if rows and rows[0][0] == cursor:
+            ultima, rows = self._registro(rows[0][1:]), rows[1:]
+        novo = rows[-1][0] if rows else cursor
+        return list(self.headers), ultima, [self._registro(r[1:]) for r in rows], novo, total
+
+    def buscar_controle(self, chave):
+        rows = self._rows(f"SELECT {', '.join(_COLS)} FROM movimentos WHERE controle = ? ORDER BY id", (chave,))
+        return [self._registro(r) for r in rows]
+
+    def intervalo(self, ini, fim):
+        rows = self._rows(
+            f"SELECT {', '.join(_COLS)} FROM movimentos WHERE ts BETWEEN ? AND ? ORDER BY ts, id",
+            (ini.isoformat(sep=" "), fim.isoformat(sep=" ")),
+        )
+        return [self._registro(r) for r in rows]
+
+
+# ========= Seleção do backend =========
+def _config(chave: str, env: str, padrao: str) -> str:
+    if os.environ.get(env):
+        return os.environ[env]
+    try:
+        return str(st.secrets.get("storage", {}).get(chave, padrao))
+    except Exception:  # sem secrets.toml
+        return padrao
+
+
+def backend_configurado() -> str:
+    return _config("backend", "STORAGE_BACKEND", "sheets").strip().lower()
+
+
+@st.cache_resource(show_spinner=False)
+def movimentos_storage(spreadsheet_id: str, worksheet_name: str, empresa: str = "") -> MovimentosStorage:
+    """Storage da aba de movimentações, compartilhado no processo. Com `empresa`, usa o
+    pool de conexões (e o SQLite, se configurado) dessa empresa (core/empresas.py)."""
+    from core.empresas import empresa as _empresa
+    e = _empresa(empresa) if empresa else None
+    backend = backend_configurado()
+    if backend == "sqlite":
+        path = (e.sqlite_path if e else None) or _config("sqlite_path", "STORAGE_SQLITE_PATH", SQLITE_PATH)
+        storage = SQLiteStorage(path)
+        storage.preparar()
+        return storage
+    if backend != "sheets":
+        raise ValueError(f"STORAGE_BACKEND desconhecido: {backend!r} (use 'sheets' ou 'sqlite')")
+    from core.sheets import sheets_pool
+    return SheetsStorage(sheets_pool(empresa), spreadsheet_id, worksheet_name)
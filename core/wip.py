@@ -0,0 +1,102 @@
+# core/wip.py
+# Estado "em andamento" (WIP): Entradas ainda sem Saída por OS-Item/Processo, mantido
+# em memória e alimentado só com as linhas novas do storage (busca incremental por cursor).
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from core.carga import continua
+from core.movimentos import TZ, transformar
+
+INTERVALO_MIN = 3.0  # s; sessões que atualizam juntas compartilham a mesma leitura
+
+
+class EstadoWIP:
+    """Máquina de estados por (OS_Item, PROC): Entrada enfileira, Saída fecha a mais antiga (FIFO)."""
+
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self._zerar()
+        self.ultima_busca = 0.0
+        self.leituras = 0         # leituras aplicadas (detecta outra sessão no meio tempo)
+        self.recargas = 0
+
+    def _zerar(self) -> None:
+        self.cursor  = 0
+        self.header: list[str] | None = None
+        self.ultima: dict | None = None   # registro bruto na posição do cursor (âncora)
+        self.abertos: dict[tuple[str, str], deque] = {}
+        self.orfas   = 0          # Saídas sem Entrada vistas
+        self.linhas  = 0          # registros processados
+
+    def aplicar(self, registros: list[dict]) -> None:
+        """Registros da aba, tipados por core.movimentos.transformar (aceita os dois
+        cabeçalhos de processo e descarta as linhas que o relatório também descarta)."""
+        df = transformar(registros)
+        if not df.empty:
+            for os_item, proc, mov, ts, maquina, operador, qtd in zip(
+                    df["OS_Item"].astype(str), df["PROC"].astype(str), df["MOV"], df["TS"],
+                    df["MAQUINA"].astype(str), df["OPERADOR"].astype(str), df["QUANTIDADE"]):
+                fila = self.abertos.setdefault((os_item, proc), deque())
+                if mov == "Entrada":
+                    fila.append({
+                        "OS_Item": os_item, "PROC": proc, "Entrada_TS": ts,
+                        "MAQUINA": maquina, "OPERADOR": operador,
+                        "QUANTIDADE": None if pd.isna(qtd) else int(qtd),
+                    })
+                elif fila:
+                    fila.popleft()
+                else:
+                    self.orfas += 1
+                if not fila:
+                    del self.abertos[(os_item, proc)]
+        self.linhas += len(registros)
+
+    def atualizar(self, storage, forcar: bool = False) -> int:
+        """Busca só as linhas após o cursor (no máximo uma vez a cada INTERVALO_MIN). Retorna quantas.
+
+        A leitura roda fora do lock (as sessões seguem lendo o estado atual); se o delta
+        não continuar o que já foi lido (core.carga.continua), o estado é refeito do zero."""
+        with self.lock:
+            if not forcar and time.time() - self.ultima_busca < INTERVALO_MIN:
+                return 0
+            self.ultima_busca = time.time()
+            leituras = self.leituras
+            cursor, header, ultima, linhas = self.cursor, self.header, self.ultima, self.linhas
+
+        delta = storage.delta(cursor)
+        recarga = header is not None and not continua(header, ultima, linhas, delta)
+        if recarga:
+            delta = storage.delta(0)
+        header_atual, _, regs, novo, _ = delta
+
+        with self.lock:
+            if self.leituras != leituras:
+                return 0          # outra sessão aplicou uma leitura no meio tempo
+            self.leituras += 1
+            if recarga:
+                self._zerar()
+                self.recargas += 1
+            self.aplicar(regs)
+            self.header, self.cursor = header_atual, novo
+            if regs:
+                self.ultima = regs[-1]
+            return len(regs)
+
+    def abertos_df(self, agora: datetime | None = None) -> pd.DataFrame:
+        agora = agora or datetime.now(TZ)
+        with self.lock:
+            linhas = [e for fila in self.abertos.values() for e in fila]
+        df = pd.DataFrame(linhas, columns=["OS_Item", "PROC", "Entrada_TS", "MAQUINA", "OPERADOR", "QUANTIDADE"])
+        df["Aberto_s"] = (agora - df["Entrada_TS"]).dt.total_seconds() if not df.empty else pd.Series(dtype=float)
+        return df.sort_values("Aberto_s", ascending=False).reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner=False)
+def estado_wip(alvo: str) -> EstadoWIP:
+    """Um estado por destino (ver MovimentosStorage.alvo), compartilhado entre sessões."""
+    return EstadoWIP()
@@ -0,0 +1,65 @@
+# pages/Em_Andamento.py
+import streamlit as st
+from streamlit_autorefresh import st_autorefresh
+
+from core.empresas import empresa_da_sessao
+from core.movimentos import fmt_hms
+from core.storage import movimentos_storage
+from core.wip import estado_wip
+
+st.set_page_config(page_title="Em andamento", page_icon="🟢", layout="wide")
+
+# ---------- acesso ----------
+if not st.session_state.get("acesso_liberado"):
+    st.stop()
+
+st.title("🟢 Em andamento (Entradas sem Saída)")
+
+# ---------- planilha (da empresa do login, ver core/empresas.py) ----------
+EMP = empresa_da_sessao()
+
+# ---------- atualização (só linhas novas a cada refresh) ----------
+intervalo = st.sidebar.slider("Atualizar a cada (s)", 5, 60, 10)
+st_autorefresh(interval=intervalo * 1000, key="wip_refresh")
+
+storage = movimentos_storage(EMP.spreadsheet_id, EMP.worksheet, EMP.codigo)
+estado = estado_wip(storage.alvo)
+try:
+    novas = estado.atualizar(storage)
+except Exception as e:
+    st.warning(f"Não foi possível buscar novas movimentações agora: {e}")
+    novas = 0
+
+df = estado.abertos_df()
+st.caption(f"{estado.linhas} movimentações lidas · {novas} nova(s) nesta atualização · "
+           f"{estado.orfas} Saída(s) sem Entrada ignoradas.")
+
+if df.empty:
+    st.success("Nenhum OS-Item em andamento.")
+    st.stop()
+
+# ---------- KPIs ----------
+k1, k2, k3 = st.columns(3)
+k1.metric("OS-Item em andamento", len(df))
+k2.metric("Máquinas ocupadas", df["MAQUINA"].nunique())
+k3.metric("Mais antigo", fmt_hms(df["Aberto_s"].max()))
+
+# ---------- por máquina / operador ----------
+c1, c2 = st.columns(2)
+for col, campo, titulo in ((c1, "MAQUINA", "Por máquina"), (c2, "OPERADOR", "Por operador")):
+    with col:
+        st.subheader(titulo)
+        g = (df.groupby(campo, as_index=False)
+               .agg(Abertos=("OS_Item", "count"), Mais_antigo_s=("Aberto_s", "max"))
+               .sort_values("Abertos", ascending=False))
+        g["Mais antigo"] = g.pop("Mais_antigo_s").map(fmt_hms)
+        st.dataframe(g, use_container_width=True, hide_index=True)
+
+# ---------- detalhe ----------
+st.subheader("OS-Item em andamento")
+x = df.copy()
+x["Aberto há"] = x["Aberto_s"].map(fmt_hms)
+st.dataframe(
+    x[["MAQUINA", "OPERADOR", "OS_Item", "PROC", "QUANTIDADE", "Entrada_TS", "Aberto há"]],
+    use_container_width=True, hide_index=True
+)
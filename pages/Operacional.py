@@ -1,12 +1,20 @@
 # pages/Operacional.py
 import streamlit as st
-import json
-import gspread
-from gspread.exceptions import APIError, WorksheetNotFound
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.exceptions import APIError
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import traceback
+import time
+
+import pandas as pd
+
+from core.controle import ControleIndex, controle_index as _controle_index, controle_key, os_item_key
+from core.journal import iniciar_flusher, journal
+from core.lote import campos_validos, ler_lote_scan, ler_lote_tabela, validar_lote
+from core.rastreio import rastreador
+from core.empresas import empresa_da_sessao
+from core.sheets import sheets_pool
+from core.storage import HEADERS, movimentos_storage
 
 st.set_page_config(page_title="Painel OS", page_icon="", layout="wide")
 
@@ -16,19 +24,12 @@ if not st.session_state.get("acesso_liberado"):
 
 ROLE            = st.session_state.get("role", "basic")
 USUARIO_LOGADO  = st.session_state.get("usuario_logado", "")
-EMPRESA         = st.session_state.get("empresa", "")
-
-# ========= Planilha / Aba =========
-SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1t82JJfHgiVeANV6fik5ShN6r30UMeDWUqDvlUK0Ok38/edit?gid=0#gid=0"
-WORKSHEET_NAME  = "EntradaSaidaOS"
 
-def _spreadsheet_id_from_url(url: str) -> str:
-    try:
-        return url.split("/d/")[1].split("/")[0]
-    except Exception:
-        return url
-
-SPREADSHEET_ID = _spreadsheet_id_from_url(SPREADSHEET_URL)
+# ========= Planilha / Aba (da empresa do login, ver core/empresas.py) =========
+EMP            = empresa_da_sessao()
+EMPRESA        = EMP.codigo
+SPREADSHEET_ID = EMP.spreadsheet_id
+WORKSHEET_NAME = EMP.worksheet
 
 # ========= UI (abas + Enter = Tab) =========
 st.markdown("""
@@ -62,14 +63,6 @@ st.markdown("""
 </script>
 """, unsafe_allow_html=True)
 
-# ========= Cabeçalho e índice da coluna Controle =========
-HEADERS = [
-    "OS", "ITEM", "QUANTIDADE",
-    "DATA", "HORA", "OPERADOR", "MAQUINA", "ENTRADA/SAIDA",
-    "OS- Item", "Afiação/Erosão", "Controle"
-]
-IDX_CONTROLE = 12  # 1-based (última coluna)
-
 # ========= Helpers de erro/diagnóstico =========
 def _show_error(msg: str, exc: Exception | None = None, extra: dict | None = None):
     if exc:
@@ -83,116 +76,154 @@ def _show_error(msg: str, exc: Exception | None = None, extra: dict | None = Non
             for k, v in extra.items():
                 st.write(f"**{k}:** {v}")
 
-# ========= Credenciais & Google Sheets =========
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-
-def _get_sa_dict():
-    sa_str = st.secrets.get("GOOGLE_SERVICE_ACCOUNT", None)
-    if not sa_str:
-        _show_error("Secret GOOGLE_SERVICE_ACCOUNT não encontrado.")
-        st.stop()
-    try:
-        return json.loads(sa_str)
-    except Exception as e:
-        _show_error("GOOGLE_SERVICE_ACCOUNT inválido (não é STRING JSON escapada)", e)
-        st.stop()
-
-def _gspread_client():
-    sa_dict = _get_sa_dict()
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(sa_dict, SCOPES)
-    client = gspread.authorize(creds)
-    return client, sa_dict.get("client_email", "desconhecido@sa")
+# ========= Armazenamento (Google Sheets ou SQLite, ver core/storage.py) =========
+def storage():
+    """Storage das movimentações; no Sheets a aba/cabeçalho são conferidos só na primeira abertura."""
+    return movimentos_storage(SPREADSHEET_ID, WORKSHEET_NAME, EMPRESA)
 
-def _open_or_prepare_ws(client):
-    sh = client.open_by_key(SPREADSHEET_ID)
-    try:
-        ws = sh.worksheet(WORKSHEET_NAME)
-    except WorksheetNotFound:
-        ws = sh.add_worksheet(title=WORKSHEET_NAME, rows=2000, cols=len(HEADERS))
-    # garante cabeçalho (sem apagar linhas existentes)
-    try:
-        first_row = ws.row_values(1)
-    except Exception:
-        first_row = []
-    if first_row != HEADERS:
-        ws.update("A1", [HEADERS])
-    return ws
+# ---- Índice da coluna Controle (em memória, compartilhado entre sessões; ver core/controle.py) ----
+def controle_index() -> ControleIndex:
+    return _controle_index(storage().alvo)
 
-# ========= Chaves (OS-Item e Controle) =========
-def os_item_key(os_: int, item_: int) -> str:
-    return f"{os_}-{item_}"
+# ---- Journal local + envio em lotes (ver core/journal.py) ----
+ALVO = storage().alvo
 
-def controle_key(os_: int, item_: int, mov: str, proc: str) -> str:
-    """Controle = OS-Item&Entrada|Saída&Afiação|Erosão (com acentos)."""
-    return f"{os_item_key(os_, item_)}&{mov}&{proc}"
+def _flusher():
+    return iniciar_flusher(journal(), storage(), controle_index(), ALVO, rastreador(EMPRESA))
 
 # ---- Consultas de existência na coluna Controle ----
-def col_controle(ws) -> list[str]:
-    try:
-        col = ws.col_values(IDX_CONTROLE)
-        return [c for c in col[1:] if c]  # sem cabeçalho, sem vazios
-    except Exception:
-        return []
+def ja_existe_controle(idx: ControleIndex, chave: str) -> bool:
+    return chave in idx
 
-def ja_existe_controle(ws, chave: str) -> bool:
-    return chave in set(col_controle(ws))
-
-def existe_entrada_para_os_item_proc(ws, os_: int, item_: int, proc: str) -> bool:
+def existe_entrada_para_os_item_proc(idx: ControleIndex, os_: int, item_: int, proc: str) -> bool:
     """Permite Saída apenas se existir 'OS-Item&Entrada&<proc>'."""
     chave_entrada = f"{os_item_key(os_, item_)}&Entrada&{proc}"
-    return chave_entrada in set(col_controle(ws))
+    return chave_entrada in idx
 
 # ========= Salvamento com as regras =========
+def _indice_carregado() -> ControleIndex:
+    idx = controle_index()
+    if not idx.carregado:
+        # primeira gravação do processo: carrega o índice antes de validar
+        sto = storage()
+        sto.preparar()
+        if not idx.sincronizar(sto) or not idx.carregado:
+            # sem o índice, duplicidade e "Saída sem Entrada" não podem ser conferidas:
+            # melhor recusar o salvamento do que aceitar e o flusher descartar depois
+            raise RuntimeError("Não foi possível ler os registros já gravados (coluna Controle) para "
+                               "conferir duplicidade. Nada foi salvo; tente novamente em instantes.")
+    return idx
+
+def _agora_data_hora() -> tuple[str, str]:
+    now = datetime.now(ZoneInfo("America/Sao_Paulo"))
+    return now.strftime("%d/%m/%Y"), now.strftime("%H:%M:%S")
+
+def _linha(registro: dict, data: str, hora: str) -> list:
+    os_i, item_ = registro["OS"], registro["Item"]
+    mov, proc   = registro["Movimento"], registro["Processo"]
+    return [
+        os_i,                                   # OS
+        item_,                                  # ITEM
+        registro["Quantidade"],                 # QUANTIDADE
+        data,                                   # DATA
+        hora,                                   # HORA
+        USUARIO_LOGADO,                         # OPERADOR
+        registro["Máquina"],                    # MAQUINA
+        mov,                                    # ENTRADA/SAIDA
+        os_item_key(os_i, item_),               # OS- Item
+        proc,                                   # Afiação/Erosão (mesmo valor)
+        controle_key(os_i, item_, mov, proc),   # Controle (OS-Item&Entrada|Saída&Afiação|Erosão)
+    ]
+
+def _erro_sheets(e: Exception) -> str:
+    if isinstance(e, APIError):
+        if getattr(e.response, "status_code", None) in (401, 403, 404):
+            sheets_pool(EMPRESA).reset()  # credencial/aba inválida: reabre na próxima tentativa
+        _show_error(
+            "Falha de acesso ao Google Sheets (verifique API ativa e compartilhamento com o Service Account)",
+            e,
+            {"spreadsheet_id": SPREADSHEET_ID, "worksheet": WORKSHEET_NAME}
+        )
+    else:
+        _show_error("Erro ao salvar na planilha", e, {"spreadsheet_id": SPREADSHEET_ID, "worksheet": WORKSHEET_NAME})
+    return str(e)
+
 def salvar_no_sheets(registro: dict) -> tuple[bool, str | None]:
+    """Valida contra o índice Controle e grava no journal local; o envio ao storage
+    é feito em segundo plano pelo flusher (append em lotes, com backoff)."""
+    t0 = time.perf_counter()
     try:
-        client, sa_email = _gspread_client()
-        ws = _open_or_prepare_ws(client)
-
-        now = datetime.now(ZoneInfo("America/Sao_Paulo"))
-        data = now.strftime("%d/%m/%Y")
-        hora = now.strftime("%H:%M:%S")
+        idx = _indice_carregado()
+        flusher = _flusher()
+        data, hora = _agora_data_hora()
 
         os_i   = registro["OS"]
         item_  = registro["Item"]
         mov    = registro["Movimento"]       # "Entrada" | "Saída"
         proc   = registro["Processo"]        # "Afiação" | "Erosão"
 
-        chave_os_item = os_item_key(os_i, item_)
-        chave_ctrl    = controle_key(os_i, item_, mov, proc)
-
-        # Regra: NÃO PODE SAÍDA sem ENTRADA (mesmo OS-Item e mesmo Processo)
-        if mov == "Saída" and not existe_entrada_para_os_item_proc(ws, os_i, item_, proc):
-            return False, f"❌ Não é permitido registrar **Saída** sem existir **Entrada** prévia para"
-
-        # Duplicidade: não pode repetir o mesmo Controle
-        if ja_existe_controle(ws, chave_ctrl):
-            return False, f"⚠️ Duplicidade:"
-
-        linha = [
-            os_i,                       # OS
-            item_,                      # ITEM
-            registro["Quantidade"],     # QUANTIDADE
-            data,                       # DATA
-            hora,                       # HORA
-            USUARIO_LOGADO,             # OPERADOR
-            registro["Máquina"],        # MAQUINA
-            mov,                        # ENTRADA/SAIDA
-            chave_os_item,              # OS- Item
-            proc,                       # Afiação/Erosão (mesmo valor)
-            chave_ctrl,                 # Controle (OS-Item&Entrada|Saída&Afiação|Erosão)
-        ]
-        ws.append_row(linha, value_input_option="USER_ENTERED")
+        chave_ctrl = controle_key(os_i, item_, mov, proc)
+
+        with idx.lock:  # checagem + gravação atômicas entre sessões do mesmo processo
+            # Regra: NÃO PODE SAÍDA sem ENTRADA (mesmo OS-Item e mesmo Processo)
+            if mov == "Saída" and not existe_entrada_para_os_item_proc(idx, os_i, item_, proc):
+                return False, f"❌ Não é permitido registrar **Saída** sem existir **Entrada** prévia para"
+
+            # Duplicidade: não pode repetir o mesmo Controle
+            if ja_existe_controle(idx, chave_ctrl):
+                return False, f"⚠️ Duplicidade:"
+
+            if not journal().enfileirar(ALVO, chave_ctrl, _linha(registro, data, hora)):
+                return False, f"⚠️ Duplicidade:"
+            idx.marcar_pendente(chave_ctrl)
+        flusher.acordar.set()
         return True, None
-    except APIError as e:
-        _show_error(
-            "Falha de acesso ao Google Sheets (verifique API ativa e compartilhamento com o Service Account)",
-            e,
-            {"spreadsheet_id": SPREADSHEET_ID, "worksheet": WORKSHEET_NAME}
-        )
-        return False, str(e)
     except Exception as e:
-        _show_error("Erro ao salvar na planilha", e, {"spreadsheet_id": SPREADSHEET_ID, "worksheet": WORKSHEET_NAME})
-        return False, str(e)
+        return False, _erro_sheets(e)
+    finally:
+        rastreador(EMPRESA).registrar("salvar", time.perf_counter() - t0,
+                               detalhe=controle_key(registro["OS"], registro["Item"], registro["Movimento"], registro["Processo"]))
+
+# ========= Lançamento em lote (leitura e regras em core/lote.py) =========
+def salvar_lote_no_sheets(registros: list[dict]) -> tuple[list[dict], list[dict], str | None]:
+    """Valida o lote e grava os aceitos no journal numa única transação; o flusher
+    envia tudo num único append_rows (até LOTE_MAX linhas por chamada)."""
+    t0 = time.perf_counter()
+    try:
+        idx = _indice_carregado()
+        flusher = _flusher()
+        data, hora = _agora_data_hora()
+        with idx.lock:
+            aceitos, recusados = validar_lote(registros, idx)
+            itens = []
+            for r in aceitos:
+                linha = _linha(r, data, hora)
+                itens.append((linha[-1], linha))
+            ja = set(journal().enfileirar_lote(ALVO, itens))
+            for chave, _ in itens:
+                if chave not in ja:
+                    idx.marcar_pendente(chave)
+        if ja:
+            recusados += [{**r, "Motivo": "Duplicidade (já na fila)"} for r in aceitos
+                          if controle_key(r["OS"], r["Item"], r["Movimento"], r["Processo"]) in ja]
+            aceitos = [r for r in aceitos
+                       if controle_key(r["OS"], r["Item"], r["Movimento"], r["Processo"]) not in ja]
+        flusher.acordar.set()
+        return aceitos, recusados, None
+    except Exception as e:
+        return [], [], _erro_sheets(e)
+    finally:
+        rastreador(EMPRESA).registrar("salvar_lote", time.perf_counter() - t0, detalhe=f"{len(registros)} linhas")
+
+def painel_fila():
+    """Resumo do journal: linhas aguardando envio e com falha."""
+    stt = journal().status(ALVO)
+    if stt["falha"]:
+        st.warning(f"📤 Fila de envio: **{stt['pendente']}** pendente(s) · **{stt['falha']}** com falha")
+    elif stt["pendente"]:
+        st.caption(f"📤 Fila de envio: {stt['pendente']} pendente(s)")
+    else:
+        st.caption("📤 Fila de envio: tudo sincronizado com a planilha.")
 
 # ========= Abas =========
 ALL_TABS = [
@@ -203,10 +234,6 @@ ALL_TABS = [
 ]
 tabs = st.tabs(ALL_TABS if ROLE == "admin" else [ALL_TABS[0]])
 
-def campos_validos(os_, maq, qtd, mov, proc):
-    return (os_ > 0) and bool(maq.strip()) and (qtd >= 1) \
-           and (mov in ("Entrada", "Saída")) and (proc in ("Afiação", "Erosão"))
-
 # ========= Aba 1 =========
 with tabs[0]:
     with st.container(border=True):
@@ -271,6 +298,48 @@ with tabs[0]:
                 else:
                     st.error(err)
 
+        painel_fila()
+
+    with st.expander("📦 Lançamento em lote (tabela colada, CSV ou leitura de código de barras)"):
+        origem = st.radio("Origem", ["Colar tabela", "Arquivo CSV", "Código de barras"], horizontal=True, key="lote_origem")
+        registros_lote, invalidas = [], []
+        try:
+            if origem == "Colar tabela":
+                st.caption("Cole com cabeçalho: **OS, Item, Quantidade, Máquina, Movimento, Processo** (tab, `;` ou `,`).")
+                texto = st.text_area("Tabela", height=200, key="lote_tabela")
+                if texto.strip():
+                    registros_lote = ler_lote_tabela(texto)
+            elif origem == "Arquivo CSV":
+                arq = st.file_uploader("CSV", type=["csv", "txt"], key="lote_csv")
+                if arq is not None:
+                    registros_lote = ler_lote_tabela(arq.getvalue().decode("utf-8-sig"))
+            else:
+                b1, b2, b3, b4 = st.columns([1.2, 0.6, 1, 1])
+                maq_l  = b1.text_input("Máquina", key="lote_maq")
+                qtd_l  = b2.number_input("Qtd. padrão", min_value=1, step=1, format="%d", key="lote_qtd")
+                proc_l = b3.selectbox("Processo", ["Afiação", "Erosão"], index=None, key="lote_proc")
+                mov_l  = b4.selectbox("Movimento", ["Entrada", "Saída"], index=None, key="lote_mov")
+                texto = st.text_area("Leituras (uma por linha: OS-Item ou OS-Item;Qtd)", height=200, key="lote_scan")
+                if texto.strip():
+                    registros_lote, invalidas = ler_lote_scan(texto, maq_l, qtd_l, mov_l, proc_l)
+        except Exception as e:
+            st.error(f"Não foi possível ler o lote: {e}")
+
+        if invalidas:
+            st.warning(f"{len(invalidas)} leitura(s) ignorada(s): " + ", ".join(invalidas[:20]))
+        if registros_lote:
+            st.caption(f"{len(registros_lote)} registro(s) lidos.")
+            if st.button(f"💾 Salvar lote ({len(registros_lote)})", type="primary", key="lote_salvar"):
+                aceitos, recusados, err = salvar_lote_no_sheets(registros_lote)
+                if err:
+                    st.error(err)
+                else:
+                    if aceitos:
+                        st.success(f"✅ {len(aceitos)} registro(s) salvos.")
+                    if recusados:
+                        st.warning(f"⚠️ {len(recusados)} registro(s) recusados:")
+                        st.dataframe(pd.DataFrame(recusados), use_container_width=True, hide_index=True)
+
 # ========= Abas extras (somente admin) =========
 if ROLE == "admin" and len(tabs) > 1:
     with tabs[1]:
@@ -279,3 +348,50 @@ if ROLE == "admin" and len(tabs) > 1:
         st.info("🚧 Relatório 2 em desenvolvimento...")
     with tabs[3]:
         st.info("⚙️ Configurações em desenvolvimento...")
+
+        st.markdown("#### 📤 Fila de envio (journal local)")
+        stt = journal().status(ALVO)
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Pendentes", stt["pendente"])
+        k2.metric("Com falha", stt["falha"])
+        k3.metric("Enviadas (últimos 7 dias)", stt["enviado"])
+        falhas = journal().falhas(ALVO)
+        if falhas:
+            st.dataframe(
+                [{"Controle": c, "Tentativas": n, "Erro": e,
+                  "Gravado em": datetime.fromtimestamp(t, ZoneInfo("America/Sao_Paulo")).strftime("%d/%m/%Y %H:%M:%S")}
+                 for c, n, e, t in falhas],
+                use_container_width=True, hide_index=True
+            )
+            if st.button("🔁 Reenviar linhas com falha"):
+                n = journal().reenviar_falhas(ALVO)
+                _flusher().acordar.set()
+                st.success(f"{n} linha(s) voltaram para a fila.")
+
+        st.markdown("#### 🚦 Cota do Google Sheets (compartilhada por quem usa a mesma credencial)")
+        ag = sheets_pool(EMPRESA).agendador.stats()
+        q1, q2, q3, q4 = st.columns(4)
+        q1.metric("Tokens disponíveis", f"{ag['tokens']:.0f}/{ag['capacidade']}")
+        q2.metric("Leituras mescladas", ag["mescladas"])
+        q3.metric("Respostas 429", ag["limitadas_429"])
+        q4.metric("Na fila agora", ag["escrita"]["fila"] + ag["leitura"]["fila"])
+        st.dataframe(
+            [{"Tipo": tipo.capitalize(), "Na fila": ag[tipo]["fila"], "Chamadas": ag[tipo]["chamadas"],
+              "Espera p50 (s)": round(ag[tipo]["espera_p50"], 3),
+              "Espera p95 (s)": round(ag[tipo]["espera_p95"], 3),
+              "Espera máx. (s)": round(ag[tipo]["espera_max"], 3)}
+             for tipo in ("escrita", "leitura")],
+            use_container_width=True, hide_index=True
+        )
+
+        st.markdown("#### ⏱️ Rastreio das chamadas ao Google Sheets (últimas 5.000)")
+        rst = rastreador(EMPRESA)
+        st.caption("Latência por operação (ms). `salvar`/`salvar_lote` são gravações no journal; "
+                   "`flush_lote` é o envio em segundo plano (leitura do Controle + append_rows).")
+        st.dataframe(rst.resumo_por_operacao(), use_container_width=True, hide_index=True)
+        por_min = rst.chamadas_por_minuto()
+        por_min["Cota"] = sheets_pool(EMPRESA).agendador.stats()["capacidade"]
+        st.caption("Chamadas à API por minuto × cota (últimos 30 min).")
+        st.line_chart(por_min, use_container_width=True, height=260)
+        st.caption("Salvamentos e envios mais lentos.")
+        st.dataframe(rst.mais_lentos(), use_container_width=True, hide_index=True)
@@ -1,10 +1,17 @@
 # pages/Relatorios.py
 import streamlit as st
 import pandas as pd
-import json, gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from zoneinfo import ZoneInfo
-from datetime import datetime
+
+from core.carga import carga_incremental
+from core.derivados import chave_filtro, ocupacao, opcoes_filtro, relatorio
+from core.empresas import empresa_da_sessao
+from core.exportacao import FORMATOS, sob_demanda
+from core.grade import grade_paginada
+from core.motor import filtro, resultado_publicado, tabelas
+from core.movimentos import fmt_hms
+from core.rollup import agregar, agregar_sketch, kpis, por_dimensao, rollup_diario, serie
+from core.sketch import histograma, resumo
+from core.storage import movimentos_storage
 
 # ---------- acesso: somente admin ----------
 if not st.session_state.get("acesso_liberado"):
@@ -30,139 +37,78 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# ---------- planilha ----------
-SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1t82JJfHgiVeANV6fik5ShN6r30UMeDWUqDvlUK0Ok38/edit?gid=0#gid=0"
-WORKSHEET_NAME  = "EntradaSaidaOS"
-def _sheet_id(url: str) -> str:
-    try: return url.split("/d/")[1].split("/")[0]
-    except: return url
-SPREADSHEET_ID = _sheet_id(SPREADSHEET_URL)
-
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-def _client():
-    sa = json.loads(st.secrets["GOOGLE_SERVICE_ACCOUNT"])
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(sa, SCOPES)
-    return gspread.authorize(creds)
-
-@st.cache_data(ttl=180)
-def load_df() -> pd.DataFrame:
-    ws = _client().open_by_key(SPREADSHEET_ID).worksheet(WORKSHEET_NAME)
-    rows = ws.get_all_records()
-    if not rows: 
-        return pd.DataFrame()
-
-    df = pd.DataFrame(rows)
-    # Cabeçalho esperado:
-    # OS | ITEM | QUANTIDADE | AFIACAO/EROSAO | DATA | HORA | OPERADOR | MAQUINA |
-    # ENTRADA/SAIDA | OS- Item | Afiação/Erosão | Controle
-    df["OS"]   = pd.to_numeric(df.get("OS"), errors="coerce").astype("Int64")
-    df["ITEM"] = pd.to_numeric(df.get("ITEM"), errors="coerce").astype("Int64")
-
-    # OS-Item (fallback A-B se coluna vier vazia)
-    df["OS_Item"] = df.get("OS- Item", "").astype(str).str.strip()
-    m = df["OS_Item"].eq("") | df["OS_Item"].isna()
-    df.loc[m, "OS_Item"] = df["OS"].astype(str) + "-" + df["ITEM"].astype(str)
-
-    # Processo
-    df["PROC"] = df.get("Afiação/Erosão", df.get("AFIACAO/EROSAO", "")).astype(str).str.strip()
-
-    # Movimento normalizado
-    mov = df.get("ENTRADA/SAIDA", "").astype(str).str.strip().str.lower()
-    df["MOV"] = pd.NA
-    df.loc[mov.str.contains("entrada", na=False), "MOV"] = "Entrada"
-    df.loc[mov.str.contains("saída", na=False) | mov.str.contains("saida", na=False), "MOV"] = "Saída"
-
-    # Timestamp com fuso São Paulo
-    df["TS"] = pd.to_datetime(
-        df["DATA"].astype(str) + " " + df["HORA"].astype(str),
-        dayfirst=True, errors="coerce"
-    )
-    tz = ZoneInfo("America/Sao_Paulo")
-    df["TS"] = df["TS"].dt.tz_localize(tz, nonexistent="NaT", ambiguous="NaT")
-
-    df = df.dropna(subset=["OS","ITEM","MOV","TS"]).copy()
-    df = df.sort_values("TS").reset_index(drop=True)
-    return df
+# ---------- planilha (da empresa do login, ver core/empresas.py) ----------
+EMP = empresa_da_sessao()
 
-def fmt_hms(secs: float) -> str:
-    secs = int(round(secs))
-    h, r = divmod(secs, 3600); m, s = divmod(r, 60)
-    return f"{h:02d}:{m:02d}:{s:02d}"
+def load_df() -> tuple[pd.DataFrame, tuple, int, str | None]:
+    """Movimentações tipadas + versão, geração e marca d'água dos dados; só as linhas
+    novas são buscadas a cada atualização (ver core/carga.py)."""
+    storage = movimentos_storage(EMP.spreadsheet_id, EMP.worksheet, EMP.codigo)
+    carga = carga_incremental(storage.alvo)
+    carga.atualizar(storage)
+    df, versao, geracao = carga.estado()
+    return df, (storage.alvo, versao), geracao, carga.marca()
 
 # ---------- dados ----------
-df = load_df()
+df, versao, geracao, marca = load_df()
 if df.empty:
     st.info("Sem dados na planilha.")
     st.stop()
 
 # ---------- filtros ----------
-min_d = df["TS"].dt.date.min()
-max_d = df["TS"].dt.date.max()
+opcoes = opcoes_filtro(df, versao)
+min_d, max_d = opcoes["min_d"], opcoes["max_d"]
 c1, c2, c3, c4 = st.columns([1.3, 1, 1, 1.3])
 with c1:
     d_ini, d_fim = st.date_input("Período", (min_d, max_d), min_value=min_d, max_value=max_d)
 with c2:
-    os_sel = st.multiselect("OS", sorted(df["OS"].dropna().unique().tolist()))
+    os_sel = st.multiselect("OS", opcoes["os"])
 with c3:
-    maquina_sel = st.multiselect("Máquina", sorted(df["MAQUINA"].astype(str).unique().tolist()))
+    maquina_sel = st.multiselect("Máquina", opcoes["maquinas"])
 with c4:
     parear_por_processo = st.checkbox("Parear por Processo (Afiação/Erosão)", value=False)
 
-mask = (df["TS"].dt.date >= d_ini) & (df["TS"].dt.date <= d_fim)
-if os_sel: mask &= df["OS"].isin(os_sel)
-if maquina_sel: mask &= df["MAQUINA"].astype(str).isin(maquina_sel)
-df_f = df.loc[mask].copy()
-
-# ---------- pareamento Entrada -> Saída ----------
-pairs, entradas_sem_saida, saidas_sem_entrada = [], [], []
-key_cols = ["OS_Item"] + (["PROC"] if parear_por_processo else [])
-for _, g in df_f.groupby(key_cols, sort=False):
-    g = g.sort_values("TS")
-    fila = []
-    for _, r in g.iterrows():
-        if r["MOV"] == "Entrada":
-            fila.append(r)
-        else:
-            if fila:
-                r_in = fila.pop(0)
-                dur = (r["TS"] - r_in["TS"]).total_seconds()
-                pairs.append({
-                    "OS_Item": r["OS_Item"], "OS": r["OS"], "Item": r["ITEM"],
-                    "PROC": r["PROC"], "Entrada_TS": r_in["TS"], "Saida_TS": r["TS"],
-                    "Dur_s": dur
-                })
-            else:
-                saidas_sem_entrada.append({
-                    "OS_Item": r["OS_Item"], "OS": r["OS"], "Item": r["ITEM"],
-                    "PROC": r["PROC"], "Saida_TS": r["TS"]
-                })
-    for r_in in fila:
-        entradas_sem_saida.append({
-            "OS_Item": r_in["OS_Item"], "OS": r_in["OS"], "Item": r_in["ITEM"],
-            "PROC": r_in["PROC"], "Entrada_TS": r_in["TS"]
-        })
-
-import pandas as pd
-df_pairs = pd.DataFrame(pairs)
-df_open  = pd.DataFrame(entradas_sem_saida)
-df_orph  = pd.DataFrame(saidas_sem_entrada)
-
-# agregado por OS-Item (opcionalmente por processo)
-if not df_pairs.empty:
-    cols_group = ["OS_Item"] + (["PROC"] if parear_por_processo else [])
-    tempo_os_item = (df_pairs
-        .groupby(cols_group, as_index=False)
-        .agg(Ciclos=("Dur_s","count"),
-             Segundos=("Dur_s","sum"),
-             Primeiro=("Entrada_TS","min"),
-             Ultimo=("Saida_TS","max"))
-    )
-    tempo_os_item["HH:MM:SS"] = tempo_os_item["Segundos"].map(fmt_hms)
+# ---------- filtro + pareamento + agregados (memorizados por filtro, ver core/derivados.py) ----------
+# Resultado publicado pelo lote (python -m core.motor --publicar) vale se os dados e o filtro batem.
+res = (resultado_publicado(versao[0], marca, filtro(df, d_ini, d_fim, os_sel, maquina_sel, parear_por_processo))
+       or relatorio(df, versao, d_ini, d_fim, os_sel, maquina_sel, parear_por_processo))
+df_pairs, df_open, df_orph = res["df_pairs"], res["df_open"], res["df_orph"]
+tempo_os_item = res["tempo_os_item"]
+tabs_rel = tabelas(res, parear_por_processo)
+
+# ---------- rollup diário (Dia × Máquina × Operador × Processo, ver core/rollup.py) ----------
+# KPIs e gráficos saem dos baldes do período. OS não é dimensão do rollup: com filtro de OS
+# os mesmos baldes são montados a partir dos pares do filtro (mesma definição de ciclo).
+rollup = rollup_diario(versao[0], parear_por_processo)
+rollup.atualizar(df, geracao)
+if os_sel:
+    baldes, sk = agregar(df_pairs, df_open), agregar_sketch(df_pairs)
 else:
-    tempo_os_item = pd.DataFrame(columns=["OS_Item","PROC","Ciclos","Segundos","Primeiro","Ultimo","HH:MM:SS"])
+    baldes = rollup.consultar(d_ini, d_fim, maquina_sel)
+    sk = rollup.consultar(d_ini, d_fim, maquina_sel, sketch=True)
+
+# ---------- downloads sob demanda (gerados só no clique, ver core/exportacao.py) ----------
+# Os arquivos ficam em disco e sobrevivem a um restart, quando o contador de `versao`
+# recomeça: a chave usa a marca d'água dos dados, que muda com o conteúdo carregado
+# (também numa recarga por edição no meio da aba, ver CargaIncremental.marca).
+chave_export = chave_filtro((versao[0], marca), d_ini, d_fim, os_sel, maquina_sel, parear_por_processo)
+
+def botoes_download(rotulo: str, nome: str, montar) -> None:
+    """Botões CSV/Excel; `montar` devolve o DataFrame e só roda quando alguém baixa."""
+    for col, formato in zip(st.columns([1, 1, 4])[:2], ["csv", "xlsx"]):
+        mime, ext = FORMATOS[formato]
+        with col:
+            st.download_button(
+                f"⬇️ {'CSV' if formato == 'csv' else 'Excel'} ({rotulo})",
+                data=sob_demanda(chave_export + (nome,), formato, montar, aba=rotulo),
+                file_name=f"{nome}.{ext}",
+                mime=mime,
+                on_click="ignore",
+                key=f"dl_{nome}_{formato}",
+            )
 
 # ---------- ABAS: Relatório | Gráficos (agora com o mesmo estilo) ----------
-tab_rel, tab_graf = st.tabs(["📄 Relatório", "📈 Gráficos"])
+tab_rel, tab_graf, tab_ocup = st.tabs(["📄 Relatório", "📈 Gráficos", "🏭 Ocupação"])
 
 # ======== RELATÓRIO ========
 with tab_rel:
@@ -172,44 +118,31 @@ with tab_rel:
         horizontal=True
     )
     if filtro_rel == "Tempo por OS-Item":
-        cols = ["OS_Item"] + (["PROC"] if parear_por_processo else []) + ["Ciclos","HH:MM:SS","Primeiro","Ultimo"]
-        st.dataframe(tempo_os_item[cols].sort_values(["OS_Item"]), use_container_width=True, hide_index=True)
-        st.download_button(
-            "⬇️ Baixar CSV (Tempo por OS-Item)",
-            data=tempo_os_item.to_csv(index=False).encode("utf-8"),
-            file_name="tempo_por_os_item.csv",
-            mime="text/csv"
-        )
+        grade_paginada(tabs_rel["tempo_por_os_item"], chave_export + ("tempo_por_os_item",), "g_tempo", ordem_padrao="OS_Item")
+        botoes_download("Tempo por OS-Item", "tempo_por_os_item", lambda: tempo_os_item)
     elif filtro_rel == "Sem Saída (Entradas abertas)":
         if df_open.empty:
             st.success("Nenhuma Entrada aberta.")
         else:
-            now = datetime.now(ZoneInfo("America/Sao_Paulo"))
-            x = df_open.copy()
-            x["Aberto_hh:mm:ss"] = (now - x["Entrada_TS"]).dt.total_seconds().map(fmt_hms)
-            cols = ["OS_Item"] + (["PROC"] if parear_por_processo else []) + ["Entrada_TS","Aberto_hh:mm:ss"]
-            st.dataframe(x[cols].sort_values(["OS_Item","Entrada_TS"]), use_container_width=True, hide_index=True)
-            st.download_button(
-                "⬇️ Baixar CSV (Entradas sem Saída)",
-                data=x[cols].to_csv(index=False).encode("utf-8"),
-                file_name="entradas_sem_saida.csv",
-                mime="text/csv"
-            )
+            grade_paginada(tabs_rel["entradas_sem_saida"], chave_export + ("entradas_sem_saida",), "g_abertas", ordem_padrao="Entrada_TS")
+            botoes_download("Entradas sem Saída", "entradas_sem_saida", lambda: tabs_rel["entradas_sem_saida"])
     else:
         if df_orph.empty:
             st.success("Nenhuma Saída órfã.")
         else:
-            cols = ["OS_Item"] + (["PROC"] if parear_por_processo else []) + ["Saida_TS"]
-            st.dataframe(df_orph[cols].sort_values(["OS_Item","Saida_TS"]), use_container_width=True, hide_index=True)
-            st.download_button(
-                "⬇️ Baixar CSV (Saídas sem Entrada)",
-                data=df_orph[cols].to_csv(index=False).encode("utf-8"),
-                file_name="saidas_sem_entrada.csv",
-                mime="text/csv"
-            )
+            grade_paginada(tabs_rel["saidas_sem_entrada"], chave_export + ("saidas_sem_entrada",), "g_orfas", ordem_padrao="Saida_TS")
+            botoes_download("Saídas sem Entrada", "saidas_sem_entrada", lambda: tabs_rel["saidas_sem_entrada"])
 
 # ======== GRÁFICOS ========
 with tab_graf:
+    # ciclo no dia da Saída, atribuído à máquina/operador/peças da Entrada (ver core/rollup.py)
+    k = kpis(baldes)
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Ciclos", k["ciclos"])
+    m2.metric("Horas", f"{k['horas']:.1f}")
+    m3.metric("Peças", k["pecas"])
+    m4.metric("Entradas abertas", k["abertos"])
+
     st.caption("Tempo total por **OS-Item** (somente ciclos pareados).")
     if tempo_os_item.empty:
         st.info("Sem dados pareados para o período/filtros selecionados.")
@@ -219,9 +152,49 @@ with tab_graf:
         top_df["Horas"] = top_df["Segundos"] / 3600.0
         st.bar_chart(top_df.set_index("OS_Item")["Horas"], use_container_width=True, height=420)
 
-        st.caption("Série diária do tempo total (com base no horário da **Saída**).")
-        serie = (df_pairs.assign(Dia=df_pairs["Saida_TS"].dt.date)
-                        .groupby("Dia", as_index=False)["Dur_s"].sum())
-        if not serie.empty:
-            serie["Horas"] = serie["Dur_s"] / 3600.0
-            st.line_chart(serie.set_index("Dia")["Horas"], use_container_width=True, height=320)
+    st.caption("Série diária do tempo total (com base no horário da **Saída**).")
+    serie_dia = serie(baldes)
+    if not serie_dia.empty:
+        st.line_chart(serie_dia.set_index("Dia")["Horas"], use_container_width=True, height=320)
+
+    if k["ciclos"]:
+        dim = st.radio("Horas por", ["MAQUINA", "OPERADOR", "PROC"], horizontal=True,
+                       format_func=lambda d: {"MAQUINA": "Máquina", "OPERADOR": "Operador", "PROC": "Processo"}[d])
+        por_dim = por_dimensao(baldes, dim)
+        st.bar_chart(por_dim.set_index(dim)["Horas"], use_container_width=True, height=320)
+
+        # ---- distribuição do tempo de ciclo (sketches mesclados do período, ver core/sketch.py) ----
+        st.caption("Distribuição do tempo de ciclo (percentis com erro relativo ≤ 1%).")
+        por = st.radio("Percentis por", ["PROC", "MAQUINA"], horizontal=True, key="dist_por",
+                       format_func=lambda d: {"MAQUINA": "Máquina", "PROC": "Processo"}[d])
+        dist = resumo(sk, por)
+        for c in [c for c in dist.columns if c.endswith("_s")]:
+            dist[c.replace("_s", "")] = dist[c].map(fmt_hms)
+        st.dataframe(dist[[por, "Ciclos", "Media", "p50", "p90", "p99"]], use_container_width=True, hide_index=True)
+        st.bar_chart(histograma(sk, por, [0, 15, 30, 60, 120, 240, 480]), use_container_width=True, height=300)
+
+# ======== OCUPAÇÃO DAS MÁQUINAS ========
+with tab_ocup:
+    mapa = ocupacao(df, versao, d_ini, d_fim, os_sel, maquina_sel, parear_por_processo)
+    ocup = mapa.por_maquina()
+    if ocup.empty:
+        st.info("Sem ciclos pareados para calcular a ocupação.")
+    else:
+        st.caption("Ocupação por máquina no período: horas com pelo menos um OS-Item em processo, "
+                   "pico de OS-Items simultâneos e ociosidade entre o primeiro e o último ciclo.")
+        x = ocup.copy()
+        x["Utilização %"] = (x["Utilizacao"] * 100).round(1)
+        for c in ["Horas_ciclos", "Horas_ocupada", "Horas_ociosa", "Maior_ociosidade_h"]:
+            x[c] = x[c].round(2)
+        st.dataframe(x.drop(columns=["Utilizacao"]), use_container_width=True, hide_index=True)
+
+        st.caption("Linha do tempo da ocupação (% do intervalo com a máquina ocupada).")
+        st.line_chart(mapa.linha_tempo(), use_container_width=True, height=320)
+
+        st.caption("Utilização diária (% das 24 h) por máquina.")
+        dia = mapa.por_dia()
+        util_dia = dia.pivot_table(index="Dia", columns="MAQUINA", values="Utilizacao", aggfunc="sum").fillna(0) * 100
+        st.dataframe(util_dia.round(1), use_container_width=True)
+
+        min_ocioso = st.number_input("Ociosidades a partir de (min)", min_value=0, value=30, step=15)
+        st.dataframe(mapa.ociosidades(min_ocioso), use_container_width=True, hide_index=True)
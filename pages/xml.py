@@ -4,181 +4,13 @@
 import streamlit as st
 import pandas as pd
 from io import BytesIO
-import zipfile
-import xml.etree.ElementTree as ET
 
-st.set_page_config(page_title="Importar XML NF-e → Excel", layout="wide")
-
-# ========= Helpers e parsing =========
-NS = {"nfe": "http://www.portalfiscal.inf.br/nfe"}
-
-def _txt(el, path):
-    """Retorna texto de um subelemento (ou "") já com strip."""
-    if el is None:
-        return ""
-    x = el.find(path, NS)
-    return (x.text or "").strip() if x is not None and x.text is not None else ""
-
-def _num(el, path):
-    """Converte para float com segurança (ou 0.0)."""
-    t = _txt(el, path)
-    try:
-        return float(t.replace(",", ".")) if t else 0.0
-    except Exception:
-        return 0.0
-
-def parse_nfe_xml(xml_bytes):
-    """
-    Lê um XML de NF-e (modelo 55) e retorna:
-      header: dict com dados da nota
-      items:  list[dict] com os itens
-    Lida com namespaces oficiais da NF-e.
-    """
-    try:
-        root = ET.fromstring(xml_bytes)
-    except ET.ParseError:
-        return None, None, "XML inválido"
-
-    # Pode vir embrulhado com <nfeProc> ou só <NFe>
-    nfe = root.find(".//nfe:NFe", NS) or root
-    inf = nfe.find(".//nfe:infNFe", NS)
-    if inf is None:
-        return None, None, "NF-e não encontrada (infNFe ausente)"
-
-    # chave
-    chave = (inf.attrib.get("Id", "") or "").replace("NFe", "")
-
-    ide  = inf.find("nfe:ide", NS)
-    emit = inf.find("nfe:emit", NS)
-    dest = inf.find("nfe:dest", NS)
-    total = inf.find("nfe:total/nfe:ICMSTot", NS)
-    transp = inf.find("nfe:transp", NS)
-    pag = inf.find("nfe:pag", NS)  # em versões novas tem <pag><detPag>...
-
-    # protocolo/autorização (quando presente)
-    prot = root.find(".//nfe:protNFe", NS)
-    cStat = _txt(prot, "nfe:infProt/nfe:cStat")
-    xMotivo = _txt(prot, "nfe:infProt/nfe:xMotivo")
-
-    # ===== Cabeçalho =====
-    header = {
-        "Chave": chave,
-        "Modelo": _txt(ide, "nfe:mod"),
-        "Série": _txt(ide, "nfe:serie"),
-        "Número": _txt(ide, "nfe:nNF"),
-        "Emissão": _txt(ide, "nfe:dhEmi") or _txt(ide, "nfe:dEmi"),
-        "Tipo NF (0=Entrada,1=Saída)": _txt(ide, "nfe:tpNF"),
-        "Natureza da Operação": _txt(ide, "nfe:natOp"),
-        "Município Fato Gerador": _txt(ide, "nfe:cMunFG"),
-        "UF Emitente": _txt(emit, "nfe:enderEmit/nfe:UF"),
-        # Emitente
-        "Emit_CNPJ": _txt(emit, "nfe:CNPJ") or _txt(emit, "nfe:CPF"),
-        "Emit_Nome": _txt(emit, "nfe:xNome"),
-        "Emit_IE": _txt(emit, "nfe:IE"),
-        # Destinatário
-        "Dest_CNPJ": _txt(dest, "nfe:CNPJ") or _txt(dest, "nfe:CPF"),
-        "Dest_Nome": _txt(dest, "nfe:xNome"),
-        "Dest_IE": _txt(dest, "nfe:IE"),
-        # Totais
-        "vBC": _num(total, "nfe:vBC"),
-        "vICMS": _num(total, "nfe:vICMS"),
-        "vICMSDeson": _num(total, "nfe:vICMSDeson"),
-        "vFCP": _num(total, "nfe:vFCP"),
-        "vBCST": _num(total, "nfe:vBCST"),
-        "vST": _num(total, "nfe:vST"),
-        "vProd": _num(total, "nfe:vProd"),
-        "vFrete": _num(total, "nfe:vFrete"),
-        "vSeg": _num(total, "nfe:vSeg"),
-        "vDesc": _num(total, "nfe:vDesc"),
-        "vII": _num(total, "nfe:vII"),
-        "vIPI": _num(total, "nfe:vIPI"),
-        "vPIS": _num(total, "nfe:vPIS"),
-        "vCOFINS": _num(total, "nfe:vCOFINS"),
-        "vOutro": _num(total, "nfe:vOutro"),
-        "vNF": _num(total, "nfe:vNF"),
-        # Transporte
-        "modFrete": _txt(transp, "nfe:modFrete"),
-        # Pagamento (soma dos detPag)
-        "vPag_total": 0.0,
-        # Protocolo/Status
-        "cStat": cStat,
-        "xMotivo": xMotivo,
-    }
-
-    # Pagamento: múltiplos <detPag>
-    vpag_sum = 0.0
-    if pag is not None:
-        for det in pag.findall("nfe:detPag", NS):
-            vpag_sum += _num(det, "nfe:vPag")
-    header["vPag_total"] = vpag_sum
-
-    # ===== Itens =====
-    itens_out = []
-    for det in inf.findall("nfe:det", NS):
-        nItem = det.attrib.get("nItem", "")
-        prod = det.find("nfe:prod", NS)
-
-        icms = det.find("nfe:imposto/nfe:ICMS", NS)
-        icms_det = None
-        icms_cst = ""
-        icms_origem = ""
-        icms_aliq = 0.0
-        if icms is not None and list(icms):
-            icms_det = list(icms)[0]  # ICMS00/ICMS10/ICMS20...
-            icms_cst = _txt(icms_det, "nfe:CST") or _txt(icms_det, "nfe:CSOSN")
-            icms_origem = _txt(icms_det, "nfe:orig")
-            icms_aliq = _num(icms_det, "nfe:pICMS")
-
-        pis = det.find("nfe:imposto/nfe:PIS", NS)
-        pis_det = None
-        pis_cst = ""
-        pis_aliq = 0.0
-        if pis is not None and list(pis):
-            pis_det = list(pis)[0]
-            pis_cst = _txt(pis_det, "nfe:CST")
-            pis_aliq = _num(pis_det, "nfe:pPIS")
-
-        cofins = det.find("nfe:imposto/nfe:COFINS", NS)
-        cof_det = None
-        cof_cst = ""
-        cof_aliq = 0.0
-        if cofins is not None and list(cofins):
-            cof_det = list(cofins)[0]
-            cof_cst = _txt(cof_det, "nfe:CST")
-            cof_aliq = _num(cof_det, "nfe:pCOFINS")
-
-        item_dict = {
-            "Chave": chave,
-            "nItem": nItem,
-            "cProd": _txt(prod, "nfe:cProd"),
-            "cEAN": _txt(prod, "nfe:cEAN"),
-            "xProd": _txt(prod, "nfe:xProd"),
-            "NCM": _txt(prod, "nfe:NCM"),
-            "CFOP": _txt(prod, "nfe:CFOP"),
-            "uCom": _txt(prod, "nfe:uCom"),
-            "qCom": _num(prod, "nfe:qCom"),
-            "vUnCom": _num(prod, "nfe:vUnCom"),
-            "vProd": _num(prod, "nfe:vProd"),
-            "cEANTrib": _txt(prod, "nfe:cEANTrib"),
-            "uTrib": _txt(prod, "nfe:uTrib"),
-            "qTrib": _num(prod, "nfe:qTrib"),
-            "vUnTrib": _num(prod, "nfe:vUnTrib"),
-            "vDesc_item": _num(prod, "nfe:vDesc"),
-            "indTot": _txt(prod, "nfe:indTot"),
-            # Impostos principais
-            "ICMS_orig": icms_origem,
-            "ICMS_CST_CSOSN": icms_cst,
-            "ICMS_pICMS": icms_aliq,
-            "PIS_CST": pis_cst,
-            "PIS_pPIS": pis_aliq,
-            "COFINS_CST": cof_cst,
-            "COFINS_pCOFINS": cof_aliq,
-        }
-        itens_out.append(item_dict)
-
-    return header, itens_out, None
+from core.cache_nfe import cache_nfe
+from core.nfe import contar_xmls, importar_xmls, iterar_xmls, nucleos
 
+st.set_page_config(page_title="Importar XML NF-e → Excel", layout="wide")
 
+# ========= Excel =========
 def write_excel(df_notas, df_itens) -> bytes:
     """Gera um Excel com duas abas, formatado."""
     output = BytesIO()
@@ -247,6 +79,11 @@ arquivos = st.file_uploader(
 colA, colB = st.columns([1, 2])
 with colA:
     processar = st.button("🚀 Processar")
+with colB:
+    paralelo = st.checkbox(f"Processar em paralelo ({nucleos()} núcleos)", value=True,
+                           help="Lotes grandes são divididos entre processos; poucos XML são lidos direto.")
+    usar_cache = st.checkbox("Reaproveitar XML já importados (cache local)", value=True,
+                             help="XML idênticos a um já lido não são lidos de novo (ver core/cache_nfe.py).")
 
 # ========= Processamento =========
 if processar:
@@ -254,49 +91,29 @@ if processar:
         st.warning("Anexe ao menos um arquivo .zip ou .xml.")
         st.stop()
 
-    headers = []
-    itens = []
     erros = []
 
-    total_xmls = 0
-
-    progress = st.progress(0, text="Lendo arquivos...")
-
-    # Coleta todos os XML bytes a partir dos uploads
-    xml_blobs = []
-
-    for f in arquivos:
-        name = f.name.lower()
-        if name.endswith(".zip"):
-            try:
-                z = zipfile.ZipFile(f)
-                for info in z.infolist():
-                    if info.filename.lower().endswith(".xml") and not info.is_dir():
-                        with z.open(info) as zf:
-                            xml_blobs.append(zf.read())
-            except zipfile.BadZipFile:
-                erros.append((name, "ZIP corrompido"))
-        elif name.endswith(".xml"):
-            xml_blobs.append(f.read())
-
-    total_xmls = len(xml_blobs)
+    total_xmls = contar_xmls(arquivos)
     if total_xmls == 0:
         st.error("Nenhum XML encontrado dentro dos arquivos enviados.")
         st.stop()
 
-    for i, xml_bytes in enumerate(xml_blobs, start=1):
-        header, itens_out, err = parse_nfe_xml(xml_bytes)
-        if err:
-            erros.append((f"xml_{i}", err))
-        else:
-            headers.append(header)
-            itens.extend(itens_out)
+    progress = st.progress(0, text="Lendo arquivos...")
 
-        progress.progress(i / total_xmls, text=f"Processando XML {i}/{total_xmls}...")
+    # Cada XML é descompactado, lido e descartado em fluxo (ver core/nfe.py): só as linhas
+    # extraídas ficam em memória. Notas repetidas (mesma Chave) valem pela última lida,
+    # com os itens dela.
+    cache = cache_nfe() if usar_cache else None
+    df_notas, df_itens, erros_xml, total_xmls, do_cache = importar_xmls(
+        iterar_xmls(arquivos, erros), total_xmls, paralelo=paralelo,
+        ao_progredir=lambda feitos, total: progress.progress(feitos / total, text=f"Processando XML {feitos}/{total}..."),
+        cache=cache,
+    )
+    erros.extend(erros_xml)
 
     progress.empty()
 
-    if not headers:
+    if df_notas.empty:
         st.error("Não foi possível extrair nenhuma NF-e válida dos arquivos.")
         if erros:
             with st.expander("Erros de leitura"):
@@ -304,16 +121,12 @@ if processar:
                     st.write(f"• {nome}: {msg}")
         st.stop()
 
-    # ===== DataFrames finais =====
-    df_notas = pd.DataFrame(headers)
-    df_itens = pd.DataFrame(itens)
-
-    # Remove duplicadas por chave (mantém a última lida)
-    if "Chave" in df_notas.columns:
-        df_notas = df_notas.drop_duplicates(subset=["Chave"], keep="last")
-
     # Preview
     st.success(f"Extraídas **{len(df_notas)} notas** e **{len(df_itens)} itens** de **{total_xmls} XML**.")
+    if cache:
+        c = cache.stats()
+        st.caption(f"{do_cache} de {total_xmls} XML vieram do cache · "
+                   f"cache com {c['entradas']} XML ({c['mb']} de {c['limite_mb']} MB).")
     st.subheader("Amostra — Notas")
     st.dataframe(df_notas.head(20), use_container_width=True, hide_index=True)
     st.subheader("Amostra — Itens")
@@ -0,0 +1,156 @@
+# tests/test_agendador.py
+# QuotaScheduler (core/agendador.py) com relógio de mentira: leituras idênticas
+# mescladas, escrita na fila na frente das leituras e bucket vazio depois de um 429.
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from gspread.exceptions import APIError
+
+from core.agendador import ESCRITA, LEITURA, QuotaScheduler
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+def _ate(cond, limite: float = 5.0) -> None:
+    """Espera (tempo real) até `cond()` valer; os threads do teste andam sozinhos."""
+    fim = time.monotonic() + limite
+    while not cond():
+        assert time.monotonic() < fim, "tempo esgotado"
+        time.sleep(0.001)
+
+
+def _avancar(ag: QuotaScheduler, relogio: Relogio, seg: float) -> None:
+    relogio.agora += seg
+    with ag.cond:
+        ag.cond.notify_all()
+
+
+def _esvaziar(ag: QuotaScheduler) -> None:
+    while ag.tokens >= 1:
+        ag.executar(ESCRITA, lambda: None)
+
+
+def _thread(fn, *args, **kwargs):
+    saida = {}
+    def rodar():
+        try:
+            saida["ok"] = fn(*args, **kwargs)
+        except BaseException as e:
+            saida["erro"] = e
+    t = threading.Thread(target=rodar, daemon=True)
+    t.start()
+    return t, saida
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+def test_leituras_identicas_fazem_uma_chamada(relogio):
+    ag = QuotaScheduler(60, relogio=relogio)
+    liberar, chamadas = threading.Event(), []
+
+    def ler():
+        chamadas.append(1)
+        liberar.wait(5)
+        return {"valores": [1, 2]}
+
+    t0, s0 = _thread(ag.executar, LEITURA, ler, chave="A1:B2")
+    _ate(lambda: chamadas)
+    outros = [_thread(ag.executar, LEITURA, ler, chave="A1:B2") for _ in range(4)]
+    _ate(lambda: ag.mescladas == 4)
+    liberar.set()
+    for t, _ in [(t0, s0)] + outros:
+        t.join(5)
+    assert len(chamadas) == 1
+    assert all(s["ok"] is s0["ok"] for _, s in outros)
+    assert ag.stats()["leitura"]["chamadas"] == 1
+
+    ag.executar(LEITURA, ler, chave="A1:B2")          # terminada, a chave volta a chamar
+    ag.executar(LEITURA, ler, chave="C1")
+    assert len(chamadas) == 3
+
+
+def test_erro_da_leitura_mesclada_vai_para_todos(relogio):
+    ag = QuotaScheduler(60, relogio=relogio)
+    liberar, chamadas = threading.Event(), []
+
+    def ler():
+        chamadas.append(1)
+        liberar.wait(5)
+        raise TimeoutError("lento")
+
+    threads = [_thread(ag.executar, LEITURA, ler, chave="x")]
+    _ate(lambda: chamadas)
+    threads.append(_thread(ag.executar, LEITURA, ler, chave="x"))
+    _ate(lambda: ag.mescladas == 1)
+    liberar.set()
+    for t, _ in threads:
+        t.join(5)
+    assert len(chamadas) == 1
+    assert all(isinstance(s["erro"], TimeoutError) for _, s in threads)
+
+
+def test_escrita_na_fila_passa_na_frente_das_leituras(relogio):
+    ag = QuotaScheduler(60, reserva_escrita=5, relogio=relogio)
+    _esvaziar(ag)
+    ordem = []
+    leitura = _thread(ag.executar, LEITURA, lambda: ordem.append("leitura"))
+    _ate(lambda: ag.esperando[LEITURA] == 1)
+    escrita = _thread(ag.executar, ESCRITA, lambda: ordem.append("escrita"))
+    _ate(lambda: ag.esperando[ESCRITA] == 1)
+
+    _avancar(ag, relogio, 0.5)                         # meio token: ninguém passa
+    time.sleep(0.05)
+    assert ordem == []
+    _avancar(ag, relogio, 10)                          # 10 tokens: a escrita vai antes
+    escrita[0].join(5)
+    leitura[0].join(5)
+    assert ordem == ["escrita", "leitura"]
+
+
+def test_leitura_guarda_a_reserva_das_escritas(relogio):
+    ag = QuotaScheduler(60, reserva_escrita=5, relogio=relogio)
+    _esvaziar(ag)
+    ordem = []
+    leitura = _thread(ag.executar, LEITURA, lambda: ordem.append("leitura"))
+    _ate(lambda: ag.esperando[LEITURA] == 1)
+    _avancar(ag, relogio, 5.5)                         # 5,5 tokens: escrita passaria, leitura não
+    time.sleep(0.05)
+    assert ordem == []
+    ag.executar(ESCRITA, lambda: ordem.append("escrita"))
+    _avancar(ag, relogio, 1.5)                         # 6 tokens: agora sim
+    leitura[0].join(5)
+    assert ordem == ["escrita", "leitura"]
+
+
+def test_429_esvazia_o_bucket_ate_repor(relogio):
+    ag = QuotaScheduler(60, relogio=relogio)
+    resposta = SimpleNamespace(status_code=429, text="", json=lambda: {
+        "error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+
+    def cota_estourada():
+        raise APIError(resposta)
+    with pytest.raises(APIError):
+        ag.executar(ESCRITA, cota_estourada)
+    assert ag.stats()["limitadas_429"] == 1 and ag.tokens == 0
+
+    chamadas = []
+    t, _ = _thread(ag.executar, ESCRITA, lambda: chamadas.append(relogio.agora))
+    _ate(lambda: ag.esperando[ESCRITA] == 1)
+    for _ in range(3):                                 # 0,75 s: ainda sem token inteiro
+        _avancar(ag, relogio, 0.25)
+        time.sleep(0.005)
+        assert chamadas == []
+    _avancar(ag, relogio, 0.25)
+    t.join(5)
+    assert chamadas == [pytest.approx(1.0)]
@@ -0,0 +1,29 @@
+# tests/test_bench.py
+# As conferências do --verificar dos benchmarks (bench/) rodando como teste, em tamanho
+# pequeno: parear == parear_loop e extrair_nfe == parse_nfe_xml nos dados sintéticos.
+import pytest
+
+from bench import movimentos, nfe
+from bench.sintetico import Perfil, gerar_nfe
+
+
+@pytest.mark.parametrize("perfil", [
+    Perfil(seed=0),
+    Perfil(n_os=15, itens_por_os=2, dias=5, taxa_orfas=0.2, taxa_abertas=0.2, seed=1),
+    Perfil(n_os=300, dias=90, taxa_orfas=0.0, taxa_abertas=0.0, seed=2),
+], ids=["padrao", "muitas_orfas", "sem_orfas"])
+def test_parear_igual_ao_laco(perfil):
+    movimentos.verificar(perfil, 3_000)
+
+
+@pytest.mark.parametrize("itens", [0, 1, 40])
+def test_extrator_nfe_igual_a_arvore(itens):
+    assert nfe.verificar(gerar_nfe(30, itens, seed=itens)) == []
+
+
+def test_rodar_e_comparar_com_baseline():
+    r = movimentos.rodar(2_000, Perfil(seed=3), memoria=False, repeticoes=1)
+    assert r["linhas"] > 0 and r["pares"] > 0 and r["transformar_s"] > 0
+    assert movimentos.comparar({"2k": r}, {"2k": r}, 0.25) == []
+    pior = {"2k": {**r, "parear_s": r["parear_s"] * 2 + 1}}
+    assert [x.split(":")[0] for x in movimentos.comparar(pior, {"2k": r}, 0.25)] == ["2k parear_s"]
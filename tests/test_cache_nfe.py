@@ -0,0 +1,93 @@
+# tests/test_cache_nfe.py
+# Cache das NF-e lidas (core/cache_nfe.py): chave pelo conteúdo + versão do extrator,
+# teto com descarte LRU e importação com cache igual à sem cache.
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from bench.sintetico import gerar_nfe
+from core import cache_nfe as cmod
+from core.cache_nfe import FOLGA, CacheNFe, hash_xml
+from core.nfe import extrair_nfe, importar_xmls
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1_000.0]
+    monkeypatch.setattr(cmod, "time", SimpleNamespace(time=lambda: agora[0]))
+    return agora
+
+
+def _gravar(cache, blobs):
+    cache.gravar({hash_xml(b): extrair_nfe(b) for b in blobs})
+
+
+def _no_disco(cache) -> tuple[set, int]:
+    rows = cache.conn.execute("SELECT hash, bytes FROM xml").fetchall()
+    return {h for h, _ in rows}, sum(b for _, b in rows)
+
+
+def test_versao_do_extrator_invalida(tmp_path, monkeypatch):
+    blobs = gerar_nfe(5, 3)
+    cache = CacheNFe(str(tmp_path / "c.sqlite"))
+    _gravar(cache, blobs)
+    assert len(cache.buscar(cache.hashes(blobs))) == 5
+
+    monkeypatch.setattr(cmod, "VERSAO_EXTRATOR", "outra")
+    novos = cache.hashes(blobs)
+    assert not set(novos) & _no_disco(cache)[0]
+    assert cache.buscar(novos) == {}
+    _gravar(cache, blobs)
+    assert cache.stats()["entradas"] == 10           # as antigas só saem pelo LRU
+
+
+def test_mesma_chave_com_conteudos_diferentes(tmp_path):
+    a = gerar_nfe(1, 3)[0]
+    b = a.replace(b"VENDA DE MERCADORIA", b"DEVOLUCAO")
+    cache = CacheNFe(str(tmp_path / "c.sqlite"))
+    _gravar(cache, [a, b])
+    _gravar(cache, [a])                              # regravar o mesmo hash não duplica
+    achados = cache.buscar([hash_xml(a), hash_xml(b)])
+    assert [achados[hash_xml(x)][0]["Natureza da Operação"] for x in (a, b)] == ["VENDA DE MERCADORIA", "DEVOLUCAO"]
+    assert cache.stats()["entradas"] == 2
+    assert _no_disco(cache)[1] == cache.total
+
+
+def test_lru_enxuga_ate_a_folga(tmp_path, relogio):
+    blobs = gerar_nfe(40, 5, seed=1)
+    cache = CacheNFe(str(tmp_path / "c.sqlite"))
+    for b in blobs[:30]:                             # usado_em crescente: 0 é o mais antigo
+        relogio[0] += 1
+        _gravar(cache, [b])
+    tamanhos = dict(cache.conn.execute("SELECT hash, bytes FROM xml").fetchall())
+    hs = [hash_xml(b) for b in blobs]
+
+    relogio[0] += 1
+    cache.buscar(hs[:5])                             # 0-4 voltam a ser recentes
+    cache.limite = sum(tamanhos.values()) + 1        # cabe tudo, mais nada
+    relogio[0] += 1
+    _gravar(cache, blobs[30:])
+
+    presentes, total = _no_disco(cache)
+    assert total == cache.total <= FOLGA * cache.limite
+    ordem_lru = hs[5:30] + hs[:5] + hs[30:]          # do uso mais antigo ao mais novo
+    sairam = [h for h in ordem_lru if h not in presentes]
+    assert sairam == ordem_lru[:len(sairam)]         # saem só os mais antigos, em ordem
+    assert total + tamanhos[sairam[-1]] > FOLGA * cache.limite    # e não mais do que o preciso
+    assert set(hs[:5]) <= presentes
+    assert cache.stats()["descartes"] == len(sairam)
+
+
+def test_importar_com_cache_igual_a_sem(tmp_path):
+    blobs = gerar_nfe(60, 4, seed=2)
+    blobs.insert(40, blobs[3].replace(b"VENDA DE MERCADORIA", b"DEVOLUCAO"))
+    blobs.append(b"<quebrado")
+    sem = importar_xmls(iter(blobs), len(blobs), paralelo=False)
+    cache = CacheNFe(str(tmp_path / "c.sqlite"))
+    for rodada, esperado_do_cache in ((1, 0), (2, len(blobs))):
+        com = importar_xmls(iter(blobs), len(blobs), paralelo=False, cache=cache)
+        pd.testing.assert_frame_equal(com[0], sem[0])
+        pd.testing.assert_frame_equal(com[1], sem[1])
+        assert com[2:4] == sem[2:4] and com[4] == esperado_do_cache, rodada
+    assert cache.stats()["entradas"] == len(blobs)
@@ -0,0 +1,185 @@
+# tests/test_carga.py
+# Carga incremental (core/carga.py) contra um SQLiteStorage: delta, âncora, contagem de
+# linhas, cabeçalho e o snapshot Feather (ida e volta, marca inválida).
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+from bench.sintetico import Perfil, gerar_registros
+from core import carga as cmod
+from core.carga import INTERVALO, CargaIncremental, carregar_snapshot, hash_marca, salvar_snapshot
+from core.movimentos import transformar
+from core.storage import HEADERS, SQLiteStorage
+
+PERFIL = Perfil(n_os=20, itens_por_os=3, dias=10, seed=5)
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1_000_000.0]
+    monkeypatch.setattr(cmod, "time", SimpleNamespace(time=lambda: agora[0]))
+    return agora
+
+
+@pytest.fixture
+def storage(tmp_path):
+    sto = SQLiteStorage(str(tmp_path / "mov.sqlite"))
+    sto.preparar()
+    return sto
+
+
+@pytest.fixture(scope="module")
+def registros():
+    return gerar_registros(600, PERFIL)
+
+
+def _linhas(regs: list[dict]) -> list[list]:
+    return [[r[h] for h in HEADERS] for r in regs]
+
+
+def _atualizar(carga, storage, relogio) -> pd.DataFrame:
+    relogio[0] += INTERVALO
+    return carga.atualizar(storage)
+
+
+def _igual_ao_storage(df, storage) -> None:
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), transformar(storage.registros()))
+
+
+def test_delta_so_anexa(storage, registros, relogio):
+    storage.append(_linhas(registros[:300]))
+    carga = CargaIncremental()
+    _atualizar(carga, storage, relogio)
+    geracao = carga.geracao
+    for a, b in ((300, 301), (301, 450), (450, len(registros))):
+        storage.append(_linhas(registros[a:b]))
+        relogio[0] += INTERVALO / 2
+        carga.atualizar(storage)                               # dentro do intervalo: nada
+        assert carga.cursor == a
+        _igual_ao_storage(_atualizar(carga, storage, relogio), storage)
+    assert (carga.recargas, carga.geracao, carga.cursor, carga.linhas) == (1, geracao, len(registros), len(registros))
+    versao = carga.versao
+    _atualizar(carga, storage, relogio)                          # sem linhas novas
+    assert carga.versao == versao
+
+
+def test_ancora_editada_recarrega(storage, registros, relogio):
+    storage.append(_linhas(registros[:200]))
+    carga = CargaIncremental()
+    _atualizar(carga, storage, relogio)
+    storage.conn.execute("UPDATE movimentos SET maquina = 'XX-99' WHERE id = 200")
+    storage.append(_linhas(registros[200:210]))
+    _igual_ao_storage(_atualizar(carga, storage, relogio), storage)
+    assert carga.recargas == 2 and "XX-99" in set(carga.df["MAQUINA"].astype(str))
+
+
+@pytest.mark.parametrize("novas", [0, 10])
+def test_linha_do_meio_excluida_recarrega(storage, registros, relogio, novas):
+    storage.append(_linhas(registros[:200]))
+    carga = CargaIncremental()
+    _atualizar(carga, storage, relogio)
+    storage.conn.execute("DELETE FROM movimentos WHERE id IN (17, 18)")   # âncora intacta
+    storage.append(_linhas(registros[200:200 + novas]))
+    _igual_ao_storage(_atualizar(carga, storage, relogio), storage)
+    assert carga.recargas == 2 and carga.linhas == 198 + novas
+
+    storage.append(_linhas(registros[300:305]))                  # depois disso, volta ao delta
+    _igual_ao_storage(_atualizar(carga, storage, relogio), storage)
+    assert carga.recargas == 2
+
+
+def test_cabecalho_mudou_recarrega(storage, registros, relogio):
+    storage.append(_linhas(registros[:100]))
+    carga = CargaIncremental()
+    _atualizar(carga, storage, relogio)
+    marca = carga.marca()
+    storage.headers = [h if h != "Afiação/Erosão" else "AFIACAO/EROSAO" for h in HEADERS]
+    _atualizar(carga, storage, relogio)
+    assert carga.recargas == 2 and carga.header == storage.headers
+    assert carga.marca() != marca
+    assert set(carga.df["PROC"].astype(str)) == {"Afiação", "Erosão"}   # cabeçalho antigo também vale
+
+
+def test_recarga_completa_periodica(storage, registros, relogio):
+    storage.append(_linhas(registros[:100]))
+    carga = CargaIncremental()
+    _atualizar(carga, storage, relogio)
+    storage.conn.execute("UPDATE movimentos SET operador = 'outro' WHERE id = 5")   # invisível ao delta
+    _atualizar(carga, storage, relogio)
+    assert carga.recargas == 1
+    relogio[0] += cmod.RECARGA_COMPLETA
+    _igual_ao_storage(_atualizar(carga, storage, relogio), storage)
+    assert carga.recargas == 2
+
+
+def test_snapshot_ida_e_volta(tmp_path, storage, registros, relogio):
+    snap = str(tmp_path / "snap.feather")
+    storage.append(_linhas(registros[:300]))
+    storage.conn.execute("DELETE FROM movimentos WHERE id = 3")       # linhas ≠ cursor
+    carga = CargaIncremental(snap)
+    _atualizar(carga, storage, relogio)
+    storage.append(_linhas(registros[300:320]))
+    _atualizar(carga, storage, relogio)
+
+    outra = CargaIncremental(snap)                                     # "próximo processo"
+    pd.testing.assert_frame_equal(outra.df, carga.df)
+    assert (outra.cursor, outra.linhas, outra.header, outra.ultima) == \
+           (carga.cursor, carga.linhas, carga.header, carga.ultima)
+    assert outra.marca() == carga.marca()
+    storage.append(_linhas(registros[320:330]))
+    _igual_ao_storage(_atualizar(outra, storage, relogio), storage)
+    assert outra.recargas == 0                                         # só o delta
+
+
+def test_marca_invalida_descarta_o_snapshot(tmp_path, storage, registros, monkeypatch):
+    snap = str(tmp_path / "snap.feather")
+    df = transformar(registros[:50])
+    header, ultima = list(HEADERS), registros[49]
+    salvar_snapshot(snap, df, 50, header, ultima)
+    assert carregar_snapshot(snap)[1]["hash"] == hash_marca(50, header, ultima, 0)
+
+    monkeypatch.setattr(cmod, "SCHEMA_VERSAO", cmod.SCHEMA_VERSAO + 1)   # outro esquema
+    assert carregar_snapshot(snap) is None
+    monkeypatch.undo()
+
+    tabela = feather.read_table(snap)                                  # marca adulterada
+    marca = json.loads(tabela.schema.metadata[b"marca"])
+    marca["cursor"] = 49
+    meta = {**tabela.schema.metadata, b"marca": json.dumps(marca).encode()}
+    feather.write_feather(tabela.replace_schema_metadata(meta), snap, compression="uncompressed")
+    assert carregar_snapshot(snap) is None
+    assert CargaIncremental(snap).header is None                       # parte do zero
+
+    with open(snap, "wb") as f:
+        f.write(b"lixo")
+    assert carregar_snapshot(snap) is None
+    assert carregar_snapshot(str(tmp_path / "nao_existe.feather")) is None
+
+
+def test_marca_muda_com_edicao_no_meio(storage, registros, relogio):
+    storage.append(_linhas(registros[:100]))
+    carga = CargaIncremental()
+    _atualizar(carga, storage, relogio)
+    antes = carga.marca()
+    storage.conn.execute("UPDATE movimentos SET operador = 'outro' WHERE id = 5")
+    relogio[0] += cmod.RECARGA_COMPLETA
+    _atualizar(carga, storage, relogio)
+    assert carga.cursor == 100 and carga.ultima == storage.registros()[-1]
+    assert carga.marca() != antes                       # chaves de exportação e grade mudam
+
+
+def test_marca_independe_do_caminho(tmp_path, storage, registros, relogio):
+    from core.motor import carregar_de_storage
+
+    inc = CargaIncremental()
+    for a, b in ((0, 120), (120, 121), (121, 400)):
+        storage.append(_linhas(registros[a:b]))
+        _atualizar(inc, storage, relogio)
+    nova = CargaIncremental()
+    _atualizar(nova, storage, relogio)
+    assert inc.recargas == 1 and inc.marca() == nova.marca()
+    assert carregar_de_storage(storage)[1] == inc.marca()   # a do motor bate com a da página
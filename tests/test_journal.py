@@ -0,0 +1,143 @@
+# tests/test_journal.py
+# Journal + Flusher (core/journal.py) contra um SQLiteStorage: envio, replay idempotente
+# depois de uma queda, backoff por linha e desistência após MAX_TENTATIVAS.
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core import journal as jmod
+from core.controle import ControleIndex
+from core.journal import BACKOFF_BASE, BACKOFF_MAX, MAX_TENTATIVAS, Flusher, Journal
+from core.storage import SQLiteStorage
+
+
+class Queda(BaseException):
+    """Simula o processo morrendo (não é capturada como Exception)."""
+
+
+class StorageFora(SQLiteStorage):
+    """Storage cujo append falha enquanto `fora` for True."""
+    fora = True
+
+    def append(self, linhas):
+        if self.fora:
+            raise ConnectionError("sem rede")
+        return super().append(linhas)
+
+
+def _linha(os_: int, mov: str = "Entrada") -> tuple[str, list]:
+    controle = f"{os_}-1&{mov}&Afiação"
+    return controle, [os_, 1, 1, "03/03/2025", "08:00:00", "op", "AF-01", mov, f"{os_}-1", "Afiação", controle]
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1_000_000.0]
+    monkeypatch.setattr(jmod, "time", SimpleNamespace(time=lambda: agora[0], perf_counter=time.perf_counter))
+    return agora
+
+
+def _montar(tmp_path, cls=SQLiteStorage):
+    sto = cls(str(tmp_path / "mov.sqlite"))
+    sto.preparar()
+    j = Journal(str(tmp_path / "journal.sqlite"))
+    return j, sto, ControleIndex()
+
+
+def _controles(sto) -> list[str]:
+    return sto.controles_desde(0)[0]
+
+
+def _estado(j, controle):
+    return j.conn.execute("SELECT status, tentativas, proximo_em FROM journal WHERE controle = ?",
+                          (controle,)).fetchone()
+
+
+def test_enfileira_e_envia(tmp_path):
+    j, sto, idx = _montar(tmp_path)
+    itens = [_linha(o) for o in (10, 11, 12)]
+    for c, l in itens:
+        assert j.enfileirar(sto.alvo, c, l)
+    assert not j.enfileirar(sto.alvo, *itens[0])            # mesma chave: recusada
+    assert j.enfileirar_lote(sto.alvo, [itens[1], _linha(13)]) == [itens[1][0]]
+
+    Flusher(j, sto, idx).flush()
+    assert _controles(sto) == [c for c, _ in itens] + [_linha(13)[0]]
+    assert j.status(sto.alvo) == {"pendente": 0, "falha": 0, "enviado": 4}
+    assert all(idx.na_planilha(c) for c in _controles(sto))
+    assert idx.cursor == 4
+
+    Flusher(j, sto, idx).flush()                             # nada pendente: nada novo
+    assert len(_controles(sto)) == 4
+
+
+def test_queda_entre_append_e_marcacao_nao_duplica(tmp_path, monkeypatch):
+    j, sto, idx = _montar(tmp_path)
+    for o in (20, 21):
+        j.enfileirar(sto.alvo, *_linha(o))
+
+    def cair(ids):
+        raise Queda()
+    monkeypatch.setattr(j, "marcar_enviados", cair)
+    with pytest.raises(Queda):
+        Flusher(j, sto, idx).flush()
+    assert len(_controles(sto)) == 2
+    j.conn.close()
+
+    # "reinício": journal reaberto do disco, índice vazio, linhas ainda pendentes
+    j2 = Journal(str(tmp_path / "journal.sqlite"))
+    assert j2.status(sto.alvo)["pendente"] == 2
+    idx2 = ControleIndex()
+    for c in j2.chaves_abertas(sto.alvo):
+        idx2.marcar_pendente(c)
+    Flusher(j2, sto, idx2).flush()
+    assert _controles(sto) == [_linha(20)[0], _linha(21)[0]]   # replay não reenviou
+    assert j2.status(sto.alvo) == {"pendente": 0, "falha": 0, "enviado": 2}
+
+
+def test_backoff_e_desistencia(tmp_path, relogio):
+    j, sto, idx = _montar(tmp_path, StorageFora)
+    c, l = _linha(30)
+    j.enfileirar(sto.alvo, c, l)
+    f = Flusher(j, sto, idx)
+
+    esperas = []
+    for n in range(1, MAX_TENTATIVAS + 1):
+        f.flush()
+        status, tentativas, proximo = _estado(j, c)
+        assert tentativas == n
+        esperas.append(proximo - relogio[0])
+        if n < MAX_TENTATIVAS:
+            assert status == "pendente"
+            relogio[0] += esperas[-1] / 2
+            assert j.proximos(sto.alvo) == []                # ainda no backoff
+            relogio[0] = proximo
+            assert [i[1] for i in j.proximos(sto.alvo)] == [c]
+    assert esperas == [min(BACKOFF_BASE * 2 ** k, BACKOFF_MAX) for k in range(MAX_TENTATIVAS)]
+    assert _estado(j, c)[0] == "falha"
+
+    relogio[0] += 10 * BACKOFF_MAX                          # falha não volta sozinha
+    f.flush()
+    assert _estado(j, c)[1] == MAX_TENTATIVAS
+    assert j.falhas(sto.alvo)[0][:2] == (c, MAX_TENTATIVAS)
+
+    sto.fora = False
+    assert j.reenviar_falhas(sto.alvo) == 1
+    f.flush()
+    assert _controles(sto) == [c]
+    assert j.status(sto.alvo) == {"pendente": 0, "falha": 0, "enviado": 1}
+
+
+def test_falha_na_leitura_do_controle_adia_sem_enviar(tmp_path, relogio, monkeypatch):
+    j, sto, idx = _montar(tmp_path)
+    c, l = _linha(40)
+    j.enfileirar(sto.alvo, c, l)
+
+    def lenta(cursor):
+        raise TimeoutError("lento")
+    monkeypatch.setattr(sto, "controles_desde", lenta)
+    Flusher(j, sto, idx).flush()
+    status, tentativas, _ = _estado(j, c)
+    assert (status, tentativas) == ("pendente", 1)
+    assert sto.registros() == []
@@ -0,0 +1,99 @@
+# tests/test_lote.py
+# Lançamento em lote (core/lote.py): leitura da tabela/scanner e as regras do Controle —
+# Saída precisa de Entrada gravada, pendente ou antes no lote; chaves repetidas saem.
+import pytest
+
+from core.controle import ControleIndex, controle_key
+from core.lote import ler_lote_scan, ler_lote_tabela, validar_lote
+
+
+def _reg(os_, item, mov, proc="Afiação", maq="AF-01", qtd=1) -> dict:
+    return {"OS": os_, "Item": item, "Quantidade": qtd, "Máquina": maq, "Movimento": mov, "Processo": proc}
+
+
+@pytest.fixture
+def idx():
+    i = ControleIndex()
+    i.chaves.add(controle_key(100, 1, "Entrada", "Afiação"))       # já na planilha
+    i.chaves.add(controle_key(100, 2, "Entrada", "Afiação"))
+    i.chaves.add(controle_key(100, 2, "Saída", "Afiação"))
+    i.marcar_pendente(controle_key(200, 1, "Entrada", "Erosão"))    # no journal, ainda não enviada
+    return i
+
+
+def _motivos(recusados) -> dict[int, str]:
+    return {r["Linha"]: r["Motivo"] for r in recusados}
+
+
+def test_saida_precisa_de_entrada(idx):
+    lote = [
+        _reg(100, 1, "Saída"),                  # 1: Entrada gravada
+        _reg(200, 1, "Saída", "Erosão"),        # 2: Entrada pendente
+        _reg(300, 1, "Entrada"),                # 3
+        _reg(300, 1, "Saída"),                  # 4: Entrada antes no lote
+        _reg(400, 1, "Saída"),                  # 5: Entrada só depois no lote
+        _reg(400, 1, "Entrada"),                # 6
+        _reg(100, 1, "Saída", "Erosão"),        # 7: Entrada é de outro processo
+        _reg(500, 1, "Saída"),                  # 8: nenhuma Entrada
+    ]
+    aceitos, recusados = validar_lote(lote, idx)
+    assert aceitos == [lote[i] for i in (0, 1, 2, 3, 5)]
+    assert _motivos(recusados) == {5: "Saída sem Entrada", 7: "Saída sem Entrada", 8: "Saída sem Entrada"}
+
+
+def test_duplicados(idx):
+    lote = [
+        _reg(100, 1, "Entrada"),                # 1: já gravada
+        _reg(100, 2, "Saída"),                  # 2: já gravada
+        _reg(200, 1, "Entrada", "Erosão"),      # 3: pendente
+        _reg(300, 1, "Entrada"),                # 4
+        _reg(300, 1, "Entrada", maq="AF-02"),   # 5: mesma chave no lote (máquina não entra no Controle)
+        _reg(300, 1, "Entrada", "Erosão"),      # 6: outro processo, outra chave
+    ]
+    aceitos, recusados = validar_lote(lote, idx)
+    assert aceitos == [lote[3], lote[5]]
+    assert _motivos(recusados) == {1: "Duplicidade (Controle já registrado)",
+                                  2: "Duplicidade (Controle já registrado)",
+                                  3: "Duplicidade (Controle já registrado)",
+                                  5: "Duplicado dentro do lote"}
+
+
+def test_recusado_nao_conta_como_entrada_do_lote(idx):
+    lote = [_reg(100, 1, "Entrada"),            # duplicada: recusada
+            _reg(600, 1, "Entrada", maq=""),    # inválida: recusada
+            _reg(600, 1, "Saída")]              # a Entrada acima não vale
+    aceitos, recusados = validar_lote(lote, idx)
+    assert aceitos == []
+    assert _motivos(recusados) == {1: "Duplicidade (Controle já registrado)",
+                                  2: "Campos inválidos/incompletos", 3: "Saída sem Entrada"}
+
+
+@pytest.mark.parametrize("campo,valor", [("OS", 0), ("Quantidade", 0), ("Máquina", "  "),
+                                         ("Movimento", None), ("Processo", "Retífica")])
+def test_campos_invalidos(idx, campo, valor):
+    r = {**_reg(700, 1, "Entrada"), campo: valor}
+    assert validar_lote([r], idx) == ([], [{"Linha": 1, **r, "Motivo": "Campos inválidos/incompletos"}])
+
+
+def test_ler_tabela():
+    texto = ("os;ITEM;Máquina;Mov;Afiação/Erosão\n"
+             "10;1;AF-01;e;a\n"
+             "10;1;AF-01;saida;EROSAO\n"
+             "11;2,0;ER-01 ;S;Erosão\n")
+    assert ler_lote_tabela(texto) == [
+        _reg(10, 1, "Entrada", "Afiação"),
+        _reg(10, 1, "Saída", "Erosão"),
+        _reg(11, 2, "Saída", "Erosão", maq="ER-01"),
+    ]
+    csv = "OS,Item,Qtd,Maquina,Movimento,Processo\n12,3,4,AF-02,Entrada,Afiação\n"
+    assert ler_lote_tabela(csv) == [_reg(12, 3, "Entrada", maq="AF-02", qtd=4)]
+    with pytest.raises(ValueError, match="Processo"):
+        ler_lote_tabela("OS,Item,Máquina,Movimento\n1,1,A,Entrada\n")
+
+
+def test_ler_scan():
+    registros, invalidas = ler_lote_scan("12345-1\n\n 12345-2;3 \nabc\n99 7\n", " AF-01", 2, "Entrada", "Erosão")
+    assert registros == [_reg(12345, 1, "Entrada", "Erosão", qtd=2),
+                         _reg(12345, 2, "Entrada", "Erosão", qtd=3),
+                         _reg(99, 7, "Entrada", "Erosão", qtd=2)]
+    assert invalidas == ["abc"]
@@ -0,0 +1,51 @@
+# tests/test_movimentos.py
+# Esquema do frame de movimentações (core/movimentos.py): transformar e concatenar
+# mantêm os dtypes de ESQUEMA, inclusive com categorias que só aparecem no bloco novo.
+import pandas as pd
+
+from bench.movimentos import transformar_antigo
+from bench.sintetico import Perfil, gerar_registros
+from core.movimentos import COLUNAS, ESQUEMA, concatenar, transformar
+
+PERFIL = Perfil(n_os=10, itens_por_os=2, dias=5, seed=3)
+
+
+def _dtypes(df: pd.DataFrame) -> dict:
+    return {c: str(t) for c, t in df.dtypes.items()}
+
+
+ESPERADO = {c: str(pd.Series(dtype=t).dtype) for c, t in ESQUEMA.items()}
+
+
+def test_transformar_segue_o_esquema():
+    df = transformar(gerar_registros(500, PERFIL))
+    assert list(df.columns) == COLUNAS
+    assert _dtypes(df) == ESPERADO
+
+
+def test_concatenar_com_categorias_novas():
+    regs = gerar_registros(400, PERFIL)
+    a, b = transformar(regs[:300]), regs[300:]
+    for r in b[::2]:
+        r["OPERADOR"], r["MAQUINA"] = "op_novo", "XX-99"
+    b[1]["Afiação/Erosão"] = "Retífica"
+    df = concatenar(a, transformar(b))
+    assert _dtypes(df) == ESPERADO
+    assert {"op_novo"} <= set(df["OPERADOR"].cat.categories) and "op_novo" not in set(a["OPERADOR"])
+    assert "XX-99" in set(df["MAQUINA"].cat.categories) and "Retífica" in set(df["PROC"].cat.categories)
+    assert df["MOV"].cat.categories.tolist() == ["Entrada", "Saída"]
+    # mesmos valores da carga de tudo de uma vez
+    tudo = transformar(regs[:300] + b)
+    pd.testing.assert_frame_equal(df.astype(str), tudo.astype(str))
+
+
+def test_concatenar_com_vazio():
+    df = transformar(gerar_registros(50, PERFIL))
+    assert concatenar(pd.DataFrame(), df) is df and concatenar(df, pd.DataFrame()) is df
+
+
+def test_mesmos_valores_da_carga_antiga():
+    regs = gerar_registros(500, PERFIL)
+    novo, antigo = transformar(regs), transformar_antigo(regs)
+    for c in COLUNAS:
+        assert novo[c].astype(str).tolist() == antigo[c].astype(str).tolist(), c
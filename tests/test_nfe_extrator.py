@@ -0,0 +1,114 @@
+# tests/test_nfe_extrator.py
+# Extrator de uma passada (core/nfe.py: extrair_nfe) contra a referência por árvore
+# (parse_nfe_xml): mesmos dicts, mesma ordem de colunas, mesmos erros.
+import pytest
+
+from bench.sintetico import NS_NFE, gerar_nfe
+from core.nfe import extrair_nfe, parse_nfe_xml
+
+IDE = ("<ide><mod>55</mod><serie>1</serie><nNF>7</nNF><dhEmi>2025-03-01T10:00:00-03:00</dhEmi>"
+       "<tpNF>1</tpNF><natOp>VENDA</natOp><cMunFG>3550308</cMunFG></ide>")
+EMIT = "<emit><CNPJ>12345678000199</CNPJ><xNome>Rossi</xNome><enderEmit><UF>SP</UF></enderEmit><IE>1</IE></emit>"
+TOTAL = "<total><ICMSTot><vBC>10.00</vBC><vICMS>1,80</vICMS><vProd>10.00</vProd><vNF>10.00</vNF></ICMSTot></total>"
+PAG = "<pag><detPag><vPag>4.00</vPag></detPag><detPag><vPag>6.00</vPag></detPag></pag>"
+PROT = "<protNFe><infProt><cStat>100</cStat><xMotivo>Autorizado</xMotivo></infProt></protNFe>"
+
+
+def _det(n: int, icms="<ICMS00><orig>0</orig><CST>00</CST><pICMS>18.00</pICMS></ICMS00>",
+         pis="<PISAliq><CST>01</CST><pPIS>1.65</pPIS></PISAliq>",
+         cofins="<COFINSAliq><CST>01</CST><pCOFINS>7.60</pCOFINS></COFINSAliq>", prod_extra="") -> str:
+    return (f'<det nItem="{n}"><prod><cProd>P{n}</cProd><xProd>Fresa {n}</xProd><NCM>82077010</NCM>'
+            f"<CFOP>5102</CFOP><uCom>UN</uCom><qCom>2.0000</qCom><vUnCom>5.00</vUnCom><vProd>10.00</vProd>"
+            f"{prod_extra}</prod><imposto><ICMS>{icms}</ICMS><PIS>{pis}</PIS><COFINS>{cofins}</COFINS>"
+            f"</imposto></det>")
+
+
+def _nfe(corpo: str = None, proc: bool = True, chave: str = "35250000000000000000000000000000000000000001") -> bytes:
+    corpo = corpo if corpo is not None else IDE + EMIT + _det(1) + _det(2) + TOTAL + PAG
+    nfe = f'<NFe xmlns="{NS_NFE}"><infNFe versao="4.00" Id="NFe{chave}">{corpo}</infNFe></NFe>'
+    return (f'<nfeProc xmlns="{NS_NFE}">{nfe}{PROT}</nfeProc>' if proc else nfe).encode("utf-8")
+
+
+CASOS = {
+    # repetição: <det>/<detPag> acumulam; os demais valem pela 1ª ocorrência
+    "det_e_detPag_repetidos": _nfe(IDE + EMIT + "".join(_det(i) for i in range(1, 6)) + TOTAL
+                                   + "<pag><detPag><vPag>1</vPag></detPag><detPag><vPag>2,5</vPag></detPag>"
+                                   + "<detPag><tPag>99</tPag></detPag><detPag><vPag>x</vPag></detPag></pag>"),
+    "segundo_pag_ignorado": _nfe(IDE + EMIT + _det(1) + TOTAL + PAG + PAG),
+    "ide_e_total_repetidos": _nfe(IDE + IDE.replace("<nNF>7", "<nNF>8") + EMIT + _det(1)
+                                  + TOTAL + TOTAL.replace("10.00", "99.00")),
+    "campo_repetido_no_item": _nfe(IDE + EMIT + _det(1, prod_extra="<cProd>OUTRO</cProd><vDesc>1</vDesc>"
+                                                               "<vDesc>2</vDesc>") + TOTAL),
+    "det_aninhado_fora_do_caminho": _nfe(IDE + EMIT + _det(1) + f"<infAdic>{_det(9)}</infAdic>" + TOTAL),
+    "sem_det_nem_pag": _nfe(IDE + EMIT + TOTAL),
+    # "*": o 1º filho de ICMS/PIS/COFINS, qualquer que seja o nome
+    "icms_simples_e_pis_nt": _nfe(IDE + EMIT + _det(1, icms="<ICMSSN102><orig>0</orig><CSOSN>102</CSOSN></ICMSSN102>",
+                                                    pis="<PISNT><CST>07</CST></PISNT>",
+                                                    cofins="<COFINSNT><CST>07</CST></COFINSNT>") + TOTAL),
+    "icms_dois_filhos": _nfe(IDE + EMIT + _det(1, icms="<ICMS60><orig>1</orig><CST>60</CST></ICMS60>"
+                                                       "<ICMS00><orig>2</orig><CST>00</CST><pICMS>18</pICMS></ICMS00>")
+                             + TOTAL),
+    "icms_vazio": _nfe(IDE + EMIT + _det(1, icms="", pis=" ", cofins="<!-- nada -->") + TOTAL),
+    "icms_filho_estrangeiro": _nfe(IDE + EMIT + _det(1, icms='<x:ICMS00 xmlns:x="urn:x"><x:CST>00</x:CST></x:ICMS00>'
+                                                              "<ICMS40><orig>0</orig><CST>40</CST></ICMS40>")
+                                   + TOTAL),
+    "cst_e_csosn": _nfe(IDE + EMIT + _det(1, icms="<ICMS900><orig>0</orig><CSOSN>900</CSOSN><CST>90</CST></ICMS900>")
+                        + TOTAL),
+    # texto misto: .text é só o trecho antes do 1º filho; cauda e filhos não contam
+    "texto_misto": _nfe(IDE.replace("<natOp>VENDA</natOp>", "<natOp> VENDA <b>de</b> MERCADORIA </natOp>")
+                        + EMIT.replace("<xNome>Rossi</xNome>", "<xNome>Rossi<!-- c --> &amp; Cia<![CDATA[ <Ltda> ]]></xNome>")
+                        + _det(1, prod_extra="<uTrib><x/>UN</uTrib>") + TOTAL),
+    "texto_so_espacos": _nfe(IDE.replace("<serie>1</serie>", "<serie>\n   \t</serie>") + EMIT + _det(1) + TOTAL),
+    "numero_invalido": _nfe(IDE + EMIT + _det(1).replace("<qCom>2.0000", "<qCom>dois") + TOTAL),
+    # namespaces estrangeiros ou ausentes não casam com os caminhos nfe:
+    "namespace_estrangeiro": _nfe(IDE + '<emit xmlns="urn:outro"><CNPJ>1</CNPJ></emit>' + EMIT + _det(1)
+                                  + '<o:det xmlns:o="urn:outro" nItem="9"><o:prod/></o:det>' + TOTAL),
+    "assinatura": _nfe().replace(b"</infNFe></NFe>", b'</infNFe><Signature xmlns="http://www.w3.org/2000/09/xmldsig#">'
+                                                     b"<infProt><cStat>1</cStat></infProt></Signature></NFe>"),
+    "sem_namespace": f'<nfeProc><NFe><infNFe Id="NFe1">{IDE}{_det(1)}</infNFe></NFe></nfeProc>'.encode(),
+    "prefixo_explicito": _nfe(proc=False).replace(f'<NFe xmlns="{NS_NFE}">'.encode(),
+                                                   f'<n:NFe xmlns:n="{NS_NFE}" xmlns="{NS_NFE}">'.encode())
+                                          .replace(b"</NFe>", b"</n:NFe>"),
+    # protocolo: 1º <protNFe> do documento, dentro ou fora do nfeProc
+    "sem_protocolo": _nfe(proc=False),
+    "dois_protocolos": _nfe().replace(b"</nfeProc>", PROT.replace("100", "135").encode() + b"</nfeProc>"),
+    "protocolo_antes_da_nfe": f'<nfeProc xmlns="{NS_NFE}">{PROT}'.encode() + _nfe(proc=False) + b"</nfeProc>",
+    # fallback: infNFe fora da 1ª <NFe>, ou sem <NFe>
+    "infNFe_na_2a_NFe": (f'<lote xmlns="{NS_NFE}"><NFe><outro/></NFe>'.encode() + _nfe(proc=False) + b"</lote>"),
+    "infNFe_antes_da_NFe": f'<lote xmlns="{NS_NFE}"><infNFe Id="NFeA">{IDE}{_det(1)}</infNFe>'.encode()
+                           + _nfe(proc=False) + b"</lote>",
+    "infNFe_sem_NFe": f'<x xmlns="{NS_NFE}"><infNFe Id="NFe9">{IDE}{_det(1)}</infNFe></x>'.encode(),
+    "duas_NFe": f'<lote xmlns="{NS_NFE}">'.encode() + _nfe(proc=False)
+                + _nfe(proc=False, chave="2").replace(b"VENDA", b"DEVOLUCAO") + b"</lote>",
+    "NFe_raiz_sem_infNFe_dentro": f'<NFe xmlns="{NS_NFE}"><a/></NFe>'.encode(),
+    "chave_sem_Id": _nfe().replace(b' Id="NFe', b' Outro="'),
+    # inválidos
+    "xml_quebrado": _nfe()[:-20],
+    "vazio": b"",
+    "nao_xml": b"%PDF-1.4 ...",
+    "sem_infNFe": f'<nfeProc xmlns="{NS_NFE}"><NFe/>{PROT}</nfeProc>'.encode(),
+    "raiz_infNFe": f'<infNFe xmlns="{NS_NFE}" Id="NFe1">{IDE}</infNFe>'.encode(),
+}
+
+
+def _colunas(r):
+    return list(r[0] or {}), [list(x) for x in r[1] or []]
+
+
+@pytest.mark.parametrize("xml", CASOS.values(), ids=CASOS.keys())
+def test_extrator_igual_a_arvore(xml):
+    esperado, obtido = parse_nfe_xml(xml), extrair_nfe(xml)
+    assert obtido == esperado
+    assert _colunas(obtido) == _colunas(esperado)
+
+
+@pytest.mark.parametrize("itens", [0, 1, 30])
+def test_notas_sinteticas(itens):
+    for xml in gerar_nfe(20, itens, seed=itens):
+        assert extrair_nfe(xml) == parse_nfe_xml(xml)
+
+
+def test_invalidos_dao_erro():
+    for nome in ("xml_quebrado", "vazio", "nao_xml", "sem_infNFe", "raiz_infNFe"):
+        header, itens, erro = extrair_nfe(CASOS[nome])
+        assert header is None and itens is None and erro
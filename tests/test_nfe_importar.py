@@ -0,0 +1,113 @@
+# tests/test_nfe_importar.py
+# Importação em fluxo (core/nfe.py: iterar_xmls + importar_xmls) contra a leitura antiga:
+# tudo em lista, drop_duplicates(keep="last") nas notas e itens só da nota que ficou.
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from bench.sintetico import gerar_nfe
+from core import nfe
+from core.nfe import contar_xmls, importar_xmls, iterar_xmls, parse_nfe_xml
+
+
+def _chave(k: int) -> bytes:
+    return f"3525{k:040d}".encode()
+
+
+def _notas() -> list[bytes]:
+    """2,4k linhas de itens (3 blocos com BUFFER_LINHAS = 1000) com Chaves repetidas: a nota
+    10 volta depois do 1º bloco e no fim (com outra quantidade de itens), a 220 volta
+    logo depois dela mesma."""
+    blobs = gerar_nfe(240, 10, seed=1)
+    outras = gerar_nfe(3, 7, seed=2)
+    blobs.insert(230, blobs[220].replace(b"VENDA DE MERCADORIA", b"REMESSA"))
+    blobs.insert(150, blobs[10].replace(b"VENDA DE MERCADORIA", b"DEVOLUCAO"))
+    blobs.append(outras[0].replace(_chave(0), _chave(10)))
+    blobs.append(b"<NFe><quebrado>")
+    blobs.append(outras[1].replace(_chave(1), _chave(2)))
+    return blobs
+
+
+def _antigo(blobs: list[bytes]) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    headers, itens, origem, erros = [], [], [], 0
+    for i, b in enumerate(blobs):
+        header, itens_out, err = parse_nfe_xml(b)
+        if err:
+            erros += 1
+            continue
+        headers.append(header)
+        itens.extend(itens_out)
+        origem.extend([len(headers) - 1] * len(itens_out))
+    df_notas = pd.DataFrame(headers)
+    df_notas = df_notas.drop_duplicates(subset=["Chave"], keep="last")
+    df_itens = pd.DataFrame(itens)[pd.Series(origem).isin(df_notas.index).to_numpy()]
+    return df_notas.reset_index(drop=True), df_itens.reset_index(drop=True), erros
+
+
+def _zip(blobs: list[bytes], corromper: int) -> io.BytesIO:
+    """ZIP com um membro por XML (mais um .txt ignorado) e o membro `corromper` estragado."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for i, b in enumerate(blobs):
+            z.writestr(f"nf/{i:04d}.xml", b)
+        z.writestr("leia-me.txt", b"nada")
+    dados = bytearray(buf.getvalue())
+    with zipfile.ZipFile(io.BytesIO(bytes(dados))) as z:
+        info = z.getinfo(f"nf/{corromper:04d}.xml")
+    inicio = info.header_offset + 30 + len(info.filename) + len(info.extra)
+    for j in range(inicio + 10, inicio + info.compress_size - 10, 7):
+        dados[j] ^= 0x5A
+    f = io.BytesIO(bytes(dados))
+    f.name = "lote.ZIP"
+    return f
+
+
+@pytest.fixture(scope="module")
+def notas():
+    return _notas()
+
+
+@pytest.fixture(autouse=True)
+def bloco_menor(monkeypatch):
+    monkeypatch.setattr(nfe, "BUFFER_LINHAS", 1_000)
+
+
+@pytest.mark.parametrize("paralelo", [False, True])
+def test_igual_a_leitura_antiga(notas, paralelo):
+    assert sum(len(parse_nfe_xml(b)[1] or []) for b in notas) > 2 * nfe.BUFFER_LINHAS
+    df_notas, df_itens, erros, lidos, do_cache = importar_xmls(iter(notas), len(notas), paralelo, workers=2)
+    ref_notas, ref_itens, ref_erros = _antigo(notas)
+    pd.testing.assert_frame_equal(df_notas, ref_notas)
+    pd.testing.assert_frame_equal(df_itens, ref_itens)
+    assert (len(erros), lidos, do_cache) == (ref_erros, len(notas), 0)
+    ultima = df_notas.set_index("Chave")["Natureza da Operação"]
+    assert ultima[_chave(10).decode()] == "VENDA DE MERCADORIA"      # a do fim, não a DEVOLUCAO
+    assert ultima[_chave(220).decode()] == "REMESSA"
+    assert df_itens["Chave"].value_counts()[_chave(10).decode()] == 7
+
+
+def test_zip_com_membro_corrompido(notas):
+    ruim = 120
+    f = _zip(notas, ruim)
+    assert contar_xmls([f]) == len(notas)
+    erros: list = []
+    df_notas, df_itens, erros_xml, lidos, _ = importar_xmls(iterar_xmls([f], erros), len(notas), paralelo=False)
+    assert erros == [(f"lote.zip/nf/{ruim:04d}.xml", "ZIP corrompido")]
+    assert lidos == len(notas) - 1
+    ref_notas, ref_itens, _ = _antigo(notas[:ruim] + notas[ruim + 1:])
+    pd.testing.assert_frame_equal(df_notas, ref_notas)
+    pd.testing.assert_frame_equal(df_itens, ref_itens)
+
+
+def test_zip_ilegivel_segue_para_o_proximo():
+    ruim = io.BytesIO(b"PK\x03\x04 isto nao e um zip")
+    ruim.name = "ruim.zip"
+    solto = io.BytesIO(gerar_nfe(1, 2)[0])
+    solto.name = "nota.xml"
+    assert contar_xmls([ruim, solto]) == 1
+    erros: list = []
+    df_notas, df_itens, _, lidos, _ = importar_xmls(iterar_xmls([ruim, solto], erros), 1, paralelo=False)
+    assert erros == [("ruim.zip", "ZIP corrompido")]
+    assert (lidos, len(df_notas), len(df_itens)) == (1, 1, 2)
@@ -0,0 +1,95 @@
+# tests/test_ocupacao.py
+# Ocupação das máquinas (core/ocupacao.py) em casos contados à mão: intervalos que se
+# sobrepõem, que só se tocam e que passam da meia-noite.
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.movimentos import TZ
+from core.ocupacao import NS_H, MapaOcupacao, varrer
+
+D_INI, D_FIM = date(2025, 3, 1), date(2025, 3, 2)       # janela de 48 h
+
+
+def _pares(*intervalos) -> pd.DataFrame:
+    maq, ini, fim = zip(*intervalos)
+    ts = lambda xs: pd.Series(pd.to_datetime(list(xs))).dt.tz_localize(TZ)
+    return pd.DataFrame({"MAQUINA": maq, "Entrada_TS": ts(ini), "Saida_TS": ts(fim)})
+
+
+PARES = _pares(
+    # A: 22h→02h e 23h→01h (dois ao mesmo tempo das 23h à 01h, atravessando a meia-noite),
+    #    02h→03h só encosta no primeiro
+    ("A", "2025-03-01 22:00", "2025-03-02 02:00"),
+    ("A", "2025-03-01 23:00", "2025-03-02 01:00"),
+    ("A", "2025-03-02 02:00", "2025-03-02 03:00"),
+    # B: três sobrepostos das 09:15 às 09:30, ocioso das 11h às 13h
+    ("B", "2025-03-01 08:00", "2025-03-01 10:00"),
+    ("B", "2025-03-01 09:00", "2025-03-01 09:30"),
+    ("B", "2025-03-01 09:15", "2025-03-01 11:00"),
+    ("B", "2025-03-01 13:00", "2025-03-01 14:00"),
+    # C: começa antes da janela (conta só 1 h) e outro todo fora dela
+    ("C", "2025-02-28 23:00", "2025-03-01 01:00"),
+    ("C", "2025-03-05 08:00", "2025-03-05 09:00"),
+)
+
+
+def test_varrer_empate_saida_antes_da_entrada():
+    # [0,10) e [10,20) no grupo 0 só se tocam; [5,10) no grupo 1 não conta para o 0
+    g, t0, t1, nivel = varrer(np.array([0, 10, 5]), np.array([10, 20, 10]), np.array([0, 0, 1]))
+    trechos = list(zip(g.tolist(), t0.tolist(), t1.tolist(), nivel.tolist()))
+    assert trechos == [(0, 0, 10, 1), (0, 10, 10, 0), (0, 10, 20, 1), (1, 5, 10, 1)]
+
+
+def test_varrer_sobreposicao():
+    # [0,30), [10,20), [10,40): nível 1, 3, 2, 1
+    g, t0, t1, nivel = varrer(np.array([0, 10, 10]), np.array([30, 20, 40]), np.zeros(3, np.int64))
+    trechos = [(a, b, n) for a, b, n in zip(t0.tolist(), t1.tolist(), nivel.tolist()) if b > a]
+    assert trechos == [(0, 10, 1), (10, 20, 3), (20, 30, 2), (30, 40, 1)]
+
+
+def test_por_maquina():
+    pm = MapaOcupacao(PARES, D_INI, D_FIM).por_maquina().set_index("MAQUINA")
+    assert pm["Intervalos"].to_dict() == {"A": 3, "B": 4, "C": 1}
+    assert pm["Horas_ciclos"].to_dict() == pytest.approx({"A": 7.0, "B": 5.25, "C": 1.0})
+    assert pm["Horas_ocupada"].to_dict() == pytest.approx({"A": 5.0, "B": 4.0, "C": 1.0})   # união
+    assert pm["Pico"].to_dict() == {"A": 2, "B": 3, "C": 1}
+    assert pm["Horas_ociosa"].to_dict() == pytest.approx({"A": 0.0, "B": 2.0, "C": 0.0})
+    assert pm["Maior_ociosidade_h"].to_dict() == pytest.approx({"A": 0.0, "B": 2.0, "C": 0.0})
+    assert pm["Utilizacao"].to_dict() == pytest.approx({"A": 5 / 48, "B": 4 / 48, "C": 1 / 48})
+
+
+def test_por_dia_divide_na_meia_noite():
+    pd_ = MapaOcupacao(PARES, D_INI, D_FIM).por_dia()
+    got = {(r.Dia, r.MAQUINA): (r.Horas_ocupada, r.Pico, r.Utilizacao) for r in pd_.itertuples()}
+    d1, d2 = D_INI, D_FIM
+    esperado = {
+        (d1, "A"): (2.0, 2, 2 / 24), (d2, "A"): (3.0, 2, 3 / 24),
+        (d1, "B"): (4.0, 3, 4 / 24),
+        (d1, "C"): (1.0, 1, 1 / 24),
+    }
+    assert got.keys() == esperado.keys()
+    for k, v in esperado.items():
+        assert got[k] == pytest.approx(v), k
+
+
+def test_linha_do_tempo_e_ociosidades():
+    mapa = MapaOcupacao(PARES, D_INI, D_FIM)
+    lt = mapa.linha_tempo(NS_H)
+    assert len(lt) == 48
+    assert (lt.sum() / 100).to_dict() == pytest.approx({"A": 5.0, "B": 4.0, "C": 1.0})
+    assert lt.loc[pd.Timestamp("2025-03-01 09:00"), "B"] == pytest.approx(100.0)   # 3 ao mesmo tempo ≠ 300%
+    assert lt.loc[pd.Timestamp("2025-03-01 23:00"), "A"] == pytest.approx(100.0)
+
+    oc = mapa.ociosidades()
+    assert oc[["MAQUINA", "Minutos"]].values.tolist() == [["B", 120.0]]
+    assert oc["Inicio"].iloc[0] == pd.Timestamp("2025-03-01 11:00", tz=TZ)
+    assert mapa.ociosidades(minimo_min=121).empty
+
+
+def test_vazio():
+    mapa = MapaOcupacao(_pares(("A", "2025-01-01 08:00", "2025-01-01 09:00")).iloc[:0], D_INI, D_FIM)
+    assert mapa.por_maquina().empty and mapa.por_dia().empty and mapa.ociosidades().empty
+    assert len(mapa.linha_tempo(NS_H)) == 48
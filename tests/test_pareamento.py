@@ -0,0 +1,77 @@
+# tests/test_pareamento.py
+# parear (vetorizado) contra parear_loop (laço original) em movimentos aleatórios.
+#
+# O laço ordena cada grupo com sort_values("TS"), que não é estável: com TS empatados
+# a ordem entre as linhas do empate não é definida. Por isso os empates gerados aqui
+# são de linhas iguais (mesmo MOV e Processo no mesmo OS-Item e horário) — o resultado
+# do laço não depende da ordem — e o caso Entrada/Saída no mesmo horário é conferido à parte.
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.movimentos import COLS_ABERTAS, COLS_ORFAS, COLS_PARES, parear, parear_loop, transformar
+
+PROCS = ["Afiação", "Erosão"]
+
+
+def _registro(os_: int, item: int, proc: str, mov: str, ts: datetime) -> dict:
+    return {"OS": os_, "ITEM": item, "QUANTIDADE": 1, "AFIACAO/EROSAO": proc,
+            "DATA": ts.strftime("%d/%m/%Y"), "HORA": ts.strftime("%H:%M:%S"),
+            "OPERADOR": "OP-1", "MAQUINA": "AF-01", "ENTRADA/SAIDA": mov,
+            "OS- Item": f"{os_}-{item}", "Afiação/Erosão": proc}
+
+
+def _movimentos(seed: int, n_itens: int, n_linhas: int) -> pd.DataFrame:
+    """Poucos OS-Item e poucos horários: grupos grandes e muitos TS repetidos."""
+    rng = np.random.default_rng(seed)
+    inicio = datetime(2025, 3, 3, 7, 0)
+    rows, vistos = [], {}
+    for _ in range(n_linhas):
+        os_, item = 100 + int(rng.integers(n_itens)), 1
+        ts = inicio + timedelta(minutes=int(rng.integers(n_linhas // 3 + 1)))
+        # um mesmo OS-Item/horário repete sempre o mesmo movimento (empate sem ambiguidade)
+        proc, mov = vistos.setdefault((os_, ts), (PROCS[rng.integers(2)], ("Entrada", "Saída")[rng.integers(2)]))
+        rows.append(_registro(os_, item, proc, mov, ts))
+    rng.shuffle(rows)
+    return transformar(rows)
+
+
+def _igual(a: pd.DataFrame, b: pd.DataFrame, colunas: list[str]) -> None:
+    if b.empty:                       # o laço devolve DataFrame sem colunas quando não há linhas
+        assert a.empty and list(a.columns) == colunas
+        return
+    pd.testing.assert_frame_equal(a.reset_index(drop=True).astype(object),
+                                  b.reset_index(drop=True).astype(object), check_dtype=False)
+
+
+@pytest.mark.parametrize("por_processo", [False, True])
+@pytest.mark.parametrize("seed,n_itens,n_linhas", [(0, 1, 60), (1, 3, 200), (2, 12, 500), (3, 40, 2_000)])
+def test_parear_igual_ao_laco(seed, n_itens, n_linhas, por_processo):
+    df = _movimentos(seed, n_itens, n_linhas)
+    assert df["TS"].duplicated().any()
+    for a, b, cols in zip(parear(df, por_processo), parear_loop(df, por_processo),
+                          (COLS_PARES, COLS_ABERTAS, COLS_ORFAS)):
+        _igual(a, b, cols)
+
+
+@pytest.mark.parametrize("por_processo", [False, True])
+def test_parear_so_entradas_ou_so_saidas(por_processo):
+    t = datetime(2025, 3, 3, 8, 0)
+    for mov in ("Entrada", "Saída"):
+        df = transformar([_registro(7, 1, "Afiação", mov, t), _registro(7, 1, "Afiação", mov, t)])
+        for a, b, cols in zip(parear(df, por_processo), parear_loop(df, por_processo),
+                              (COLS_PARES, COLS_ABERTAS, COLS_ORFAS)):
+            _igual(a, b, cols)
+
+
+def test_empate_entrada_saida_segue_ordem_das_linhas():
+    t = datetime(2025, 3, 3, 8, 0)
+    e, s = _registro(7, 1, "Afiação", "Entrada", t), _registro(7, 1, "Afiação", "Saída", t)
+
+    pares, abertas, orfas = parear(transformar([e, s]))
+    assert len(pares) == 1 and pares["Dur_s"].iloc[0] == 0 and abertas.empty and orfas.empty
+
+    pares, abertas, orfas = parear(transformar([s, e]))
+    assert pares.empty and len(abertas) == 1 and len(orfas) == 1
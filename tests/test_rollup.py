@@ -0,0 +1,91 @@
+# tests/test_rollup.py
+# Rollup diário × relatório filtrado: a mesma definição de ciclo (pareado sobre o
+# histórico, no dia da Saída, na máquina da Entrada) tem de dar os mesmos números.
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from bench.sintetico import Perfil, gerar_registros
+from core.derivados import EXTRAS, calcular_relatorio, selecionar
+from core.movimentos import parear, transformar
+from core.rollup import DIMENSOES, RollupDiario, agregar, agregar_sketch, kpis, serie
+
+PERFIL = Perfil(n_os=40, itens_por_os=3, dias=30, taxa_orfas=0.05, taxa_abertas=0.05, seed=7)
+
+
+@pytest.fixture(scope="module")
+def df():
+    return transformar(gerar_registros(3_000, PERFIL))
+
+
+def _filtros(df):
+    d0, d1 = df["TS"].min().date(), df["TS"].max().date()
+    meio = d0 + (d1 - d0) / 2
+    maquinas = sorted(df["MAQUINA"].astype(str).unique())
+    return [
+        (d0, d1, ()),
+        (d0 + timedelta(days=5), meio, ()),
+        (meio, d1, maquinas[:2]),
+        (d0 + timedelta(days=3), d0 + timedelta(days=3), maquinas[-1:]),
+    ]
+
+
+def _ordenado(baldes: pd.DataFrame) -> pd.DataFrame:
+    return baldes.sort_values(DIMENSOES).reset_index(drop=True)[baldes.columns.sort_values()]
+
+
+@pytest.mark.parametrize("por_processo", [False, True])
+def test_kpis_do_rollup_batem_com_o_relatorio(df, por_processo):
+    rollup = RollupDiario(por_processo)
+    rollup.atualizar(df, 1)
+    for d_ini, d_fim, maqs in _filtros(df):
+        res = calcular_relatorio(df, d_ini, d_fim, (), maqs, por_processo)
+        k = kpis(rollup.consultar(d_ini, d_fim, maqs))
+        assert k["ciclos"] == len(res["df_pairs"])
+        assert k["horas"] == pytest.approx(res["df_pairs"]["Dur_s"].sum() / 3600.0)
+        assert k["pecas"] == int(res["df_pairs"]["QUANTIDADE"].sum())
+        assert k["abertos"] == len(res["df_open"])
+        assert k == kpis(agregar(res["df_pairs"], res["df_open"]))   # fallback com filtro de OS
+        s = serie(rollup.consultar(d_ini, d_fim, maqs))
+        assert s["Segundos"].sum() == pytest.approx(res["tempo_os_item"]["Segundos"].sum())
+
+
+@pytest.mark.parametrize("por_processo", [False, True])
+def test_relatorio_e_recorte_do_pareamento_completo(df, por_processo):
+    completo = parear(df, por_processo, extras=EXTRAS)
+    os_sel = sorted(df["OS"].dropna().unique().tolist())[:5]
+    for d_ini, d_fim, maqs in _filtros(df):
+        for oss in ((), os_sel):
+            res = calcular_relatorio(df, d_ini, d_fim, oss, maqs, por_processo)
+            for a, b in zip((res["df_pairs"], res["df_open"], res["df_orph"]),
+                            selecionar(completo, d_ini, d_fim, oss, maqs)):
+                chaves = [c for c in ("OS_Item", "PROC", "Entrada_TS", "Saida_TS") if c in a]
+                pd.testing.assert_frame_equal(a.sort_values(chaves).reset_index(drop=True).astype(object),
+                                              b.sort_values(chaves).reset_index(drop=True).astype(object),
+                                              check_dtype=False)
+
+
+@pytest.mark.parametrize("por_processo", [False, True])
+def test_rollup_incremental_igual_a_reconstrucao(df, por_processo):
+    inc = RollupDiario(por_processo)
+    for fim in (500, 1_200, 1_201, 2_500, len(df)):
+        inc.atualizar(df.iloc[:fim], 1)
+    assert inc.reconstrucoes == 1
+    nova = RollupDiario(por_processo)
+    nova.atualizar(df, 1)
+    pd.testing.assert_frame_equal(_ordenado(inc.frame()), _ordenado(nova.frame()), check_dtype=False)
+    sk = ["Dia", "MAQUINA", "PROC", "Balde"]
+    pd.testing.assert_frame_equal(inc.frame_sketch().sort_values(sk).reset_index(drop=True),
+                                  nova.frame_sketch().sort_values(sk).reset_index(drop=True), check_dtype=False)
+
+
+def test_sketch_do_rollup_igual_ao_dos_pares(df):
+    rollup = RollupDiario()
+    rollup.atualizar(df, 1)
+    d0, d1, _ = _filtros(df)[1]
+    res = calcular_relatorio(df, d0, d1)
+    sk = ["Dia", "MAQUINA", "PROC", "Balde"]
+    pd.testing.assert_frame_equal(
+        rollup.consultar(d0, d1, sketch=True).sort_values(sk).reset_index(drop=True),
+        agregar_sketch(res["df_pairs"]).sort_values(sk).reset_index(drop=True), check_dtype=False)
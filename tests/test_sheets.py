@@ -0,0 +1,81 @@
+# tests/test_sheets.py
+# Pools por empresa (core/sheets.py): a cota é da credencial, o rastreio é da empresa;
+# o token renova perto de expirar, com a expiração com ou sem fuso.
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from core import empresas
+from core.agendador import ESCRITA, LEITURA
+from core.rastreio import rastreador
+from core.sheets import REFRESH_MARGIN, SheetsPool, cota_sheets, sheets_pool
+
+URL = "https://docs.google.com/spreadsheets/d/{}/edit"
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    regs = {
+        "1": empresas.Empresa("1", "A", URL.format("a"), quota_por_minuto=60),
+        "2": empresas.Empresa("2", "B", URL.format("b"), quota_por_minuto=60),
+        "3": empresas.Empresa("3", "C", URL.format("c"), quota_por_minuto=60, service_account="SA_C"),
+    }
+    monkeypatch.setattr(empresas, "registro", lambda: regs)
+    for f in (sheets_pool, cota_sheets, rastreador):
+        f.clear()
+    yield regs
+    for f in (sheets_pool, cota_sheets, rastreador):
+        f.clear()
+
+
+def test_mesma_credencial_divide_a_cota(registro):
+    a, b, c = sheets_pool("1"), sheets_pool("2"), sheets_pool("3")
+    assert a is not b
+    assert a.agendador.base is b.agendador.base
+    assert c.agendador.base is not a.agendador.base
+
+    for _ in range(3):
+        a.agendador.executar(LEITURA, lambda: 1)
+    b.agendador.executar(ESCRITA, lambda: 2)
+    base = a.agendador.stats()
+    assert base["leitura"]["chamadas"] == 3 and base["escrita"]["chamadas"] == 1
+    assert base["tokens"] == pytest.approx(56, abs=0.5)
+    assert c.agendador.stats()["tokens"] == pytest.approx(60)
+
+
+def test_rastreio_fica_na_empresa(registro):
+    a, b = sheets_pool("1"), sheets_pool("2")
+    a.agendador.executar(LEITURA, lambda: 1, op="get_a")
+    b.agendador.executar(LEITURA, lambda: 1, op="get_b")
+    assert a.rastreador is rastreador("1") and b.rastreador is rastreador("2")
+    assert rastreador("1").df()["op"].tolist() == ["get_a"]
+    assert rastreador("2").df()["op"].tolist() == ["get_b"]
+
+
+class Auth:
+    def __init__(self, expiry):
+        self.expiry, self.renovacoes = expiry, 0
+
+    def refresh(self, request):
+        self.renovacoes += 1
+
+
+@pytest.mark.parametrize("falta,renova", [(REFRESH_MARGIN * 2, False), (REFRESH_MARGIN / 2, True),
+                                          (-timedelta(minutes=1), True)])
+@pytest.mark.parametrize("com_fuso", [False, True])
+def test_renova_token_perto_de_expirar(falta, renova, com_fuso):
+    expiry = datetime.now(timezone.utc) + falta
+    auth = Auth(expiry if com_fuso else expiry.replace(tzinfo=None))   # google-auth: UTC sem fuso
+    pool = SheetsPool()
+    pool._client = SimpleNamespace(http_client=SimpleNamespace(auth=auth))
+    pool._refresh_if_needed()
+    assert auth.renovacoes == int(renova)
+
+
+def test_sem_expiracao_renova():
+    auth = Auth(None)
+    pool = SheetsPool()
+    pool._client = SimpleNamespace(http_client=SimpleNamespace(auth=auth))
+    pool._refresh_if_needed()
+    assert auth.renovacoes == 1
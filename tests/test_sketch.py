@@ -0,0 +1,66 @@
+# tests/test_sketch.py
+# Sketch de quantis (core/sketch.py): erro relativo ≤ ALFA contra np.quantile e mescla
+# que não depende de como os dados foram repartidos.
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.sketch import ALFA, balde, histograma, quantis, resumo, valor
+
+QS = (0.01, 0.25, 0.5, 0.9, 0.99, 1.0)
+
+
+def _bins(grupo, dur) -> pd.DataFrame:
+    """Linhas (G, Balde, N, Soma) como as do rollup."""
+    d = pd.DataFrame({"G": grupo, "Balde": balde(dur), "Dur_s": dur})
+    return d.groupby(["G", "Balde"], as_index=False)["Dur_s"].agg(N="count", Soma="sum")
+
+
+def _duracoes(seed: int, n: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.lognormal(np.log(45 * 60), 0.8, n),      # ciclos normais
+                           rng.uniform(1, 90, n // 10),                   # curtos
+                           rng.pareto(1.5, n // 20) * 3600 + 3600])       # cauda longa
+
+
+@pytest.mark.parametrize("seed,n", [(0, 10), (1, 1_000), (2, 50_000)])
+def test_erro_relativo_contra_np_quantile(seed, n):
+    dur = _duracoes(seed, n)
+    b = _bins(np.zeros(dur.size, int), dur)
+    est = np.array(quantis(b["Balde"].to_numpy(), b["N"].to_numpy(), QS))
+    # o posto do sketch é floor(q·(n-1)), o método "lower" do numpy
+    exato = np.quantile(dur, QS, method="lower")
+    assert np.all(np.abs(est - exato) <= ALFA * exato + 1e-9)
+
+
+def test_balde_contem_o_valor():
+    v = np.geomspace(1, 1e7, 5_000)
+    rep = valor(balde(v))
+    assert np.all(np.abs(rep - v) <= ALFA * v * (1 + 1e-9))
+
+
+def test_mescla_independe_da_reparticao():
+    rng = np.random.default_rng(3)
+    dur = _duracoes(3, 20_000)
+    grupo = rng.choice(["Afiação", "Erosão"], dur.size)
+    inteiro = resumo(_bins(grupo, dur), "G")
+
+    for partes in (2, 7, 50):
+        corte = np.sort(rng.choice(np.arange(1, dur.size), partes - 1, replace=False))
+        pedacos = [_bins(g, d) for g, d in zip(np.split(grupo, corte), np.split(dur, corte))]
+        # (a + b) + c = a + (b + c) = qualquer ordem: só importa a soma dos baldes
+        for ordem in (pedacos, pedacos[::-1], [pedacos[i] for i in rng.permutation(len(pedacos))]):
+            mesclado = resumo(pd.concat(ordem, ignore_index=True), "G")
+            pd.testing.assert_frame_equal(mesclado, inteiro, check_exact=False, rtol=1e-12)
+
+
+def test_histograma_conta_todos_os_ciclos():
+    dur = _duracoes(4, 5_000)
+    grupo = np.where(np.arange(dur.size) % 3, "A", "B")
+    h = histograma(_bins(grupo, dur), "G", [0, 15, 30, 60, 120])
+    assert h.sum().to_dict() == {"A": int((grupo == "A").sum()), "B": int((grupo == "B").sum())}
+
+
+def test_vazio():
+    assert np.isnan(quantis(np.array([], np.int64), np.array([], np.int64), (0.5,))[0])
+    assert resumo(pd.DataFrame(columns=["G", "Balde", "N", "Soma"]), "G").empty
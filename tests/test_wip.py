@@ -0,0 +1,128 @@
+# tests/test_wip.py
+# Estado "em andamento" (core/wip.py) contra um SQLiteStorage: as abertas e órfãs são as
+# do pareamento por processo, o estado se refaz quando o delta não continua o já lido
+# e a leitura do storage não segura o lock.
+import threading
+
+import pytest
+
+from bench.sintetico import Perfil, gerar_registros
+from core.movimentos import parear, transformar
+from core.storage import HEADERS, SQLiteStorage
+from core.wip import EstadoWIP
+
+PERFIL = Perfil(n_os=25, itens_por_os=3, dias=10, taxa_orfas=0.05, taxa_abertas=0.1, seed=11)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    sto = SQLiteStorage(str(tmp_path / "mov.sqlite"))
+    sto.preparar()
+    return sto
+
+
+@pytest.fixture(scope="module")
+def registros():
+    return gerar_registros(800, PERFIL)
+
+
+def _linhas(regs: list[dict]) -> list[list]:
+    return [[r[h] for h in HEADERS] for r in regs]
+
+
+def _confere(estado: EstadoWIP, storage) -> None:
+    _, abertas, orfas = parear(transformar(storage.registros()), por_processo=True)
+    esperado = sorted(zip(abertas["OS_Item"].astype(str), abertas["PROC"].astype(str), abertas["Entrada_TS"]))
+    df = estado.abertos_df()
+    assert sorted(zip(df["OS_Item"], df["PROC"], df["Entrada_TS"])) == esperado
+    assert estado.orfas == len(orfas)
+    assert estado.linhas == len(storage.registros())
+
+
+def test_incremental_igual_ao_pareamento(storage, registros):
+    estado = EstadoWIP()
+    for a, b in ((0, 200), (200, 201), (201, 500), (500, len(registros))):
+        storage.append(_linhas(registros[a:b]))
+        assert estado.atualizar(storage, forcar=True) == b - a
+        _confere(estado, storage)
+    assert estado.atualizar(storage, forcar=True) == 0
+    assert estado.recargas == 0
+
+
+def test_exclusao_no_meio_refaz_o_estado(storage, registros):
+    storage.append(_linhas(registros[:300]))
+    estado = EstadoWIP()
+    estado.atualizar(storage, forcar=True)
+    storage.conn.execute("DELETE FROM movimentos WHERE id IN (40, 41, 42)")
+    storage.append(_linhas(registros[300:320]))
+    estado.atualizar(storage, forcar=True)
+    assert estado.recargas == 1
+    _confere(estado, storage)
+
+
+def test_ancora_editada_refaz_o_estado(storage, registros):
+    storage.append(_linhas(registros[:300]))
+    estado = EstadoWIP()
+    estado.atualizar(storage, forcar=True)
+    storage.conn.execute("UPDATE movimentos SET mov = CASE mov WHEN 'Entrada' THEN 'Saída' ELSE 'Entrada' END "
+                         "WHERE id = 300")
+    estado.atualizar(storage, forcar=True)
+    assert estado.recargas == 1
+    _confere(estado, storage)
+
+
+def test_cabecalho_antigo_do_processo(storage, registros):
+    storage.headers = [h if h != "Afiação/Erosão" else "AFIACAO/EROSAO" for h in HEADERS]
+    storage.append(_linhas(registros[:300]))
+    estado = EstadoWIP()
+    estado.atualizar(storage, forcar=True)
+    assert set(estado.abertos_df()["PROC"]) <= {"Afiação", "Erosão"}
+    _confere(estado, storage)
+
+
+def test_leitura_fora_do_lock(storage, registros):
+    storage.append(_linhas(registros[:100]))
+    estado = EstadoWIP()
+    estado.atualizar(storage, forcar=True)
+    storage.append(_linhas(registros[100:150]))
+
+    lendo, liberar = threading.Event(), threading.Event()
+    delta = storage.delta
+
+    def delta_lento(cursor):
+        lendo.set()
+        liberar.wait(5)
+        return delta(cursor)
+    storage.delta = delta_lento
+    t = threading.Thread(target=estado.atualizar, args=(storage, True), daemon=True)
+    t.start()
+    assert lendo.wait(5)
+    assert estado.lock.acquire(timeout=1)              # outra sessão lê o estado enquanto isso
+    estado.lock.release()
+    assert estado.abertos_df() is not None and estado.linhas == 100
+    assert estado.atualizar(storage) == 0              # dentro do intervalo: não lê de novo
+    liberar.set()
+    t.join(5)
+    assert estado.linhas == 150
+
+
+def test_leitura_concorrente_aplica_uma_vez(storage, registros):
+    storage.append(_linhas(registros[:100]))
+    estado = EstadoWIP()
+    lendo, liberar = threading.Event(), threading.Event()
+    delta = storage.delta
+
+    def delta_lento(cursor):
+        if not lendo.is_set():
+            lendo.set()
+            liberar.wait(5)
+        return delta(cursor)
+    storage.delta = delta_lento
+    t = threading.Thread(target=estado.atualizar, args=(storage, True), daemon=True)
+    t.start()
+    assert lendo.wait(5)
+    assert estado.atualizar(storage, forcar=True) == 100  # a segunda termina antes
+    liberar.set()
+    t.join(5)
+    assert estado.linhas == 100                        # a primeira chegou atrasada e foi descartada
+    _confere(estado, storage)